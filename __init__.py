@@ -14,10 +14,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
+
 from .src import Amortization
-from .src import CashFlow_ExtMod
 from .src import CashFlows
-from .src import CashFlowUser
 from .src import main as CashFlow
-from .src import CashFlowPlot
+
+# these need RAVEN (and plotting libraries), so they are only imported when first used
+_lazyModules = ['CashFlow_ExtMod', 'CashFlowUser', 'CashFlowPlot']
+
+def __getattr__(name):
+  """
+    Imports the RAVEN plugin modules on first access
+    @ In, name, str, attribute name
+    @ Out, module, module, requested module
+  """
+  if name in _lazyModules:
+    module = importlib.import_module(f'.src.{name}', __name__)
+    globals()[name] = module
+    return module
+  raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def __dir__():
+  """
+    Lists the package attributes, including the not-yet-imported plugin modules
+    @ In, None
+    @ Out, names, list, attribute names
+  """
+  return sorted(set(globals()) | set(_lazyModules))
 
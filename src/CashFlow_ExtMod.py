@@ -20,6 +20,7 @@ This module contains the TEAL.CashFlow plugin module
 """
 from __future__ import division, print_function, unicode_literals, absolute_import
 import os
+import sys
 import numpy as np
 import warnings
 warnings.simplefilter('default', DeprecationWarning)
@@ -30,7 +31,6 @@ from . import main
 # needs to be in the propoer plugin directory.
 
 try:
-  from ravenframework.utils.graphStructure import graphObject
   from ravenframework.PluginBaseClasses.ExternalModelPluginBase import ExternalModelPluginBase
 except:
   raise IOError("TEAL ERROR (Initialisation): RAVEN needs to be installed and TEAL needs to be installed as a plugin to work!'")
@@ -70,6 +70,13 @@ class CashFlow(ExternalModelPluginBase):
     settings = container._globalSettings
     components = container._components
     main.checkRunSettings(settings, components)
+    # the component structure does not change between samples, so compile the evaluation once
+    container._plan = main.EvaluationPlan(settings, components, v=settings.getVerbosity())
+    plan = container._plan
+    # detailed output: the variable name of each project cash flow
+    container._outputNames = list((plan.outputNames[comp.name][cf.name], comp.name, cf.name)
+                                  for comp in components for cf in comp.getCashflows())
+    container.cfYears = np.arange(plan.projectLength)
   # =====================================================================================================================
 
   # =====================================================================================================================
@@ -82,75 +89,411 @@ class CashFlow(ExternalModelPluginBase):
     """
     globalSettings = container._globalSettings
     components = container._components
-    metrics = main.run(globalSettings, components, Inputs)
+    plan = container._plan
+    metrics = main.run(globalSettings, components, Inputs, plan=plan)
+    self._setMetrics(container, metrics, plan)
+  # =====================================================================================================================
+
+  # =====================================================================================================================
+  def runBatch(self, container, realizations):
+    """
+      Computes economic key figures for many realizations at once, with the cash flow calculations vectorized
+      along the realizations instead of evaluating them one by one. Each metric is set on the container as an
+      array with one entry (or, for the detailed output, one row) per realization, in order.
+      RAVEN evaluates the ExternalModel one realization at a time through run; this is for Python callers
+      that hold many realizations, such as scripts driving the plugin directly.
+      @ In, container, object, external 'self'
+      @ In, realizations, list or dict, inputs of each realization (as for run), or variable name: np.array
+        with the realizations along the first axis
+      @ Out, None
+    """
+    if not isinstance(realizations, dict):
+      realizations = self._stackRealizations(realizations)
+    plan = container._plan
+    metrics = main.runBatch(container._globalSettings, container._components, realizations, plan=plan)
+    numSamples = len(next(iter(realizations.values())))
+    self._setMetrics(container, metrics, plan, numSamples=numSamples)
+  # =====================================================================================================================
+
+  # =====================================================================================================================
+  @staticmethod
+  def _stackRealizations(realizations):
+    """
+      Stacks the inputs of several realizations along a leading sample axis
+      @ In, realizations, list, dict of inputs of each realization
+      @ Out, variables, dict, variable name: np.array with shape (realizations, entries)
+    """
+    if not len(realizations):
+      raise IOError('TEAL ERROR (Run): a batch needs at least one realization!')
+    names = realizations[0].keys()
+    try:
+      return dict((name, np.stack(list(np.atleast_1d(np.asarray(rlz[name], dtype=float)) for rlz in realizations)))
+                  for name in names)
+    except (KeyError, ValueError) as e:
+      raise IOError(f'TEAL ERROR (Run): realizations of a batch must have the same variables and shapes! ({e})') from e
+  # =====================================================================================================================
 
-    projectLife = main.getProjectLength(globalSettings, components)
+  # =====================================================================================================================
+  @staticmethod
+  def _setMetrics(container, metrics, plan, numSamples=None):
+    """
+      Sets the metrics of an evaluation as container attributes
+      @ In, container, object, external 'self'
+      @ In, metrics, dict, results of main.run
+      @ In, plan, main.EvaluationPlan, plan of the evaluation
+      @ In, numSamples, int, optional, number of realizations of a batch evaluation (leading axis of each metric)
+      @ Out, None
+    """
+    projectLife = plan.projectLength
     if metrics['outputType']:
+      allData = metrics['all_data']
+      for name, comp, cf in container._outputNames:
+        data = allData[comp][cf]
+        # cash flows that don't depend on the sampled variables are repeated for each realization
+        if numSamples is not None and np.shape(data) != (numSamples, projectLife):
+          data = np.broadcast_to(data, (numSamples, projectLife)).copy()
+        setattr(container, name, data)
       for k, v in metrics.items():
-        if k == "all_data":
-          for comp,cfs in v.items():
-            for cf, data in cfs.items():
-              if cf.find('depreciation_tax_credit') > 0:
-                setattr(container, f'{comp}_depreciation_tax_credit', data)
-              elif cf.find('depreciation') > 0:
-                setattr(container, f'{comp}_depreciation', data)
-              else:
-                setattr(container, f'{comp}_{cf}_CashFlow', data)
-        else:
-          blank = []
-          blank.append(v)
-          for x in range(projectLife-1):
-            blank.append(0)
-          blank = np.array(blank)
-          setattr(container, f'{k}', blank)
+        if k == 'all_data':
+          continue
+        # a new vector for each sample, as samples may run concurrently; only the first year is nonzero
+        blank = np.zeros((projectLife,) if numSamples is None else (numSamples, projectLife))
+        blank[..., 0] = v
+        setattr(container, k, blank)
     else:
       for k, v in metrics.items():
         if k != 'outputType':
+          if numSamples is not None and np.shape(v) != (numSamples,):
+            v = np.broadcast_to(v, (numSamples,)).copy()
           setattr(container, k, v)
+  # =====================================================================================================================
 
 
-    container.cfYears = np.arange(projectLife)
+#################################
+# Run the plugin in stand alone #
+#################################
+# indicators reported by the stand-alone driver
+STANDALONE_INDICATORS = ['NPV_mult', 'NPV', 'IRR', 'PI']
 
+class FakeSelf:
+  """
+    Mimics RAVEN variable holder
+  """
+  def __init__(self):
+    """
+      Constructor.
+      @ In, None
+      @ Out, None
+    """
+    pass
 
+def loadStandalone(xmlFile, cacheDir=None, store=None):
+  """
+    Reads the economics input file and initializes the plugin, as RAVEN would
+    @ In, xmlFile, str, XML CashFlow input file name
+    @ In, cacheDir, str, optional, directory of cached parsed models (see main.readFromXml)
+    @ In, store, str, optional, SQLite file in which the results of the samples are kept (see main.ResultStore),
+      instead of a <ResultCache>
+    @ Out, cashFlow, CashFlow, plugin instance
+    @ Out, container, FakeSelf, emulated RAVEN container with the settings, components and plan
+  """
+  import xml.etree.ElementTree as ET
+  cashFlow = CashFlow()
+  container = FakeSelf()
+  notroot = ET.parse(open(xmlFile, 'r')).getroot()
+  root = ET.Element('ROOT')
+  root.append(notroot)
+  container._globalSettings, container._components = main.readFromXml(root, cacheDir=cacheDir)
+  cashFlow.initialize(container, {}, [])
+  if store is not None:
+    # with detailed output, the project cash flows are needed too for a sample to be complete
+    settings = container._globalSettings
+    container._plan.resultCache = main.ResultStore(store, main.modelHash(root), allData=bool(settings.getOutput()),
+                                                   v=settings.getVerbosity())
+  return cashFlow, container
 
+def readVariableFile(inpFile):
+  """
+    Reads the variable file, one "name value[,value,...]" line per variable
+    @ In, inpFile, str, CashFlow input file name with the input variable list
+    @ Out, inputs, dict, variable-value map
+  """
+  inputs = {}
+  with open(inpFile) as f:
+    for l in f:
+      if l.strip().startswith("#") or not len(l.strip()):
+        continue
+      (key, val) = l.split(' ', 1)
+      inputs[key] = np.array([float(n) for n in val.split(",")])
+  return inputs
 
-  # =====================================================================================================================
+def evaluateStandalone(cashFlow, container, inputs):
+  """
+    Runs one sample and collects the indicators
+    @ In, cashFlow, CashFlow, plugin instance
+    @ In, container, FakeSelf, emulated RAVEN container
+    @ In, inputs, dict, variable-value map
+    @ Out, outDict, dict, indicator name: value, for the indicators that were calculated
+  """
+  # do not report indicators left over from a previous sample
+  for indicator in STANDALONE_INDICATORS:
+    if hasattr(container, indicator):
+      delattr(container, indicator)
+  cashFlow.run(container, inputs)
+  return dict((indicator, getattr(container, indicator)) for indicator in STANDALONE_INDICATORS
+              if hasattr(container, indicator))
 
+def serveRecords(cashFlow, container, instream, outstream, log=None):
+  """
+    Evaluates samples given as newline-delimited JSON records, e.g. {"Name": 1.0, "Other": [1.0, 2.0]},
+    writing one JSON result record per sample, e.g. {"NPV": 1.0, "IRR": 0.1}, or {"error": "message"}
+    if the sample could not be evaluated. Blank lines are skipped; the end of the input stops serving.
+    @ In, cashFlow, CashFlow, plugin instance
+    @ In, container, FakeSelf, emulated RAVEN container
+    @ In, instream, file-like, stream to read the variable records from
+    @ In, outstream, file-like, stream to write the result records to
+    @ In, log, file-like, optional, stream for the messages printed while evaluating (default stderr)
+    @ Out, count, int, number of records served
+  """
+  import contextlib
+  import json
+  log = sys.stderr if log is None else log
+  count = 0
+  for line in instream:
+    if not line.strip():
+      continue
+    try:
+      record = json.loads(line)
+      inputs = dict((key, np.atleast_1d(np.asarray(val, dtype=float))) for key, val in record.items())
+      # keep the printouts out of the record stream
+      with contextlib.redirect_stdout(log):
+        outDict = evaluateStandalone(cashFlow, container, inputs)
+      result = dict((key, np.asarray(val).tolist()) for key, val in outDict.items())
+    except Exception as e:
+      result = {'error': f'{type(e).__name__}: {e}'}
+    outstream.write(json.dumps(result) + '\n')
+    outstream.flush()
+    count += 1
+  return count
+
+def serveSocket(cashFlow, container, port, host='127.0.0.1'):
+  """
+    Serves newline-delimited JSON records (see serveRecords) on a local TCP socket, one connection at a time,
+    until interrupted
+    @ In, cashFlow, CashFlow, plugin instance
+    @ In, container, FakeSelf, emulated RAVEN container
+    @ In, port, int, port to listen on
+    @ In, host, str, optional, address to listen on
+    @ Out, None
+  """
+  import socket
+  with socket.create_server((host, port)) as server:
+    print(f"CashFlow INFO (Run as Code): Worker listening on {host}:{server.getsockname()[1]}", file=sys.stderr)
+    try:
+      while True:
+        conn, _ = server.accept()
+        with conn, conn.makefile('r') as instream, conn.makefile('w') as outstream:
+          serveRecords(cashFlow, container, instream, outstream)
+    except KeyboardInterrupt:
+      pass
+
+def readSampleTable(tableFile):
+  """
+    Reads a table of variable sets, one row per sample. In a CSV file, each column is a variable, with
+    per-year values given in columns "name[0]", "name[1]", ...; an NPZ file holds one array per variable,
+    with the samples along the first axis.
+    @ In, tableFile, str, CSV or NPZ file name
+    @ Out, variables, dict, variable name: np.array with shape (samples,) or (samples, years)
+  """
+  import re
+  if tableFile.lower().endswith('.npz'):
+    with np.load(tableFile) as data:
+      return dict((key, np.asarray(data[key], dtype=float)) for key in data.files)
+  import csv
+  with open(tableFile) as f:
+    reader = csv.reader(f)
+    header = next(reader)
+    rows = np.array([[float(val) for val in row] for row in reader if len(row)], dtype=float).reshape(-1, len(header))
+  columns = {}
+  for c, name in enumerate(header):
+    match = re.fullmatch(r'\s*(.+?)\[(\d+)\]\s*', name)
+    if match:
+      columns.setdefault(match.group(1), {})[int(match.group(2))] = c
+    else:
+      columns[name.strip()] = c
+  variables = {}
+  for name, col in columns.items():
+    if isinstance(col, dict):
+      variables[name] = rows[:, [col[i] for i in sorted(col)]]
+    else:
+      variables[name] = rows[:, col]
+  return variables
+
+def writeResultTable(outFile, results, errors):
+  """
+    Writes the indicators of all samples, in sample order, as CSV or NPZ (by file extension)
+    @ In, outFile, str, output file name
+    @ In, results, dict, indicator name: np.array of values, one per sample
+    @ In, errors, list, error message for each sample, or None if it was evaluated
+    @ Out, None
+  """
+  columns = dict(results)
+  if any(errors):
+    columns['error'] = np.array(['' if e is None else e for e in errors])
+  if outFile.lower().endswith('.npz'):
+    np.savez(outFile, **columns)
+    return
+  import csv
+  with open(outFile, 'w', newline='') as out:
+    csvWrite = csv.writer(out)
+    csvWrite.writerow(['sample'] + list(columns))
+    for s in range(len(errors)):
+      csvWrite.writerow([s] + list(columns[key][s] for key in columns))
+
+# stand-alone plugin and container of each batch worker process
+_batchWorker = None
+
+def _initBatchWorker(xmlFile, cacheDir=None, store=None):
+  """
+    Loads the economics input once in a batch worker process
+    @ In, xmlFile, str, XML CashFlow input file name
+    @ In, cacheDir, str, optional, directory of cached parsed models
+    @ In, store, str, optional, SQLite file of sample results
+    @ Out, None
+  """
+  global _batchWorker
+  _batchWorker = loadStandalone(xmlFile, cacheDir=cacheDir, store=store)
+
+def _evaluateChunk(chunk):
+  """
+    Evaluates a chunk of samples in a batch worker process, all at once if possible, otherwise one by one
+    @ In, chunk, dict, variable name: np.array with the samples of the chunk along the first axis
+    @ Out, results, dict, indicator name: np.array of values, one per sample in the chunk
+    @ Out, errors, list, error message for each sample, or None if it was evaluated
+  """
+  _, container = _batchWorker
+  numSamples = len(next(iter(chunk.values())))
+  try:
+    metrics = main.runBatch(container._globalSettings, container._components, chunk, plan=container._plan)
+    results = dict((ind, np.broadcast_to(metrics[ind], (numSamples,)).astype(float)) for ind in STANDALONE_INDICATORS if ind in metrics)
+    return results, [None] * numSamples
+  except (IOError, RuntimeError, ValueError) as e:
+    # invalid samples, while other errors are bugs and stop the run
+    print(f'CashFlow WARNING (Run as Code): evaluating {numSamples} samples at once failed ({type(e).__name__}: {e}), ' +\
+          'evaluating them one by one')
+  # find out which samples fail
+  results = {}
+  errors = []
+  for s in range(numSamples):
+    try:
+      metrics = main.run(container._globalSettings, container._components,
+                         dict((key, np.atleast_1d(val[s])) for key, val in chunk.items()), plan=container._plan)
+      errors.append(None)
+    except Exception as e:
+      metrics = {}
+      errors.append(f'{type(e).__name__}: {e}')
+    for ind in STANDALONE_INDICATORS:
+      if ind in metrics:
+        results.setdefault(ind, np.full(numSamples, np.nan))[s] = metrics[ind]
+  return results, errors
+
+def runSampleTable(xmlFile, tableFile, outFile, jobs=None, cacheDir=None, store=None):
+  """
+    Evaluates a table of variable sets across a pool of processes, each with the economics input
+    loaded once, and writes the indicators of all samples to one table, in sample order
+    @ In, xmlFile, str, XML CashFlow input file name
+    @ In, tableFile, str, CSV or NPZ file with one variable set per sample
+    @ In, outFile, str, CSV or NPZ output file name
+    @ In, jobs, int, optional, number of processes (default: number of CPUs)
+    @ In, cacheDir, str, optional, directory of cached parsed models
+    @ In, store, str, optional, SQLite file of sample results; the samples found in it are not evaluated again,
+      and the evaluated ones are added, so an interrupted run can be resumed
+    @ Out, None
+  """
+  from concurrent.futures import ProcessPoolExecutor
+  if cacheDir is not None:
+    # parse (or check) the cached model once, so the workers all find it
+    loadStandalone(xmlFile, cacheDir=cacheDir)
+  variables = readSampleTable(tableFile)
+  numSamples = len(next(iter(variables.values())))
+  jobs = jobs or os.cpu_count() or 1
+  # a few chunks per process balance the load, while each chunk is still evaluated in one batch
+  chunkSize = max(1, -(-numSamples // (4 * jobs)))
+  chunks = list(dict((key, val[start:start+chunkSize]) for key, val in variables.items())
+                for start in range(0, numSamples, chunkSize))
+  print(f"CashFlow INFO (Run as Code): Evaluating {numSamples} samples in {len(chunks)} chunks on {jobs} processes")
+  results = {}
+  errors = []
+  with ProcessPoolExecutor(max_workers=jobs, initializer=_initBatchWorker, initargs=(xmlFile, cacheDir, store)) as pool:
+    # map keeps the chunks in order
+    for c, (chunkResults, chunkErrors) in enumerate(pool.map(_evaluateChunk, chunks)):
+      for ind, values in chunkResults.items():
+        results.setdefault(ind, np.full(numSamples, np.nan))[c*chunkSize:c*chunkSize+len(chunkErrors)] = values
+      errors.extend(chunkErrors)
+  for s, error in enumerate(errors):
+    if error is not None:
+      print(f"CashFlow WARNING (Run as Code): Sample {s} failed: {error}")
+  results = dict((ind, results[ind]) for ind in STANDALONE_INDICATORS if ind in results)
+  writeResultTable(outFile, results, errors)
 
-#################################
-# Run the plugin in stand alone #
-#################################
 def TEALmain():
   """ run TEAL in standalone """
-  # emulate RAVEN container
-  class FakeSelf:
-    """
-      Mimics RAVEN variable holder
-    """
-    def __init__(self):
-      """
-        Constructor.
-        @ In, None
-        @ Out, None
-      """
-      pass
-  import xml.etree.ElementTree as ET
   import argparse
   import csv
   # read and process input arguments
   # ================================
   inpPar = argparse.ArgumentParser(description = 'Run RAVEN CashFlow plugin as stand-alone code')
   inpPar.add_argument('-iXML', nargs=1, required=True, help='XML CashFlow input file name', metavar='inp_file')
-  inpPar.add_argument('-iINP', nargs=1, required=True, help='CashFlow input file name with the input variable list', metavar='inp_file')
-  inpPar.add_argument('-o', nargs=1, required=True, help='Output file name', metavar='out_file')
+  inpPar.add_argument('-iINP', nargs=1, help='CashFlow input file name with the input variable list', metavar='inp_file')
+  inpPar.add_argument('-o', nargs=1, help='Output file name', metavar='out_file')
+  inpPar.add_argument('--worker', action='store_true',
+                      help='Keep running, reading one JSON variable record per line from stdin (or --port) and '+\
+                           'writing one JSON result record per line, instead of using -iINP and -o')
+  inpPar.add_argument('--port', type=int, help='With --worker, serve the records on this local TCP port instead of stdin/stdout')
+  inpPar.add_argument('--batch', nargs=1, help='CSV or NPZ table with one variable set per sample, evaluated in '+\
+                      'parallel instead of -iINP; the output file gets one row per sample', metavar='table_file')
+  inpPar.add_argument('--jobs', type=int, help='With --batch, number of processes (default: number of CPUs)')
+  inpPar.add_argument('--cache', nargs=1, help='Directory in which to store the parsed XML input, so later runs '+\
+                      'of the same input skip reading it again', metavar='cache_dir')
+  inpPar.add_argument('--store', nargs=1, help='SQLite file in which to keep the results of the evaluated samples, '+\
+                      'so a rerun (e.g. after a crash) only evaluates the samples not found in it', metavar='store_file')
   inpOpt = inpPar.parse_args()
+  if inpOpt.worker and inpOpt.batch is not None:
+    inpPar.error('--worker and --batch cannot be used together')
+  if not inpOpt.worker and ((inpOpt.iINP is None and inpOpt.batch is None) or inpOpt.o is None):
+    inpPar.error('the following arguments are required: -iINP (or --batch), -o (unless --worker is used)')
 
   # check if files exist
+  if not os.path.exists(inpOpt.iXML[0]) :
+    raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : XML input file " + inpOpt.iXML[0] + " does not exist.. " + '\033[0m')
+  cacheDir = None if inpOpt.cache is None else inpOpt.cache[0]
+  store = None if inpOpt.store is None else inpOpt.store[0]
+
+  if inpOpt.worker:
+    # the deck is only loaded once, then each record only pays for its own evaluation
+    import contextlib
+    print("CashFlow INFO (Run as Code): XML input file: %s" %inpOpt.iXML[0], file=sys.stderr)
+    # stdout may be the record stream, so messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+      myCashFlow, myContainer = loadStandalone(inpOpt.iXML[0], cacheDir=cacheDir, store=store)
+    if inpOpt.port is None:
+      serveRecords(myCashFlow, myContainer, sys.stdin, sys.stdout)
+    else:
+      serveSocket(myCashFlow, myContainer, inpOpt.port)
+    return 0
+
+  if inpOpt.batch is not None:
+    if not os.path.exists(inpOpt.batch[0]):
+      raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : Batch input file " + inpOpt.batch[0] + " does not exist.. " + '\033[0m')
+    print("CashFlow INFO (Run as Code): XML input file: %s" %inpOpt.iXML[0])
+    print("CashFlow INFO (Run as Code): Batch input file: %s" %inpOpt.batch[0])
+    print("CashFlow INFO (Run as Code): Output file: %s" %inpOpt.o[0])
+    runSampleTable(inpOpt.iXML[0], inpOpt.batch[0], inpOpt.o[0], jobs=inpOpt.jobs, cacheDir=cacheDir, store=store)
+    return 0
+
   print ("CashFlow INFO (Run as Code): XML input file: %s" %inpOpt.iXML[0])
   print ("CashFlow INFO (Run as Code): Variable input file: %s" %inpOpt.iINP[0])
   print ("CashFlow INFO (Run as Code): Output file: %s" %inpOpt.o[0])
-  if not os.path.exists(inpOpt.iXML[0]) :
-    raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : XML input file " + inpOpt.iXML[0] + " does not exist.. " + '\033[0m')
   if not os.path.exists(inpOpt.iINP[0]) :
     raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : Variable input file " + inpOpt.iINP[0] + " does not exist.. " + '\033[0m')
   if os.path.exists(inpOpt.o[0]) :
@@ -158,25 +501,12 @@ def TEALmain():
 
   # Initialise run
   # ================================
-  # create a CashFlow class instance
-  myCashFlow = CashFlow()
-  # read the XML input file inpOpt.iXML[0]
-  myContainer = FakeSelf()
-  notroot = ET.parse(open(inpOpt.iXML[0], 'r')).getroot()
-  root = ET.Element('ROOT')
-  root.append(notroot)
-  myCashFlow._readMoreXML(myContainer, root)
-  myCashFlow.initialize(myContainer, {}, [])
+  # create a CashFlow class instance and read the XML input file inpOpt.iXML[0]
+  myCashFlow, myContainer = loadStandalone(inpOpt.iXML[0], cacheDir=cacheDir, store=store)
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): XML input read ")
   # read the values from input file into dictionary inpOpt.iINP[0]
-  myInputs = {}
-  with open(inpOpt.iINP[0]) as f:
-    for l in f:
-      if l.strip().startswith("#") or not len(l.strip()):
-        continue
-      (key, val) = l.split(' ', 1)
-      myInputs[key] = np.array([float(n) for n in val.split(",")])
+  myInputs = readVariableFile(inpOpt.iINP[0])
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): Variable input read ")
   #if Myverbosity < 1:
@@ -186,19 +516,17 @@ def TEALmain():
   # ================================
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): Running the code")
-  myCashFlow.run(myContainer, myInputs)
+  outDict = evaluateStandalone(myCashFlow, myContainer, myInputs)
 
   # create output file
   # ================================
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): Writing output file")
-  outDict = {}
-  for indicator in ['NPV_mult', 'NPV', 'IRR', 'PI']:
-    try:
-      outDict[indicator] = getattr(myContainer, indicator)
+  for indicator in STANDALONE_INDICATORS:
+    if indicator in outDict:
       #if Myverbosity < 2:
       print("CashFlow INFO (Run as Code): %s written to file" %indicator)
-    except (KeyError, AttributeError):
+    else:
       #if Myverbosity < 2:
       print("CashFlow INFO (Run as Code): %s not found" %indicator)
   with open(inpOpt.o[0], 'w') as out:
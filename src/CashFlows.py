@@ -19,7 +19,6 @@
 Defines the Economics entity.
 Each component (or source?) can have one of these to describe its economics.
 """
-import sys
 import xml.etree.ElementTree as ET
 import itertools as it
 from collections import defaultdict
@@ -29,15 +28,10 @@ import numpy as np
 from . import Amortization
 from . import _utils as tutils
 
-# load RAVEN if available (e.g. pip-installed), otherwise add to env
-try:
-  import ravenframework
-except ModuleNotFoundError:
-  loc = tutils.get_raven_loc()
-  sys.path.append(loc)
-
-from ravenframework.utils import mathUtils
-from ravenframework.utils import InputData, InputTypes, TreeStructure, xmlUtils
+# RAVEN is only needed to read input specs, so the cash flow calculations can be used without it
+InputData = tutils.LazyRavenModule('ravenframework.utils.InputData')
+InputTypes = tutils.LazyRavenModule('ravenframework.utils.InputTypes')
+TreeStructure = tutils.LazyRavenModule('ravenframework.utils.TreeStructure')
 
 class GlobalSettings:
   """
@@ -86,6 +80,19 @@ class GlobalSettings:
     input_specs.addSub(InputData.parameterInputFactory('Output', contentType=InputTypes.BoolType,
                           descr = r"""\textbf{Optional input}. Choose 'True' for a detailed output or 'False' for a simple output. You must create a seperate output file in RAVEN to use this feature. The variables must use specific names.
                           Create a variable called 'ComponentName_CashFlowName' for each component. If MACRS depreciation is used, add variables 'ComponentName_Depreciate' and 'ComponentName_Amortize'. See User Guide for further details. Default setting is False."""))
+    input_specs.addSub(InputData.parameterInputFactory('PeriodicEvaluation', contentType=InputTypes.BoolType,
+                          descr = r"""\textbf{Optional input}. Only applicable if \xmlNode{ProjectTime} is not given, in which case the project time is the LCM of all component lifetimes
+                          and each component is rebuilt periodically until the end of the project. If 'True', the NPV of a single lifetime of each component is computed and the
+                          repeated rebuilds are summed with a geometric series in the discount and inflation factors, so no project-length cash flows are ever created.
+                          This bounds the memory and time needed by the component lifetimes instead of their LCM. Only the \textbf{NPV}, \textbf{NPV\_search}, and \textbf{PI}
+                          indicators are available in this mode, and \xmlNode{Output} cannot be used. Default setting is False."""))
+    input_specs.addSub(InputData.parameterInputFactory('ResultCache', contentType=InputTypes.IntegerType,
+                          descr = r"""\textbf{Optional input}. If given, the results of the last evaluated samples are kept, up to this number of samples,
+                          and a sample whose variables used by the active cash flows are all equal to those of a kept sample returns its results instead of
+                          being evaluated again (e.g. when a sampler revisits points). Variables the cash flows don't use are ignored. Default is no cache."""))
+    input_specs.addSub(InputData.parameterInputFactory('TableFile', contentType=InputTypes.StringType,
+                          descr = r"""\textbf{Optional input}. File to which the per-year tables of the most verbose levels are appended, instead of
+                          being printed. By default, the tables are printed."""))
 
     return input_specs
 
@@ -107,6 +114,9 @@ class GlobalSettings:
     self._metricTarget = None
     self._components = []
     self._outputType = None
+    self._periodic = False
+    self._resultCache = None
+    self._tableFile = None
 
   def readInput(self, source):
     """
@@ -133,6 +143,12 @@ class GlobalSettings:
         self._projectTime = val + 1 # one for the construction year!
       elif name == 'Output':
         self._outputType = val
+      elif name == 'PeriodicEvaluation':
+        self._periodic = val
+      elif name == 'ResultCache':
+        self._resultCache = val
+      elif name == 'TableFile':
+        self._tableFile = val
       elif name == 'Indicator':
         self._indicators = node.parameterValues['name']
         self._metricTarget = node.parameterValues.get('target', None)
@@ -161,6 +177,12 @@ class GlobalSettings:
         self._inflation_rate = val
       elif name == 'Output':
         self._outputType = val
+      elif name == 'PeriodicEvaluation':
+        self._periodic = val
+      elif name == 'ResultCache':
+        self._resultCache = val
+      elif name == 'TableFile':
+        self._tableFile = val
       elif name == 'ProjectTime':
         self._projectTime = val + 1 # one for the construction year!
       elif name == 'Indicator':
@@ -199,6 +221,15 @@ class GlobalSettings:
     for ind in self._indicators:
       if ind not in ['NPV_search', 'NPV', 'IRR', 'PI']:
         raise IOError('Unrecognized indicator type: "{}"'.format(ind))
+    if self._periodic:
+      if self._projectTime is not None:
+        raise IOError('<PeriodicEvaluation> requires the project time to be the LCM of component lifetimes, but <ProjectTime> was given!')
+      if 'IRR' in self._indicators:
+        raise IOError('The "IRR" indicator is not available with <PeriodicEvaluation>!')
+      if self._outputType:
+        raise IOError('<Output> is not available with <PeriodicEvaluation>, since no project-length cash flows are created!')
+    if self._resultCache is not None and self._resultCache < 1:
+      raise IOError(f'<ResultCache> must keep at least one sample, but got {self._resultCache}!')
 
   #######
   # API #
@@ -267,6 +298,30 @@ class GlobalSettings:
     """
     return self._outputType
 
+  def getPeriodicEvaluation(self):
+    """
+      Get whether the periodic (closed-form) evaluation is requested
+      @ In, None
+      @ Out, self._periodic, bool, True if periodic evaluation should be used
+    """
+    return self._periodic
+
+  def getResultCache(self):
+    """
+      Get the number of sample results to keep
+      @ In, None
+      @ Out, self._resultCache, int, size of the result cache, or None if there is no cache
+    """
+    return self._resultCache
+
+  def getTableFile(self):
+    """
+      Get the file the verbose per-year tables are written to
+      @ In, None
+      @ Out, self._tableFile, str, file name, or None for the default one
+    """
+    return self._tableFile
+
   def getVerbosity(self):
     """
       Set verbosity level
@@ -851,13 +906,13 @@ class CashFlow:
     if len(value) == 1:
       # single entry should be either a float (price) or string (raven variable)
       value = value[0]
-      if mathUtils.isAString(value) or mathUtils.isAFloatOrInt(value):
+      if tutils.isAString(value) or tutils.isAFloatOrInt(value):
         ret = value
       else:
         raise IOError(f'Unrecognized alpha/driver type: "{value}" with type "{type(value)}"')
     else:
       # should be floats; InputData assures the entries are the same type already
-      if not mathUtils.isAFloatOrInt(value[0]):
+      if not tutils.isAFloatOrInt(value[0]):
         raise IOError(f'Multiple non-number entries for alpha/driver found, but require either a single variable name or multiple float entries: {value}')
       ret = np.asarray(value)
     return ret
@@ -873,7 +928,7 @@ class CashFlow:
     """
     # load variable values from variables or other cash flows, as needed (ha!)
     for name, source in need.items():
-      if mathUtils.isAString(source):
+      if tutils.isAString(source):
         # as a string, this is either from the variables or other cashflows
         # look in variables first
         value = variables.get(source, None)
@@ -1064,13 +1119,19 @@ class Capex(CashFlow):
     # for capex, both the Driver and Alpha are nonzero in year 1 and zero thereafter
     for name, value in toExtend.items():
       if name.lower() in ['alpha', 'driver']:
-        if mathUtils.isAFloatOrInt(value):
+        if isinstance(value, np.ndarray) and value.ndim > 1:
+          # batched values carry a leading sample axis; single entries are the construction year value
+          if value.shape[-1] == 1:
+            new = np.zeros(value.shape[:-1] + (t,), dtype=value.dtype)
+            new[..., 0] = value[..., 0]
+            toExtend[name] = new
+        elif tutils.isAFloatOrInt(value):
           new = np.zeros(t)
           new[0] = float(value)
           toExtend[name] = new
         elif isinstance(value, (list, np.ndarray)):
           if len(value) == 1:
-            if mathUtils.isAFloatOrInt(value[0]):
+            if tutils.isAFloatOrInt(value[0]):
               new = np.zeros(t)
               new[0] = float(value)
               toExtend[name] = new
@@ -1115,8 +1176,10 @@ class Capex(CashFlow):
     mult = self.getMultiplier()
     if mult is None:
       mult = 1.0
-    elif mathUtils.isAString(mult):
-      mult = float(variables[mult])
+    elif tutils.isAString(mult):
+      mult = variables[mult]
+      # batched multipliers keep their sample axis, otherwise a single float is expected
+      mult = np.asarray(mult, dtype=float) if np.ndim(mult) > 1 else float(np.ravel(mult)[0])
     result = mult * alpha * (driver / reference) ** scale
     if verbosity > 1:
       ret = {'result': result}
@@ -1129,6 +1192,36 @@ class Capex(CashFlow):
              'mult': mult}
     return ret
 
+  def calculateDerivatives(self, variables, lifetimeCashflows, lifetime, derivatives):
+    """
+      Propagates derivatives with respect to the variables through m * alpha * (D/D')^X
+      @ In, variables, dict, the dict of parameters that is provided from other sources
+      @ In, lifetimeCashflows, dict, dict of cashflows
+      @ In, lifetime, int, the given life time
+      @ In, derivatives, dict, parameter ("alpha", "driver" or "mult"): variable name: np.array, derivatives of the
+        parameter as provided (before extending it to the lifetime), with one entry per variable entry along the first axis
+      @ Out, result, dict, variable name: np.array, derivatives of the lifetime cashflow, same layout
+    """
+    parts = self.calculateCashflow(variables, lifetimeCashflows, lifetime, 0)
+    alpha = parts['alpha']
+    mult = parts['mult']
+    reference = parts['reference']
+    scale = parts['scale']
+    ratio = parts['driver'] / reference
+    result = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+      partials = {'alpha': mult * ratio ** scale,
+                  'driver': mult * alpha * scale * ratio ** (scale - 1.0) / reference,
+                  'mult': alpha * ratio ** scale}
+      for param, paramDerivatives in derivatives.items():
+        for name, deriv in paramDerivatives.items():
+          if param != 'mult':
+            deriv = self.extendParameters({param: deriv}, lifetime)[param]
+          # years the parameter does not change don't contribute, even if the partial is not finite there (D = 0)
+          term = np.where(deriv != 0, partials[param] * deriv, 0.0)
+          result[name] = result[name] + term if name in result else term
+    return result
+
   def checkParamLengths(self, lifetime, compName=None):
     """
       Check the length of some parameters
@@ -1139,7 +1232,7 @@ class Capex(CashFlow):
     for param in ['alpha', 'driver']:
       val = self.getParam(param)
       # if a string, then it's probably a variable, so don't check it now
-      if mathUtils.isAString(val):
+      if tutils.isAString(val):
         continue
       # if it's valued, then it better be the same length as the lifetime (which is comp lifetime + 1)
       elif len(val) != lifetime:
@@ -1189,7 +1282,7 @@ class Recurring(CashFlow):
     else:
       self._yearlyCashflow = np.zeros(lifetime+1, dtype=object)
 
-  def computeIntrayearCashflow(self, year, alpha, driver):
+  def computeIntrayearCashflow(self, year, alpha, driver, weights=None):
     """
       Computes the yearly summary of recurring interactions, and sets them to self._yearlyCashflow
       Use this when you need to collapse a year's worth of activity to a single year point
@@ -1197,19 +1290,136 @@ class Recurring(CashFlow):
       @ In, year, int, the index of the project year for this summary
       @ In, alpha, np.array, array of "prices" (all entries WITHIN one year [e.g. hourly])
       @ In, driver, np.array, array of "quantities sold" (all entries WITHIN one year [e.g. hourly])
+      @ In, weights, np.array, optional, number of times each entry occurs in the year, e.g. for the hours of
+        representative days (broadcast against alpha and driver)
       @ Out, None
     """
     mult = self.getMultiplier()
     if mult is None:
       mult = 1.0
-    elif mathUtils.isAString(mult):
+    elif tutils.isAString(mult):
       raise NotImplementedError
     try:
-      self._yearlyCashflow[year] = mult * (alpha * driver).sum() # +1 is for initial construct year
+      values = alpha * driver if weights is None else alpha * driver * weights
+      self._yearlyCashflow[year] = mult * values.sum() # +1 is for initial construct year
     except ValueError as e:
       print(f'Error while computing yearly cash flow! Check alpha shape ({alpha.shape}) and driver shape ({driver.shape})')
       raise e
 
+  def computeIntrayearCashflows(self, alpha, driver, offsets=None, firstYear=0, weights=None, clusterMap=None):
+    """
+      Computes the yearly summaries of recurring interactions for consecutive years at once, and sets them to
+      self._yearlyCashflow; the same as calling computeIntrayearCashflow for each year, without a Python loop
+      @ In, alpha, np.array, array of "prices", either with shape (years, entries WITHIN one year [e.g. hourly])
+        or, with offsets, flat with the entries of all years one after the other; a single value, or a single
+        year of entries in the (years, entries) form, is used for all years
+      @ In, driver, np.array, array of "quantities sold", same layout as alpha
+      @ In, offsets, np.array, optional, index of the first flat entry of each year (entries of a year run
+        until the next offset, the last year until the end)
+      @ In, firstYear, int, optional, the index of the project year for the first summarized year
+      @ In, weights, np.array, optional, number of times each entry occurs, e.g. for the hours of representative
+        days (broadcast against alpha and driver)
+      @ In, clusterMap, np.array, optional, with shape (years, periods), number of times each representative
+        period occurs in each year; alpha and driver then hold the periods instead of the years, and each
+        yearly summary is the sum of its periods
+      @ Out, None
+    """
+    mult = self.getMultiplier()
+    if mult is None:
+      mult = 1.0
+    elif tutils.isAString(mult):
+      raise NotImplementedError
+    factors = list(np.asarray(value) for value in (alpha, driver, weights) if value is not None)
+    try:
+      if offsets is None and all(factor.dtype != object for factor in factors):
+        subscripts = ','.join(['...i'] * len(factors)) + '->...'
+        totals = np.einsum(subscripts, *np.broadcast_arrays(*factors))
+      else:
+        # expressions (e.g. Pyomo) are summed term by term
+        values = factors[0]
+        for factor in factors[1:]:
+          values = values * factor
+        if offsets is None:
+          totals = values.sum(axis=-1)
+        else:
+          offsets = np.asarray(offsets, dtype=int)
+          # years without entries at the end start past the last entry, which reduceat does not accept
+          inside = offsets < np.size(values)
+          totals = np.zeros(len(offsets), dtype=values.dtype)
+          if inside.any():
+            totals[inside] = np.add.reduceat(values, offsets[inside])
+          # reduceat gives the entry at the offset for a year without entries, instead of nothing
+          empty = np.diff(offsets, append=np.size(values)) == 0
+          if empty.any():
+            totals[empty] = 0
+      if clusterMap is not None:
+        clusterMap = np.asarray(clusterMap, dtype=object if totals.dtype == object else float)
+        totals = clusterMap @ totals
+    except (ValueError, IndexError) as e:
+      print(f'Error while computing yearly cash flows! Check alpha shape ({np.shape(alpha)}), driver shape ({np.shape(driver)})'
+            f', weights shape ({np.shape(weights)}) and cluster map shape ({np.shape(clusterMap)})')
+      raise e
+    self._yearlyCashflow[firstYear:firstYear + len(totals)] = mult * totals
+
+  def accumulateIntrayearCashflow(self, year, alpha, driver):
+    """
+      Adds a chunk of intrayear (e.g. hourly) activity to the yearly summaries in self._yearlyCashflow, so
+      that a year can be given in several pieces instead of all at once as for computeIntrayearCashflow;
+      the yearly summaries start from zero after initParams
+      @ In, year, int or np.array, the index of the project year for the whole chunk, or for each entry of it
+      @ In, alpha, np.array, array of "prices" (entries of the chunk)
+      @ In, driver, np.array, array of "quantities sold" (entries of the chunk)
+      @ Out, None
+    """
+    mult = self.getMultiplier()
+    if mult is None:
+      mult = 1.0
+    elif tutils.isAString(mult):
+      raise NotImplementedError
+    try:
+      values = np.asarray(alpha) * np.asarray(driver)
+      if np.ndim(year) == 0:
+        self._yearlyCashflow[year] += mult * values.sum()
+        return
+      year = np.asarray(year, dtype=int)
+      values = np.broadcast_to(values, year.shape)
+      if not year.size:
+        # an empty chunk adds nothing
+        return
+      # entries of the same year are usually contiguous, so each run of them is summed at once
+      starts = np.flatnonzero(np.diff(year, prepend=year[:1] - 1))
+      totals = np.add.reduceat(values, starts)
+    except ValueError as e:
+      print(f'Error while accumulating yearly cash flow! Check year shape ({np.shape(year)}), alpha shape ({np.shape(alpha)}) and driver shape ({np.shape(driver)})')
+      raise e
+    np.add.at(self._yearlyCashflow, year[starts], mult * totals)
+
+  def accumulateIntrayearChunks(self, chunks):
+    """
+      Adds successive chunks of intrayear activity to the yearly summaries, see accumulateIntrayearCashflow
+      @ In, chunks, iterable, (year, alpha, driver) for each chunk, e.g. from a generator or intrayearChunks
+      @ Out, None
+    """
+    for year, alpha, driver in chunks:
+      self.accumulateIntrayearCashflow(year, alpha, driver)
+
+  @staticmethod
+  def intrayearChunks(year, alpha, driver, chunkSize=1048576):
+    """
+      Splits flat intrayear data into chunks, reading only one chunk at a time from memory-mapped arrays
+      @ In, year, int or np.array or str, the index of the project year of all entries, or of each entry
+      @ In, alpha, float or np.array or str, "prices", one value for all entries or one per entry
+      @ In, driver, float or np.array or str, "quantities sold", one value for all entries or one per entry
+      @ In, chunkSize, int, optional, number of entries per chunk
+      @ Out, chunks, generator, (year, alpha, driver) for each chunk
+    """
+    # a .npy file name is opened as a memory-mapped array, so it is never loaded at once
+    data = list(np.load(value, mmap_mode='r') if tutils.isAString(value) else value for value in (year, alpha, driver))
+    size = max(np.size(value) for value in data)
+    for start in range(0, size, chunkSize):
+      # copy the chunk out of the memory map, leaving single values as they are
+      yield tuple(np.array(value[start:start+chunkSize]) if np.ndim(value) else value for value in data)
+
   def computeYearlyCashflow(self, alpha, driver):
     """
       Computes the yearly summary of recurring interactions, and sets them to self._yearlyCashflow
@@ -1223,7 +1433,7 @@ class Recurring(CashFlow):
     mult = self.getMultiplier()
     if mult is None:
       mult = 1.0
-    elif mathUtils.isAString(mult):
+    elif tutils.isAString(mult):
       raise NotImplementedError
     try:
       self._yearlyCashflow = mult * (alpha * driver)
@@ -1251,6 +1461,32 @@ class Recurring(CashFlow):
     #assert self._yearlyCashflow is not None
     return {'result': self._yearlyCashflow}
 
+  def calculateDerivatives(self, variables, lifetimeCashflows, lifetime, derivatives):
+    """
+      Propagates derivatives with respect to the variables through m * alpha * D
+      @ In, variables, dict, the dict of parameters that is provided from other sources
+      @ In, lifetimeCashflows, dict, dict of cashflows
+      @ In, lifetime, int, the given life time
+      @ In, derivatives, dict, parameter ("alpha" or "driver"): variable name: np.array, derivatives of the
+        parameter as provided (before extending it to the lifetime), with one entry per variable entry along the first axis
+      @ Out, result, dict, variable name: np.array, derivatives of the lifetime cashflow, same layout
+    """
+    # yearly cash flows given directly don't depend on the variables
+    if self.getParam('alpha') is None:
+      return {}
+    need = {'alpha': self.getParam('alpha'), 'driver': self.getParam('driver')}
+    need = self.loadFromVariables(need, variables, lifetimeCashflows, lifetime)
+    mult = self.getMultiplier()
+    if mult is None:
+      mult = 1.0
+    partials = {'alpha': mult * need['driver'], 'driver': mult * need['alpha']}
+    result = {}
+    for param, paramDerivatives in derivatives.items():
+      for name, deriv in paramDerivatives.items():
+        term = partials[param] * self.extendParameters({param: deriv}, lifetime)[param]
+        result[name] = result[name] + term if name in result else term
+    return result
+
   def checkParamLengths(self, lifetime, compName=None):
     """
       Check the length of some parameters
@@ -1271,13 +1507,24 @@ class Recurring(CashFlow):
     # FIXME: we're going to integrate alpha * D over time (not year time, intrayear time)
     for name, value in toExtend.items():
       if name.lower() in ['alpha', 'driver']:
-        if mathUtils.isAFloatOrInt(value):
+        if isinstance(value, np.ndarray) and value.ndim > 1:
+          # batched values carry a leading sample axis; extend along the last (year) axis
+          if value.shape[-1] == 1:
+            new = np.ones(value.shape[:-1] + (t,), dtype=value.dtype) * value
+            new[..., 0] = 0
+            toExtend[name] = new
+          elif value.shape[-1] != t:
+            new = np.zeros(value.shape[:-1] + (t,), dtype=value.dtype)
+            # cycle through entries starting from 1 since recurring cfs are 0 in year 0
+            new[..., 1:] = value[..., 1 + np.arange(t - 1) % (value.shape[-1] - 1)]
+            toExtend[name] = new
+        elif tutils.isAFloatOrInt(value):
           new = np.ones(t) * float(value)
           new[0] = 0
           toExtend[name] = new
         elif isinstance(value, (list, np.ndarray)):
           if len(value) == 1:
-            if mathUtils.isAFloatOrInt(value[0]):
+            if tutils.isAFloatOrInt(value[0]):
               new = np.ones(t) * float(value)
               new[0] = 0
               toExtend[name] = new
@@ -1326,7 +1573,7 @@ class Amortizor(Capex):
       self._is_credit = kwargs['credit']
     except KeyError as e:
       raise RuntimeError('ERROR setting up TEAL Amortizor CashFlow: requires "credit" keyword but not found!') from e
-    assert mathUtils.isABoolean(self._is_credit)
+    assert tutils.isABoolean(self._is_credit)
     Capex.__init__(self, **kwargs)
 
   def extendParameters(self, toExtend, t):
@@ -1341,12 +1588,12 @@ class Amortizor(Capex):
     driver = toExtend['driver']
     # how we treat the driver depends on if this is the amortizer or the depreciator
     if self._is_credit:
-      if not mathUtils.isAString(driver):
-        toExtend['driver'] = np.ones(t) * driver[0] * -1.0
-        toExtend['driver'][0] = 0.0
+      if not tutils.isAString(driver):
+        toExtend['driver'] = np.ones(t) * driver[..., 0:1] * -1.0
+        toExtend['driver'][..., 0] = 0.0
       for name, value in toExtend.items():
         if name.lower() in ['driver']:
-          if mathUtils.isAFloatOrInt(value) or (len(value) == 1 and mathUtils.isAFloatOrInt(value[0])):
+          if tutils.isAFloatOrInt(value) or (len(value) == 1 and tutils.isAFloatOrInt(value[0])):
             new = np.zeros(t)
             new[1:] = float(value)
             toExtend[name] = new
@@ -16,9 +16,15 @@
 """
   utilities for use within TEAL
 """
+import sys
+import itertools
+import importlib
+import collections
 import xml.etree.ElementTree as ET
 from os import path
 
+import numpy as np
+
 def get_raven_loc():
   """
     Return RAVEN location
@@ -38,3 +44,118 @@ def get_raven_loc():
   # ravenframework. We will expect '.ravenconfig.xml' to point to
   # raven/ravenframework always, so this is why we grab the parent dir.
   return path.abspath(path.dirname(loc.text))
+
+#=====================
+# RAVEN LOADING
+#=====================
+def importRaven(name):
+  """
+    Imports a RAVEN module, adding RAVEN to the path first if it is not installed
+    @ In, name, str, full name of the module, e.g. "ravenframework.utils.InputData"
+    @ Out, module, module, imported module
+  """
+  try:
+    import ravenframework
+  except ModuleNotFoundError:
+    sys.path.append(get_raven_loc())
+  return importlib.import_module(name)
+
+class LazyRavenModule:
+  """
+    Stands in for a RAVEN module that is only imported when first used (e.g. to read XML input),
+    so the cash flow calculations can be imported and run without RAVEN.
+  """
+  def __init__(self, name):
+    """
+      Constructor.
+      @ In, name, str, full name of the module, e.g. "ravenframework.utils.InputData"
+      @ Out, None
+    """
+    self._name = name
+    self._module = None
+
+  def __getattr__(self, attr):
+    """
+      Gets an attribute of the module, importing it if needed
+      @ In, attr, str, attribute name
+      @ Out, value, object, module attribute
+    """
+    if self._module is None:
+      self._module = importRaven(self._name)
+    return getattr(self._module, attr)
+
+#=====================
+# TYPE CHECKING
+#=====================
+# same conventions as ravenframework.utils.mathUtils
+def isAString(val):
+  """
+    Determine if a string value (by traditional standards).
+    @ In, val, object, check
+    @ Out, isAString, bool, result
+  """
+  return isinstance(val, str)
+
+def isABoolean(val):
+  """
+    Determine if a boolean value (by traditional standards).
+    @ In, val, object, check
+    @ Out, isABoolean, bool, result
+  """
+  return isinstance(val, (bool, np.bool_))
+
+def isAFloatOrInt(val, nanOk=True):
+  """
+    Determine if a float or integer value (booleans excluded)
+    @ In, val, object, check
+    @ In, nanOk, bool, optional, if True then NaN and inf are acceptable
+    @ Out, isAFloatOrInt, bool, result
+  """
+  if isABoolean(val):
+    return False
+  if isinstance(val, (int, np.integer)):
+    return True
+  if isinstance(val, (float, np.number)):
+    return nanOk or bool(np.isfinite(val))
+  return False
+
+def isSingleValued(val, nanOk=True):
+  """
+    Determine if a single-entry value (by traditional standards).
+    Single entries include strings, numbers, NaN, inf, None, and zero-d numpy arrays of them
+    @ In, val, object, check
+    @ In, nanOk, bool, optional, if True then NaN and inf are acceptable
+    @ Out, isSingleValued, bool, result
+  """
+  if isinstance(val, np.ndarray) and val.shape == ():
+    val = val.item()
+  return isAFloatOrInt(val, nanOk=nanOk) or isABoolean(val) or isAString(val) or (val is None)
+
+#=====================
+# GRAPHS
+#=====================
+def topologicalSort(graph):
+  """
+    Orders the nodes of a directed acyclic graph so every node comes after all the nodes pointing to it.
+    Among nodes that are ready at the same time, the order in which they appear in the graph is kept.
+    @ In, graph, dict, node: list of nodes it points to
+    @ Out, order, list, ordered nodes (including nodes only appearing as targets)
+  """
+  nodes = list(dict.fromkeys(itertools.chain(graph, itertools.chain.from_iterable(graph.values()))))
+  inDegree = dict.fromkeys(nodes, 0)
+  for targets in graph.values():
+    for target in targets:
+      inDegree[target] += 1
+  ready = collections.deque(node for node in nodes if inDegree[node] == 0)
+  order = []
+  while ready:
+    node = ready.popleft()
+    order.append(node)
+    for target in graph.get(node, []):
+      inDegree[target] -= 1
+      if inDegree[target] == 0:
+        ready.append(target)
+  if len(order) != len(nodes):
+    cyclic = list(node for node in nodes if inDegree[node] > 0)
+    raise RuntimeError(f'Circular dependency found between {cyclic}!')
+  return order
@@ -19,27 +19,46 @@
 Execution for TEAL (Tool for Economic AnaLysis)
 """
 
+import os
+import json
+import atexit
+import numbers
+import pickle
+import sqlite3
+import hashlib
+import tempfile
 import functools
+import threading
+import xml.etree.ElementTree as ET
 from collections import defaultdict, OrderedDict
+from collections.abc import Mapping
 
 import numpy as np
-import numpy_financial as npf
 
 from . import CashFlows
+from . import _utils as tutils
+
+# version of the cached model files written by readFromXml; bump it when the stored classes change
+MODEL_CACHE_VERSION = 1
 
-from ravenframework.utils.graphStructure import graphObject
-from ravenframework.utils import mathUtils
 
 #=====================
 # UTILITIES
 #=====================
-def readFromXml(xml):
+def readFromXml(xml, cacheDir=None):
   """
     reads in cash flow from XML
     @ In, xml, xml.etree.ElementTree.Element, "Economics" node from input
+    @ In, cacheDir, str, optional, if given then the parsed model is stored in (and reused from) this directory,
+      keyed by a hash of the XML, so repeated loads of the same input skip the input spec checks
     @ Out, globalSettings, CashFlows.GlobalSettings instance, settings for a run (None if none provided)
     @ Out, components, list, CashFlows.Components instances for a run
   """
+  if cacheDir is not None:
+    cacheFile = os.path.join(cacheDir, f'TEAL_model_{modelHash(xml)}.pkl')
+    model = _loadModel(cacheFile)
+    if model is not None:
+      return model
   # read in XML to global settings, component list
   attr = xml.attrib
   globalSettings = None
@@ -57,8 +76,54 @@ def readFromXml(xml):
       components.append(new)
     else:
       raise IOError(f'Unrecognized node under <Economics>: {node.tag}')
+  if cacheDir is not None:
+    _saveModel(cacheFile, (globalSettings, components))
   return globalSettings, components
 
+def modelHash(xml):
+  """
+    Hashes the XML of a cash flow model, as the key of its cached model
+    @ In, xml, xml.etree.ElementTree.Element, node containing the "Economics" node
+    @ Out, key, str, hex digest
+  """
+  sha = hashlib.sha256(f'TEAL model v{MODEL_CACHE_VERSION}'.encode())
+  sha.update(repr(sorted(xml.attrib.items())).encode())
+  sha.update(ET.tostring(xml.find('Economics')))
+  return sha.hexdigest()
+
+def _loadModel(cacheFile):
+  """
+    Loads a cached model, if there is a usable one
+    @ In, cacheFile, str, cached model file name
+    @ Out, model, tuple, (globalSettings, components) or None if not cached
+  """
+  if not os.path.isfile(cacheFile):
+    return None
+  try:
+    with open(cacheFile, 'rb') as f:
+      return pickle.load(f)
+  except Exception:
+    # unreadable (e.g. written by another TEAL version), so parse again and overwrite it
+    return None
+
+def _saveModel(cacheFile, model):
+  """
+    Stores a parsed model, replacing the file at once so concurrent readers never see a partial file
+    @ In, cacheFile, str, cached model file name
+    @ In, model, tuple, (globalSettings, components)
+    @ Out, None
+  """
+  cacheDir = os.path.dirname(cacheFile)
+  os.makedirs(cacheDir, exist_ok=True)
+  fd, tmpFile = tempfile.mkstemp(dir=cacheDir, suffix='.tmp')
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpFile, cacheFile)
+  except Exception:
+    os.remove(tmpFile)
+    raise
+
 def checkRunSettings(settings, components):
   """
     Checks that basic settings between global and components are satisfied.
@@ -96,92 +161,9 @@ def checkDrivers(settings, components, variables, v=100, pyomoVar=False):
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
     @ Out, ordered, list, list of ordered cashflows to evaluate (in order)
   """
-  m = 'checkDrivers'
-  #active = _get_active_drivers(settings, components)
-  active = list(comp for comp in components if comp.name in settings.getActiveComponents())
-  vprint(v, 0, m, '... creating evaluation sequence ...')
-  ordered = _createEvalProcess(active, variables, pyomoVar=pyomoVar)
-  vprint(v, 0, m, '... evaluation sequence:', ordered)
-  return ordered
-
-def _createEvalProcess(components, variables, pyomoVar=False):
-  """
-    Sorts the cashflow evaluation process so sensible evaluation order is used
-    @ In, components, list, list of CashFlows.Component instances
-    @ In, variables, dict, variable-value map from RAVEN
-    @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
-    @ Out, unique, list, list of ordered cashflows to evaluate (in order, no duplicates)
-  """
-  # TODO does this work with float drivers (e.g. already-evaluated drivers)?
-  # storage for creating graph sequence
-  driverGraph = defaultdict(list)
-  driverGraph['EndNode'] = []
-  evaluated = [] # for cashflows that have already been evaluated and don't need more treatment
-  for comp in components:
-    lifetime = comp.getLifetime()
-    # find multiplier variables
-    multipliers = comp.getMultipliers()
-    for mult in multipliers:
-      if mult is None:
-        continue
-      if mult not in variables.keys():
-        raise RuntimeError(f'CashFlow: multiplier "{mult}" required for Component "{comp.name}" but not found among variables!')
-    # find order in which to evaluate cash flow components
-    for c, cf in enumerate(comp.getCashflows()):
-      # keys for graph are drivers, cash flow names
-      driver = cf.getParam('driver')
-      # does the driver come from the variable list, or from another cashflow, or is it already evaluated?
-      cfn = f'{comp.name}|{cf.name}'
-      found = False
-      if driver is None or mathUtils.isAFloatOrInt(driver) or isinstance(driver, np.ndarray) or pyomoVar:
-        found = True
-        # TODO assert it's already filled?
-        evaluated.append(cfn)
-        continue
-      elif driver in variables:
-        found = True
-        # check length of driver
-        n = len(np.atleast_1d(variables[driver]))
-        if n > 1 and n != lifetime+1:
-          raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" has "{n}" entries, '+\
-                              'but "{c}" has a lifetime of {el}!')
-                             .format(c=comp.name,
-                                     cf=cf.name,
-                                     d=driver,
-                                     n=n,
-                                     el=lifetime))
-      else:
-        # driver should be in cash flows if not in variables
-        driverComp, driverCf = driver.split('|')
-        for matchComp in components:
-          if matchComp.name == driverComp:
-            # for cross-referencing, component lifetimes have to be the same!
-            if matchComp.getLifetime() != comp.getLifetime():
-              raise RuntimeError(('Lifetimes for Component "{d}" and cross-referenced Component {m} ' +\
-                                  'do not match, so no cross-reference possible!')
-                                 .format(d=driverComp, m=matchComp.name))
-            found = True # here this means that so far the component was found, not the specific cash flow.
-            break
-        else:
-          found = False
-        # if the component was found, check the cash flow is part of the component
-        if found:
-          if driverCf not in list(m_cf.name for m_cf in matchComp.getCashflows()):
-            found = False
-      if not found:
-        raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" was not found ' +\
-                            'among variables or other cashflows!')
-                           .format(c=comp.name,
-                                   cf=cf.name,
-                                   d=driver))
-
-      # assure each cashflow is in the mix, and has an EndNode to rely on (helps graph construct accurately)
-      driverGraph[cfn].append('EndNode')
-      # each driver depends on its cashflow
-      driverGraph[driver].append(cfn)
-  ordered = evaluated + graphObject(driverGraph).createSingleListOfVertices()
-  unique = list(OrderedDict.fromkeys(ordered))
-  return unique
+  plan = EvaluationPlan(settings, components, v=v, pyomoVar=pyomoVar)
+  plan.checkVariables(variables)
+  return list(f'{compName}|{cfName}' for compName, cfName in plan.order)
 
 def componentLifeCashflow(comp, cf, variables, lifetimeCashflows, projectLife, v=100, pyomoVar=False):
   """
@@ -196,7 +178,7 @@ def componentLifeCashflow(comp, cf, variables, lifetimeCashflows, projectLife, v
   """
   m = 'compLife'
   vprint(v, 1, m, "-"*75)
-  vprint(v, 1, m, f'Computing LIFETIME cash flow for Component "{comp.name}" CashFlow "{cf.name}" ...')
+  vprint(v, 1, m, lambda: f'Computing LIFETIME cash flow for Component "{comp.name}" CashFlow "{cf.name}" ...')
   paramText = '... {:^10.10s}: {: 1.9e}'
   # do cashflow
   # necessary to handle recurring and capex with different timelines
@@ -212,57 +194,127 @@ def componentLifeCashflow(comp, cf, variables, lifetimeCashflows, projectLife, v
     for item, value in results.items():
       if item == 'result':
         continue
-      if mathUtils.isAFloatOrInt(value):
-        vprint(v, 1, m, paramText.format(item, value))
+      if tutils.isAFloatOrInt(value):
+        vprint(v, 1, m, lambda: paramText.format(item, value))
       else:
-        orig = cf.getParam(item)
-        if mathUtils.isSingleValued(orig):
+        orig = cf.getMultiplier() if item == 'mult' else cf.getParam(item)
+        if tutils.isSingleValued(orig):
           name = orig
         else:
           name = '(from input)'
         if not pyomoVar:
-          vprint(v, 1, m, f'... {item:^10.10s}: {name}')
-          vprint(v, 1, m, f'...           mean: {value.mean():1.9e}')
-          vprint(v, 1, m, f'...           std : {value.std():1.9e}')
-          vprint(v, 1, m, f'...           min : {value.min():1.9e}')
-          vprint(v, 1, m, f'...           max : {value.max():1.9e}')
-          vprint(v, 1, m, f'...           nonz: {np.count_nonzero(value):d}')
+          vprint(v, 1, m, lambda: f'... {item:^10.10s}: {name}')
+          vprint(v, 1, m, lambda: f'...           mean: {value.mean():1.9e}')
+          vprint(v, 1, m, lambda: f'...           std : {value.std():1.9e}')
+          vprint(v, 1, m, lambda: f'...           min : {value.min():1.9e}')
+          vprint(v, 1, m, lambda: f'...           max : {value.max():1.9e}')
+          vprint(v, 1, m, lambda: f'...           nonz: {np.count_nonzero(value):d}')
         else:
           continue
 
-    yx = max(len(str(len(lifeCashflow))),4)
-    vprint(v, 0, m, 'LIFETIME cash flow summary by year:')
-    vprint(v, 0, m, '    {y:^{yx}.{yx}s}, {a:^10.10s}, {d:^10.10s}, {c:^15.15s}'.format(y='year',
-                                                                                        yx=yx,
-                                                                                        a='alpha',
-                                                                                        d='driver',
-                                                                                        c='cashflow'))
-    for y, cash in enumerate(lifeCashflow):
-      if cf.type in ['Capex']:
-        if not pyomoVar:
-          vprint(v, 1, m, '    {y:^{yx}d}, {a: 1.3e}, {d: 1.3e}, {c: 1.9e}'.format(y=y,
-                                                                                 yx=yx,
-                                                                                 a=results['alpha'][y],
-                                                                                 d=results['driver'][y],
-                                                                                 c=cash))
-        else:
-          vprint(v, 1, m, '    {y:^{yx}d}, {a:}, {d:}, {c:}'.format(y=y,
-                                                                                 yx=yx,
-                                                                                 a=type(results['alpha'][y]),
-                                                                                 d=type(results['driver'][y]),
-                                                                                 c=type(cash)))
-      elif cf.type == 'Recurring':
-        if not pyomoVar:
-          vprint(v, 1, m, '    {y:^{yx}d}, -- N/A -- , -- N/A -- , {c: 1.9e}'.format(y=y,
-                                                             yx=yx,
-                                                             c=cash))
-        else:
-          vprint(v, 1, m, '    {y:^{yx}d}, -- N/A -- , -- N/A -- , {c:}'.format(y=y,
-                                                             yx=yx,
-                                                             c=type(cash)))
+  # the per-year table is only meaningful for a single sample
+  if v < 1 and np.ndim(lifeCashflow) == 1:
+    vtable(v, 0, m, f'LIFETIME cash flow summary by year for Component "{comp.name}" CashFlow "{cf.name}":',
+           lambda: _lifetimeTable(cf, results, pyomoVar))
 
   return lifeCashflow
 
+def _lifetimeTable(cf, results, pyomoVar=False):
+  """
+    Rows of the per-year table of a lifetime cash flow
+    @ In, cf, CashFlows.CashFlow, cash flow that was calculated
+    @ In, results, dict, calculated cash flow and its parts, as returned by the cash flow
+    @ In, pyomoVar, boolean, optional, if True, indicates that an expression was constructed instead of a value calculated
+    @ Out, rows, list(str), table rows
+  """
+  lifeCashflow = results['result']
+  yx = max(len(str(len(lifeCashflow))),4)
+  rows = ['    {y:^{yx}.{yx}s}, {a:^10.10s}, {d:^10.10s}, {c:^15.15s}'.format(y='year',
+                                                                         yx=yx,
+                                                                         a='alpha',
+                                                                         d='driver',
+                                                                         c='cashflow')]
+  for y, cash in enumerate(lifeCashflow):
+    if cf.type in ['Capex']:
+      if not pyomoVar:
+        rows.append('    {y:^{yx}d}, {a: 1.3e}, {d: 1.3e}, {c: 1.9e}'.format(y=y,
+                                                                        yx=yx,
+                                                                        a=results['alpha'][y],
+                                                                        d=results['driver'][y],
+                                                                        c=cash))
+      else:
+        rows.append('    {y:^{yx}d}, {a:}, {d:}, {c:}'.format(y=y,
+                                                          yx=yx,
+                                                          a=type(results['alpha'][y]),
+                                                          d=type(results['driver'][y]),
+                                                          c=type(cash)))
+    elif cf.type == 'Recurring':
+      if not pyomoVar:
+        rows.append('    {y:^{yx}d}, -- N/A -- , -- N/A -- , {c: 1.9e}'.format(y=y, yx=yx, c=cash))
+      else:
+        rows.append('    {y:^{yx}d}, -- N/A -- , -- N/A -- , {c:}'.format(y=y, yx=yx, c=type(cash)))
+  return rows
+
+def lifetimeDerivatives(plan, variables, lifetimeCashflows, projectLife):
+  """
+    Derivatives of the lifetime cash flows with respect to the variables they depend on, propagated
+    through the cash flow formulas (and the cash flows driving them) in evaluation order
+    @ In, plan, EvaluationPlan, plan compiled for the settings and components
+    @ In, variables, dict, variables from RAVEN
+    @ In, lifetimeCashflows, dict, component: cashflow: np.array of lifetime values calculated for the variables
+    @ In, projectLife, int, length of project in years
+    @ Out, derivatives, dict, (component name, cash flow name): variable name: np.array, derivatives with the
+      variable entries along the first axis, followed by the axes of the lifetime cash flow
+  """
+  compsByName = dict((c.name, c) for c in plan.components)
+  derivatives = {}
+  for key in plan.order:
+    comp = compsByName[key[0]]
+    cf = comp.getCashflow(key[1])
+    inputs = {}
+    for param, (kind, value) in plan.sources[key].items():
+      if kind == 'variable':
+        inputs[param] = {value: _unitDerivative(variables[value])}
+      elif kind == 'crossref' and derivatives[value]:
+        inputs[param] = derivatives[value]
+    mult = cf.getMultiplier()
+    if tutils.isAString(mult):
+      # only the first entry of a multiplier variable is used
+      inputs['mult'] = {mult: _unitDerivative(variables[mult])[..., :1]}
+    life = projectLife if cf.type == 'Recurring' else comp.getLifetime() + 1
+    derivatives[key] = cf.calculateDerivatives(variables, lifetimeCashflows, life, inputs) if inputs else {}
+  return derivatives
+
+def _unitDerivative(value):
+  """
+    Derivative of a variable with respect to each of its entries
+    @ In, value, float or np.array, variable value, with the entries along the last axis
+    @ Out, unit, np.array, identity with the variable entries along the first axis, followed by the axes of the variable
+  """
+  shape = np.shape(np.atleast_1d(value))
+  n = shape[-1]
+  return np.broadcast_to(np.eye(n).reshape((n,) + (1,) * (len(shape) - 1) + (n,)), (n,) + shape)
+
+def projectDerivatives(components, lifeDerivatives, projections):
+  """
+    Takes the derivatives of the lifetime cash flows to the project life, stacked as in "stackCashflows"
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, lifeDerivatives, dict, (component name, cash flow name): variable name: np.array, see "lifetimeDerivatives"
+    @ In, projections, dict, (component name, cash flow name): np.array, see "EvaluationPlan.getProjections"
+    @ Out, stacked, dict, variable name: np.array with shape (n_cashflows, variable entries, [samples,] projectLength)
+  """
+  names = OrderedDict.fromkeys(name for cfDerivatives in lifeDerivatives.values() for name in cfDerivatives)
+  stacked = {}
+  for name in names:
+    data = []
+    for comp in components:
+      for cf in comp.getCashflows():
+        key = (comp.name, cf.name)
+        deriv = lifeDerivatives.get(key, {}).get(name, None)
+        data.append(0.0 if deriv is None else deriv @ projections[key])
+    stacked[name] = np.stack(np.broadcast_arrays(*data))
+  return stacked
+
 def getProjectLength(settings, components, v=100):
   """
     checks if all drivers needed are present in variables
@@ -279,7 +331,7 @@ def getProjectLength(settings, components, v=100):
     projectLength = lcmm(*lifetimes) + 1
   return int(projectLength)
 
-def projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=100, pyomoVar=False):
+def projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=100, pyomoVar=False, multipliers=None, schedules=None):
   """
     creates all cashflows for life of project, for all components
     @ In, settings, CashFlows.GlobalSettings, global settings
@@ -288,19 +340,35 @@ def projectLifeCashflows(settings, components, lifetimeCashflows, projectLength,
     @ In, projectLength, int, project years
     @ In, v, int, verbosity level
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
-    @ Out, projectCashflows, dict, dictionary of project-length cashflows (same structure as lifetime dict)
+    @ In, multipliers, dict, optional, component: cashflow: (tax multiplier, inflation rate) if already known
+    @ In, schedules, dict, optional, component: RebuildSchedule if already known
+    @ Out, projectCashflows, ProjectCashflows or dict, project-length cashflows (same structure as lifetime dict);
+      numeric ones are stored in a single block, Pyomo expressions in a dictionary
   """
   m = 'proj_life'
+  if pyomoVar:
+    projectCashflows = {} # same keys as lifetimeCashflows
+  else:
+    # all the cash flows are written in place into their row of one block; single-sample cash flows are
+    # broadcast against batched ones
+    names = list((comp.name, cf.name) for comp in components for cf in comp.getCashflows())
+    samples = np.broadcast_shapes(*(np.shape(lifetimeCashflows[compName][cfName])[:-1] for compName, cfName in names))
+    projectCashflows = ProjectCashflows(names, samples + (projectLength,))
   # apply tax, inflation
-  projectCashflows = {} # same keys as lifetimeCashflows
   for comp in components:
     tax = comp.getTax() if comp.getTax() is not None else settings.getTax()
     inflation = comp.getInflation() if comp.getInflation() is not None else settings.getInflation()
-    compProjCashflows = projectComponentCashflows(comp, tax, inflation, lifetimeCashflows[comp.name], projectLength, v=v, pyomoVar=pyomoVar)
-    projectCashflows[comp.name] = compProjCashflows
+    compMultipliers = None if multipliers is None else multipliers[comp.name]
+    schedule = None if schedules is None else schedules[comp.name]
+    out = None if pyomoVar else projectCashflows[comp.name]
+    compProjCashflows = projectComponentCashflows(comp, tax, inflation, lifetimeCashflows[comp.name], projectLength,
+                                                  v=v, pyomoVar=pyomoVar, multipliers=compMultipliers, schedule=schedule,
+                                                  out=out)
+    if pyomoVar:
+      projectCashflows[comp.name] = compProjCashflows
   return projectCashflows
 
-def projectComponentCashflows(comp, tax, inflation, lifeCashflows, projectLength, v=100, pyomoVar=False):
+def projectComponentCashflows(comp, tax, inflation, lifeCashflows, projectLength, v=100, pyomoVar=False, multipliers=None, schedule=None, out=None):
   """
     does all the cashflows for a SINGLE COMPONENT for the life of the project
     @ In, comp, CashFlows.Component, component to run numbers for
@@ -310,11 +378,14 @@ def projectComponentCashflows(comp, tax, inflation, lifeCashflows, projectLength
     @ In, projectLength, int, project years
     @ In, v, int, verbosity level
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
+    @ In, multipliers, dict, optional, cashflow: (tax multiplier, inflation rate) if already known
+    @ In, schedule, RebuildSchedule, optional, rebuild schedule of the component if already known
+    @ In, out, dict, optional, cashflow: zeroed np.array to write the project cash flow into, instead of a new one
     @ Out, cashflows, dict, dictionary of cashflows for this component, taken to project life
   """
   m = 'proj comp'
   vprint(v, 1, m, "-"*75)
-  vprint(v, 1, m, f'Computing PROJECT cash flow for Component "{comp.name}" ...')
+  vprint(v, 1, m, lambda: f'Computing PROJECT cash flow for Component "{comp.name}" ...')
   cashflows = {}
   # what is the first project year this component will be in existence?
   compStart = comp.getStartTime()
@@ -324,38 +395,36 @@ def projectComponentCashflows(comp, tax, inflation, lifeCashflows, projectLength
   ## TODO will this work properly if start time is negative? Initial tests say yes ...
   ## note that we use projectLength as the default END of the component's cashflow life, NOT a decomission year!
   compEnd = projectLength if comp.getRepetitions() == 0 else compStart + compLife * comp.getRepetitions()
-  vprint(v, 1, m, f' ... component start: {compStart}')
-  vprint(v, 1, m, f' ... component end:   {compEnd}')
+  vprint(v, 1, m, lambda: f' ... component start: {compStart}')
+  vprint(v, 1, m, lambda: f' ... component end:   {compEnd}')
+  # the rebuild years are the same for all the capex/amortization cashflows of the component
+  if schedule is None and any(cf.type != 'Recurring' for cf in comp.getCashflows()):
+    schedule = RebuildSchedule(compStart, compEnd, compLife, projectLength)
   for cf in comp.getCashflows():
-    if cf.isTaxable():
-      taxMult = 1.0 - tax
+    if multipliers is None:
+      taxMult, inflRate = getCashflowMultipliers(cf, tax, inflation)
     else:
-      taxMult = 1.0
-    if cf.isInflated():
-      inflRate = inflation + 1.0
-    else:
-      inflRate = 1.0 # TODO nominal inflation rate?
-    vprint(v, 1, m, f' ... inflation rate: {inflRate}')
-    vprint(v, 1, m, f' ... tax rate: {taxMult}')
+      taxMult, inflRate = multipliers[cf.name]
+    vprint(v, 1, m, lambda: f' ... inflation rate: {inflRate}')
+    vprint(v, 1, m, lambda: f' ... tax rate: {taxMult}')
     lifeCf = lifeCashflows[cf.name]
+    cfOut = None if out is None else out[cf.name]
     # Recurring cashflows should only be handled on project lifetimes, not on component lifes
     if cf.type == 'Recurring':
-      singleCashflow = projectRecurringCashflow(cf, compStart, compEnd, lifeCf, taxMult, inflRate, projectLength, v=v, pyomoVar=pyomoVar)
+      singleCashflow = projectRecurringCashflow(cf, compStart, compEnd, lifeCf, taxMult, inflRate, projectLength, v=v,
+                                                pyomoVar=pyomoVar, out=cfOut)
     else:
-      singleCashflow = projectSingleCashflow(cf, compStart, compEnd, compLife, lifeCf, taxMult, inflRate, projectLength, v=v, pyomoVar=pyomoVar)
-    vprint(v, 0, m, f'Project Cashflow for Component "{comp.name}" CashFlow "{cf.name}":')
-    if v < 1:
-      vprint(v, 0, m, 'Year, Time-Adjusted Value')
-      for y, val in enumerate(singleCashflow):
-        if not pyomoVar:
-          vprint(v, 0, m, f'{y:4d}: {val: 1.9e}')
-        else:
-          vprint(v, 0, m, f'{y:4d}: {type(val):}')
+      singleCashflow = projectSingleCashflow(cf, compStart, compEnd, compLife, lifeCf, taxMult, inflRate, projectLength, v=v,
+                                             pyomoVar=pyomoVar, schedule=schedule, out=cfOut)
+    if v < 1 and np.ndim(singleCashflow) == 1:
+      vtable(v, 0, m, f'Project Cashflow for Component "{comp.name}" CashFlow "{cf.name}":',
+             lambda: ['Year, Time-Adjusted Value'] + [f'{y:4d}: {type(val):}' if pyomoVar else f'{y:4d}: {val: 1.9e}'
+                                                      for y, val in enumerate(singleCashflow)])
     cashflows[cf.name] = singleCashflow
 
   return cashflows
 
-def projectRecurringCashflow(cf, start, end, lifeCf, taxMult, inflRate, projectLength, v=100, pyomoVar=False):
+def projectRecurringCashflow(cf, start, end, lifeCf, taxMult, inflRate, projectLength, v=100, pyomoVar=False, out=None):
   """
     Handles recurring cashflows independent of component life times
     @ In, cf, CashFlows.CashFlow, cash flow to extend to full project life
@@ -367,27 +436,31 @@ def projectRecurringCashflow(cf, start, end, lifeCf, taxMult, inflRate, projectL
     @ In, projectLength, int, total years of analysis
     @ In, v, int, verbosity
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
+    @ In, out, np.array, optional, zeroed array to write the project cash flow into, instead of a new one
     @ Out, projCf, np.array, cashflow for project life of component
   """
   m = 'proj c_fl'
   vprint(v, 1, m, "-"*50)
-  vprint(v, 1, m, f'Computing PROJECT cash flow for CashFlow "{cf.name}" ...')
-  if not pyomoVar:
-    projCf = np.zeros(projectLength)
-  else:
-    projCf = np.zeros(projectLength, dtype=object)
+  vprint(v, 1, m, lambda: f'Computing PROJECT cash flow for CashFlow "{cf.name}" ...')
   years = np.arange(projectLength) # years in project time, year 0 is first year # TODO just indices, pandas?
   operatingMask = np.logical_and(years >= start, years < end)
   operatingYears = years[operatingMask]
   # This considers components that dont start operation until later in the project
   # It is neccessary to index lifeCf from 0 while still indexing projCf and years from current project year
   relativeStartupYear = operatingYears - start
-  for o,opYear in enumerate(operatingYears):
-    # Necessary to discount the cashflow with tax and inflation, for recurring inflRate is typically 1
-    projCf[opYear] = lifeCf[relativeStartupYear[o]] * taxMult * np.power(inflRate, -1*years[opYear])
+  # Necessary to discount the cashflow with tax and inflation, for recurring inflRate is typically 1
+  factors = taxMult * np.power(inflRate, -1.0 * operatingYears)
+  if not pyomoVar:
+    # any leading (sample) axes of the lifetime cash flow are kept, years are always the last axis
+    projCf = np.zeros(np.shape(lifeCf)[:-1] + (projectLength,)) if out is None else out
+    projCf[..., operatingYears] = lifeCf[..., relativeStartupYear] * factors
+  else:
+    # expressions are scaled by the same factors, one object per operating year
+    projCf = np.zeros(projectLength, dtype=object)
+    projCf[operatingYears] = np.asarray(lifeCf, dtype=object)[relativeStartupYear] * factors
   return projCf
 
-def projectSingleCashflow(cf, start, end, life, lifeCf, taxMult, inflRate, projectLength, v=100, pyomoVar=False):
+def projectSingleCashflow(cf, start, end, life, lifeCf, taxMult, inflRate, projectLength, v=100, pyomoVar=False, schedule=None, out=None):
   """
     does a single cashflow for the life of the project
     @ In, cf, CashFlows.CashFlow, cash flow to extend to full project life
@@ -400,61 +473,16 @@ def projectSingleCashflow(cf, start, end, life, lifeCf, taxMult, inflRate, proje
     @ In, projectLength, int, total years of analysis
     @ In, v, int, verbosity
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
+    @ In, schedule, RebuildSchedule, optional, rebuild schedule of the component if already known
+    @ In, out, np.array, optional, zeroed array to write the project cash flow into, instead of a new one
     @ Out, projCf, np.array, cashflow for project life of component
   """
   m = 'proj c_fl'
   vprint(v, 1, m, "-"*50)
-  vprint(v, 1, m, f'Computing PROJECT cash flow for CashFlow "{cf.name}" ...')
-  if not pyomoVar:
-    projCf = np.zeros(projectLength)
-  else:
-    projCf = np.zeros(projectLength, dtype=object)
-  years = np.arange(projectLength) # years in project time, year 0 is first year # TODO just indices, pandas?
-  # before the project starts, after it ends are zero; we want the working part
-  # ALFOA: Modified following expression (see issue #20):
-  #        from operatingMask = np.logical_and(years >= start, years <= end)
-  #        to operatingMask = np.logical_and(years >= start, years < end)
-  operatingMask = np.logical_and(years >= start, years < end)
-  operatingYears = years[operatingMask]
-  startShift = operatingYears - start # y_shift
-  # what year realative to production is this component in, for each operating year?
-  relativeOperation = startShift % life # yReal
-  # handle new builds
-  ## three types of new builds:
-  ### 1) first ever build (only construction cost)
-  ### 2) decomission after last year ever running (assuming said decomission is inside the operational years)
-  ### 3) years with both a decomissioning and a construction
-  ## this is all years in which construction will occur (covers 1 and half of 3)
-  newBuildMask = [a[relativeOperation==0] for a in np.where(operatingMask)]
-  # NOTE make the decomissionMask BEFORE removing the last-year-rebuild, if present.
-  ## This lets us do smoother numpy operations.
-  decomissionMask = [newBuildMask[0][1:]]
-  # if the last year is a rebuild year, don't rebuild, as it won't be operated.
-  if newBuildMask[0][-1] == years[-1]:
-    newBuildMask[0] = newBuildMask[0][:-1]
-  ## numpy requires tuples as indices, not lists
-  newBuildMask = tuple(newBuildMask)
-  ## add construction costs for all of these new build years
-  if not pyomoVar:
-    projCf[newBuildMask] = lifeCf[0] * taxMult * np.power(inflRate, -1*years[newBuildMask])
-  else:
-    for i in range(len(newBuildMask[0])):
-      projCf[newBuildMask[0][i]] = lifeCf[0] * taxMult * np.power(inflRate, -1*years[newBuildMask[0][i]])
-
-  ## this is all the years in which decomissioning happens
-  ### note that the [0] index is sort of a dummy dimension to help the numpy handshakes
-  ### if last decomission is within project life, include that too
-  if operatingYears[-1] < years[-1]:
-    decomissionMask[0] = np.hstack((decomissionMask[0],np.atleast_1d(operatingYears[-1]+1)))
-  if not pyomoVar:
-    projCf[decomissionMask] += lifeCf[-1] * taxMult * np.power(inflRate, -1*years[decomissionMask])
-  else:
-    for i in range(len(decomissionMask[0])):
-      projCf[decomissionMask[0][i]] += lifeCf[-1] * taxMult * np.power(inflRate, -1*years[decomissionMask[0][i]])
-  ## handle the non-build operational years
-  nonBuildMask = tuple(a[relativeOperation!=0] for a in np.where(operatingMask))
-  projCf[nonBuildMask] += lifeCf[relativeOperation[relativeOperation!=0]] * taxMult * np.power(inflRate, -1*years[nonBuildMask])
-  return projCf
+  vprint(v, 1, m, lambda: f'Computing PROJECT cash flow for CashFlow "{cf.name}" ...')
+  if schedule is None:
+    schedule = RebuildSchedule(start, end, life, projectLength)
+  return schedule.project(lifeCf, taxMult, inflRate, pyomoVar=pyomoVar, out=out)
 
 def npvSearch(settings, components, cashFlows, projectLength, v=100):
   """
@@ -470,57 +498,103 @@ def npvSearch(settings, components, cashFlows, projectLength, v=100):
   m = 'npv search'
   multiplied = 0.0 # cash flows that are meant to include the multiplier
   others = 0.0 # cash flows without the multiplier
-  years = np.arange(projectLength)
+  discount = discountFactors(settings.getDiscountRate(), projectLength)
   for comp in components:
     for cf in comp.getCashflows():
       data = cashFlows[comp.name][cf.name]
-      discountRates = np.power(1.0 + settings.getDiscountRate(), years)
-      discounted = np.sum(data/discountRates)
+      discounted = np.sum(data * discount, axis=-1)
       if cf.isMultTarget():
         multiplied += discounted
       else:
         others += discounted
   targetVal = settings.getMetricTarget()
   mult = (targetVal - others)/multiplied # TODO div zero possible?
-  vprint(v, 0, m, f'... NPV multiplier: {mult:1.9e}')
+  vprint(v, 0, m, lambda: f'... NPV multiplier: {formatValue(mult)}')
   # SANITY CHECL -> FCFF with the multiplier, re-calculate NPV
   if v < 1:
     npv = NPV(components, cashFlows, projectLength, settings.getDiscountRate(), mult=mult, v=v)
-    if npv != targetVal:
-      vprint(v, 1, m, f'NPV mismatch warning! Calculated NPV with mult: {npv:1.9e}, target: {targetVal:1.9e}')
+    if np.any(npv != targetVal):
+      vprint(v, 1, m, lambda: f'NPV mismatch warning! Calculated NPV with mult: {formatValue(npv)}, target: {targetVal:1.9e}')
   return mult
 
 def FCFF(components, cashFlows, projectLength, mult=None, v=100, pyomoVar=False):
   """
     Calculates "free cash flow to the firm" (FCFF)
-    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
     @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
     @ In, projectLength, int, project years
     @ In, mult, float, optional, if provided then scale target cash flow by value
     @ In, v, int, verbosity level
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
-    @ Out, fcff, float, free cash flow to the firm
+    @ Out, fcff, np.array, free cash flow to the firm for each project year
   """
   m = 'FCFF'
   # FCFF_R for each year
   if not pyomoVar:
-    fcff = np.zeros(projectLength)
+    stacked, targets = stackCashflows(components, cashFlows)
+    fcff = _sumCashflows(stacked, targets, mult)
   else:
+    # Pyomo expressions can't go through the numeric reductions, so build them up cash flow by cash flow
     fcff = np.zeros(projectLength, dtype=object)
-  for comp in components:
-    for cf in comp.getCashflows():
-      data = cashFlows[comp.name][cf.name]
-      need_to_multiply = mult is not None and cf.isMultTarget()
-      fcff = [fcff[i] + data[i] * mult if need_to_multiply else fcff[i] + data[i] for i in range(len(fcff))]
+    for comp in components:
+      for cf in comp.getCashflows():
+        data = cashFlows[comp.name][cf.name]
+        fcff = fcff + data * mult if mult is not None and cf.isMultTarget() else fcff + data
   if not pyomoVar:
-    vprint(v, 1, m, f'FCFF yearly (not discounted):\n{fcff}')
+    vtable(v, 1, m, 'FCFF yearly (not discounted):', lambda: str(fcff).splitlines())
   else:
-    vprint(v, 1, m, 'FCFF yearly (not discounted):')
-    vprint(v, 1, m, 'year, FCFF')
-    for year, value in zip(range(projectLength+1), fcff):
-      vprint(v, 1, m, f'{year}: {type(value)}')
+    vtable(v, 1, m, 'FCFF yearly (not discounted):', lambda: ['year, FCFF'] + [f'{year}: {type(value)}' for year, value in enumerate(fcff)])
   return fcff
 
+def _sumCashflows(stacked, targets, mult=None):
+  """
+    Reduces stacked cash flows to FCFF, scaling the multiplier targets if requested
+    @ In, stacked, np.array, cash flows with shape (n_cashflows, [samples,] projectLength)
+    @ In, targets, np.array, boolean mask of the cash flows that are NPV search multiplier targets
+    @ In, mult, float or np.array, optional, if provided then scale target cash flow by value (one per sample if batched)
+    @ Out, fcff, np.array, free cash flow to the firm with shape ([samples,] projectLength)
+  """
+  if mult is None:
+    return stacked.sum(axis=0)
+  if np.ndim(mult):
+    # one multiplier per sample, so weights are (cash flow, sample)
+    weights = np.where(targets[:, np.newaxis], np.asarray(mult)[np.newaxis, :], 1.0)
+    return np.einsum('cs,cs...->s...', weights, stacked)
+  weights = np.where(targets, mult, 1.0)
+  return np.tensordot(weights, stacked, axes=1)
+
+def discountFactors(discountRate, projectLength):
+  """
+    Discount factor for each project year
+    @ In, discountRate, float, firm discount rate to use in discounting future dollars value
+    @ In, projectLength, int, project years
+    @ Out, factors, np.array, (1 + discountRate)^-year for each project year
+  """
+  return np.power(1.0 + discountRate, -np.arange(projectLength, dtype=float))
+
+def stackCashflows(components, cashFlows):
+  """
+    Stacks all project cash flows into a single matrix
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
+    @ Out, stacked, np.array, cash flows with shape (n_cashflows, [samples,] projectLength)
+    @ Out, targets, np.array, boolean mask of the cash flows that are NPV search multiplier targets
+  """
+  targets = np.array(list(bool(cf.isMultTarget()) for comp in components for cf in comp.getCashflows()), dtype=bool)
+  if isinstance(cashFlows, ProjectCashflows):
+    # already stacked, only reordered if needed
+    rows = list(cashFlows.rows[(comp.name, cf.name)] for comp in components for cf in comp.getCashflows())
+    if rows == list(range(len(cashFlows.data))):
+      return cashFlows.data, targets
+    return cashFlows.data[rows], targets
+  data = []
+  for comp in components:
+    for cf in comp.getCashflows():
+      data.append(cashFlows[comp.name][cf.name])
+  # single-sample cash flows (e.g. fixed arrays) are broadcast against batched ones
+  stacked = np.stack(np.broadcast_arrays(*data))
+  return stacked, targets
+
 def NPV(components, cashFlows, projectLength, discountRate, mult=None, v=100, pyomoVar=False, returnFcff=False):
   """
     Calculates net present value of cash flows
@@ -537,30 +611,172 @@ def NPV(components, cashFlows, projectLength, discountRate, mult=None, v=100, py
   """
   m = 'NPV'
   fcff = FCFF(components, cashFlows, projectLength, mult=mult, v=v, pyomoVar=pyomoVar)
-  npv = npf.npv(discountRate, fcff)
+  # same as numpy_financial.npv, but discounting along the last axis so batched FCFF are supported
+  npv = (fcff * discountFactors(discountRate, projectLength)).sum(axis=-1)
   if not pyomoVar:
-    vprint(v, 0, m, f'... NPV: {npv:1.9e}')
+    vprint(v, 0, m, lambda: f'... NPV: {formatValue(npv)}')
   else:
-    vprint(v, 0, m, f'... NPV: {type(npv)}')
+    vprint(v, 0, m, lambda: f'... NPV: {type(npv)}')
   if not returnFcff:
     return npv
   return npv, fcff
 
-def IRR(components, cashFlows, projectLength, v=100):
+def IRR(components, cashFlows, projectLength, v=100, guess=None):
   """
     Calculates internal rate of return for system of cash flows
     @ In, components, list, list of CashFlows.Component instances
     @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
     @ In, projectLength, int, project years
     @ In, v, int, verbosity level
+    @ In, guess, float or np.array, optional, IRR to warm start the solver from (e.g. the previous sample's)
     @ Out, irr, float, internal rate of return
   """
   m = 'IRR'
   fcff = FCFF(components, cashFlows, projectLength, mult=None, v=v) # TODO mult is none always?
-  irr = npf.irr(fcff)
-  vprint(v, 1, m, f'... IRR: {irr:1.9e}')
+  irr = _irrFromFcff(fcff, guess=guess, v=v)
+  vprint(v, 1, m, lambda: f'... IRR: {formatValue(irr)}')
   return irr
 
+def _irrFromFcff(fcff, guess=None, v=100):
+  """
+    Calculates internal rate of return from the free cash flow to the firm
+    @ In, fcff, np.array, free cash flow to the firm with shape ([samples,] projectLength)
+    @ In, guess, float or np.array, optional, IRR to warm start the solver from
+    @ In, v, int, verbosity level
+    @ Out, irr, float or np.array, internal rate of return (one per sample if batched)
+  """
+  irr, converged = solveIrr(fcff, guess=guess)
+  failed = np.flatnonzero(np.logical_not(converged))
+  if len(failed):
+    where = f'for samples {failed.tolist()}' if np.ndim(fcff) > 1 else 'for this sample'
+    vprint(v, 1, 'IRR', lambda: f'IRR warning! No converged IRR found {where}, returning NaN.')
+  return irr
+
+def solveIrr(fcff, guess=None, tol=1e-12, maxIter=100, gridSize=256):
+  """
+    Finds the internal rate of return (the discount rate for which the NPV of the FCFF is zero) for
+    all samples at once. Roots are first bracketed for each sample, either close to the warm start
+    guess or by the sign changes on a grid of rates, then refined with Newton steps that fall back to
+    bisection whenever they leave their bracket. As in numpy_financial.irr, if there are several
+    roots the one closest to zero is used; a root found from a warm start is only kept if the grid shows
+    no root closer to zero, otherwise the sample is solved as without a guess.
+    @ In, fcff, np.array, free cash flow to the firm with shape ([samples,] projectLength)
+    @ In, guess, float or np.array, optional, IRR to warm start from, one per sample if batched
+    @ In, tol, float, optional, relative tolerance of the solution
+    @ In, maxIter, int, optional, maximum number of Newton/bisection iterations
+    @ In, gridSize, int, optional, number of rates used to bracket the roots
+    @ Out, irr, float or np.array, internal rate of return, NaN where no root was found
+    @ Out, converged, bool or np.array, whether the IRR converged for each sample
+  """
+  fcff = np.asarray(fcff, dtype=float)
+  values = fcff.reshape(-1, fcff.shape[-1])
+  numSamples, numYears = values.shape
+  years = np.arange(numYears, dtype=float)
+  # solve for u = log(1 + IRR), with NPV(u) = sum(fcff * exp(-u * year)), so the IRR is always above -100%;
+  # u is searched between IRRs of -99% (less for long projects, so nothing overflows) and 10^6 %
+  uMin = -min(np.log(100.0), 600.0 / max(numYears - 1, 1))
+  uMax = np.log(1e4)
+  npv = lambda u, rows: np.einsum('st,st->s', values[rows], np.exp(-np.outer(u, years)))
+  # the grid is denser close to zero, where IRRs are usually found
+  s = np.linspace(-np.sqrt(-uMin), np.sqrt(uMax), gridSize)
+  grid = np.union1d(s * np.abs(s), [0.0])
+  irr = np.full(numSamples, np.nan)
+  # samples still to bracket on the grid
+  cold = np.any(values != 0, axis=1)
+  if guess is not None:
+    with np.errstate(invalid='ignore', divide='ignore'):
+      start = np.log1p(np.broadcast_to(np.ravel(guess).astype(float), (numSamples,)))
+    rows = np.flatnonzero(np.logical_and(start > uMin, start < uMax))
+    lo = np.maximum(start[rows] - 0.05, uMin)
+    hi = np.minimum(start[rows] + 0.05, uMax)
+    npvLo = npv(lo, rows)
+    bracketed = np.logical_or(np.sign(npvLo) * np.sign(npv(hi, rows)) < 0, npvLo == 0)
+    rows = rows[bracketed]
+    u, done = _refineIrr(values, years, rows, lo[bracketed], hi[bracketed], npvLo[bracketed], start[rows], tol, maxIter)
+    rows, rates = rows[done], np.expm1(u[done])
+    # only the part of the grid closer to zero than the warm roots is needed to look for other roots
+    cols = np.flatnonzero(np.abs(np.expm1(grid)) < np.max(np.abs(rates), initial=0.0))
+    if len(rows) and len(cols):
+      within = np.abs(np.expm1(grid[cols]))[np.newaxis, :] < np.abs(rates)[:, np.newaxis]
+      sign = np.sign(values[rows] @ np.exp(-np.outer(years, grid[cols])))
+      closer = np.logical_and(sign[:, :-1] * sign[:, 1:] < 0, np.logical_and(within[:, :-1], within[:, 1:])).any(axis=1)
+      closer = np.logical_or(closer, np.logical_and(sign == 0, within).any(axis=1))
+      rows, rates = rows[np.logical_not(closer)], rates[np.logical_not(closer)]
+    irr[rows] = rates
+    cold[rows] = False
+  # otherwise, bracket the sign changes of the NPV next to zero on either side
+  rows = np.flatnonzero(cold)
+  if len(rows):
+    gridNpv = values[rows] @ np.exp(-np.outer(years, grid))
+    sign = np.sign(gridNpv)
+    crossing = np.logical_or(sign[:, :-1] * sign[:, 1:] < 0, sign[:, :-1] == 0)
+    negative = np.logical_and(crossing, grid[1:] <= 0)
+    positive = np.logical_and(crossing, grid[:-1] >= 0)
+    candidates = []
+    for found, interval in [(negative.any(axis=1), crossing.shape[1] - 1 - np.argmax(negative[:, ::-1], axis=1)),
+                            (positive.any(axis=1), np.argmax(positive, axis=1))]:
+      interval = interval[found]
+      lo, hi = grid[interval], grid[interval + 1]
+      candidates.append((rows[found], lo, hi, gridNpv[found, interval], 0.5 * (lo + hi)))
+    sample, lower, upper, lowerNpv, u = (np.concatenate(c) for c in zip(*candidates))
+    u, done = _refineIrr(values, years, sample, lower, upper, lowerNpv, u, tol, maxIter)
+    # keep the converged root closest to zero for each sample
+    rates = np.expm1(u)
+    distance = np.where(done, np.abs(rates), np.inf)
+    closest = np.full(numSamples, np.inf)
+    np.minimum.at(closest, sample, distance)
+    best = np.logical_and(done, distance == closest[sample])
+    irr[sample[best]] = rates[best]
+  converged = np.isfinite(irr)
+  irr = irr.reshape(fcff.shape[:-1])
+  converged = converged.reshape(fcff.shape[:-1])
+  if fcff.ndim == 1:
+    return float(irr), bool(converged)
+  return irr, converged
+
+def _refineIrr(values, years, sample, lower, upper, lowerNpv, u, tol, maxIter):
+  """
+    Refines bracketed roots of the NPV in u = log(1 + IRR) with safeguarded Newton iterations, only on the
+    brackets that have not converged yet
+    @ In, values, np.array, free cash flow to the firm with shape (samples, projectLength)
+    @ In, years, np.array, project years
+    @ In, sample, np.array, sample of each bracket
+    @ In, lower, np.array, lower u of each bracket
+    @ In, upper, np.array, upper u of each bracket
+    @ In, lowerNpv, np.array, NPV at the lower u of each bracket
+    @ In, u, np.array, starting u of each bracket
+    @ In, tol, float, relative tolerance of the solution
+    @ In, maxIter, int, maximum number of Newton/bisection iterations
+    @ Out, u, np.array, root of each bracket
+    @ Out, done, np.array, whether each root converged
+  """
+  sample = sample.astype(int)
+  lower, upper, lowerNpv, u = (np.array(a, dtype=float) for a in (lower, upper, lowerNpv, u))
+  done = lowerNpv == 0
+  u[done] = lower[done]
+  active = np.flatnonzero(np.logical_not(done))
+  for _ in range(maxIter):
+    if not len(active):
+      break
+    x = u[active]
+    weighted = values[sample[active]] * np.exp(-np.outer(x, years))
+    f = weighted.sum(axis=1)
+    df = -(weighted @ years)
+    # shrink the bracket around the root
+    sameSide = np.sign(f) == np.sign(lowerNpv[active])
+    lower[active] = np.where(sameSide, x, lower[active])
+    lowerNpv[active] = np.where(sameSide, f, lowerNpv[active])
+    upper[active] = np.where(sameSide, upper[active], x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      step = x - f / df
+    outside = np.logical_not(np.logical_and(step > lower[active], step < upper[active]))
+    step = np.where(outside, 0.5 * (lower[active] + upper[active]), step)
+    finished = np.logical_or(f == 0, np.abs(step - x) <= tol * (1.0 + np.abs(x)))
+    u[active] = np.where(f == 0, x, step)
+    done[active[finished]] = True
+    active = active[np.logical_not(finished)]
+  return u, done
+
 def PI(components, cashFlows, projectLength, discountRate, mult=None, v=100):
   """
     Calculates the profitability index for system
@@ -574,10 +790,236 @@ def PI(components, cashFlows, projectLength, discountRate, mult=None, v=100):
   """
   m = 'PI'
   npv, fcff = NPV(components, cashFlows, projectLength, discountRate, mult=mult, v=v, returnFcff=True)
-  pi = -1.0 * npv / fcff[0] # yes, really! This seems strange, but it also seems to be right.
-  vprint(v, 1, m, f'... PI: {pi:1.9e}')
+  pi = -1.0 * npv / fcff[..., 0] # yes, really! This seems strange, but it also seems to be right.
+  vprint(v, 1, m, lambda: f'... PI: {formatValue(pi)}')
   return pi
 
+def calculateIndicators(settings, components, cashFlows, projectLength, v=100, pyomoVar=False, irrGuess=None, derivatives=None):
+  """
+    Calculates all requested economic indicators from shared intermediates: the cash flows are
+    stacked, reduced to FCFF and discounted only once, no matter how many indicators are requested.
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
+    @ In, projectLength, int, project years
+    @ In, v, int, verbosity level
+    @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
+    @ In, irrGuess, float or np.array, optional, IRR to warm start the IRR solver from
+    @ In, derivatives, dict, optional, if given then the derivatives of the indicators are added to the results,
+      see "projectDerivatives"
+    @ Out, results, dict, economic metric results
+  """
+  indicators = settings.getIndicators()
+  discount = discountFactors(settings.getDiscountRate(), projectLength)
+  results = {}
+  if pyomoVar:
+    # only the NPV can be built as an expression
+    if 'NPV' in indicators:
+      fcff = FCFF(components, cashFlows, projectLength, v=v, pyomoVar=True)
+      npv = (fcff * discount).sum(axis=-1)
+      vprint(v, 0, 'NPV', lambda: f'... NPV: {type(npv)}')
+      results['NPV'] = npv
+    return results
+  stacked, targets = stackCashflows(components, cashFlows)
+  fcff = _sumCashflows(stacked, targets)
+  vtable(v, 1, 'FCFF', 'FCFF yearly (not discounted):', lambda: str(fcff).splitlines())
+  # discounted total of each cash flow
+  discounted = stacked @ discount
+  if derivatives is not None:
+    derivatives = dict((name, (deriv @ discount, deriv.sum(axis=0))) for name, deriv in derivatives.items())
+  return _deriveIndicators(settings, discounted, targets, fcff[..., 0], fcff=fcff, v=v, irrGuess=irrGuess,
+                           derivatives=derivatives)
+
+def calculateLinearPyomoIndicators(settings, lifetimeCashflows, plan, v=100, parameters=None):
+  """
+    Builds the NPV of lifetime cash flows made of Pyomo expressions as one flat expression. The numeric
+    discount, tax and inflation weight of each lifetime year is known from the plan, so the linear part of each
+    year's expression is collected into a single coefficient per Pyomo variable; nonlinear parts (e.g. from an
+    economy of scale X != 1) are added as they are.
+    With parameters, the coefficients are collected per project year and tax/inflation parameter instead, and
+    each group is scaled by its mutable discount, tax and inflation parameters.
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, lifetimeCashflows, dict, component: cashflow: np.array of lifetime values (Pyomo expressions)
+    @ In, plan, EvaluationPlan, plan compiled for the settings and components
+    @ In, v, int, verbosity level
+    @ In, parameters, PyomoParameters, optional, mutable parameters to build the NPV with
+    @ Out, results, dict, economic metric results
+  """
+  import pyomo.environ as pyo
+  from pyomo.repn import generate_standard_repn
+  results = {}
+  if 'NPV' not in settings.getIndicators():
+    return results
+  if parameters is None:
+    discount = discountFactors(settings.getDiscountRate(), plan.projectLength)
+  else:
+    compsByName = dict((comp.name, comp) for comp in plan.components)
+  groups = {} # group key: [constant, {id of Pyomo variable: [variable, coefficient]}, nonlinear terms]
+  for (compName, cfName), projection in plan.getProjections(scaled=parameters is None).items():
+    if parameters is None:
+      # a single group, with the numeric weight of each lifetime year
+      keys = [None]
+      # plain floats, as numpy scalars would make Pyomo go through the (slow) array operator hooks
+      weights = (projection @ discount)[:, np.newaxis].tolist()
+    else:
+      # one group per project year, with the number of times each lifetime year is found in it
+      keys = parameters.groupKeys(compsByName[compName], compsByName[compName].getCashflow(cfName))
+      weights = projection.tolist()
+    for row, value in zip(weights, lifetimeCashflows[compName][cfName]):
+      terms = list((key, weight) for key, weight in zip(keys, row) if weight != 0.0)
+      if not terms:
+        continue
+      if isinstance(value, numbers.Number):
+        for key, weight in terms:
+          groups.setdefault(key, [0.0, {}, []])[0] += weight * value
+        continue
+      repn = generate_standard_repn(value, quadratic=False)
+      for key, weight in terms:
+        group = groups.setdefault(key, [0.0, {}, []])
+        group[0] += weight * repn.constant
+        for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+          group[1].setdefault(id(var), [var, 0.0])[1] += weight * coef
+        if repn.nonlinear_expr is not None:
+          group[2].append(weight * repn.nonlinear_expr)
+  parts = []
+  for key, (constant, coefficients, nonlinear) in groups.items():
+    part = pyo.quicksum((coef * var for var, coef in coefficients.values() if coef != 0.0), start=constant)
+    if nonlinear:
+      part = part + pyo.quicksum(nonlinear)
+    parts.append(part if key is None else parameters.factor(key) * part)
+  npv = parts[0] if len(parts) == 1 else pyo.quicksum(parts, start=0.0)
+  vprint(v, 0, 'NPV', lambda: f'... NPV: {type(npv)} in {len(groups)} groups, '
+         f'{sum(len(group[1]) for group in groups.values())} linear terms, '
+         f'{sum(len(group[2]) for group in groups.values())} nonlinear terms')
+  results['NPV'] = npv
+  return results
+
+def calculatePeriodicIndicators(settings, components, lifetimeCashflows, projectLength, v=100, multipliers=None):
+  """
+    Calculates the economic indicators without creating project-length cash flows.
+    Without a <ProjectTime>, the project spans the LCM of the component lifetimes and each component
+    repeats identical rebuild cycles, so the discounted value of a single lifetime is summed over all
+    cycles as a geometric series in the discount and inflation factors.
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, lifetimeCashflows, dict, component: cashflow: np.array of values over one component lifetime
+    @ In, projectLength, int, project years
+    @ In, v, int, verbosity level
+    @ In, multipliers, dict, optional, component: cashflow: (tax multiplier, inflation rate) if already known
+    @ Out, results, dict, economic metric results
+  """
+  m = 'periodic'
+  discountRate = settings.getDiscountRate()
+  discounted = []
+  firstYear = []
+  targets = []
+  for comp in components:
+    tax = comp.getTax() if comp.getTax() is not None else settings.getTax()
+    inflation = comp.getInflation() if comp.getInflation() is not None else settings.getInflation()
+    life = comp.getLifetime()
+    numCycles = (projectLength - 1) // life
+    vprint(v, 1, m, lambda: f'Component "{comp.name}" repeats {numCycles} cycles of {life} years')
+    for cf in comp.getCashflows():
+      if multipliers is None:
+        taxMult, inflRate = getCashflowMultipliers(cf, tax, inflation)
+      else:
+        taxMult, inflRate = multipliers[comp.name][cf.name]
+      lifeCf = lifetimeCashflows[comp.name][cf.name]
+      # present value of a dollar for each year of a cycle, and of a whole cycle later
+      weights = np.power((1.0 + discountRate) * inflRate, -np.arange(life + 1, dtype=float))
+      cycles = _geometricSum(weights[-1], numCycles)
+      if cf.type == 'Recurring':
+        # years 1 to life repeat every cycle; year 0 is only kept if there are no repeats
+        first = lifeCf[..., 0] if numCycles == 1 else np.zeros_like(lifeCf[..., 0])
+        value = first + cycles * (lifeCf[..., 1:] @ weights[1:])
+      else:
+        # the decomissioning of a build is in the construction year of the next one
+        first = lifeCf[..., 0]
+        value = cycles * (lifeCf[..., :-1] @ weights[:-1] + lifeCf[..., -1] * weights[-1])
+      discounted.append(taxMult * value)
+      firstYear.append(taxMult * first)
+      targets.append(bool(cf.isMultTarget()))
+  # single-sample cash flows (e.g. fixed arrays) are broadcast against batched ones
+  discounted = np.stack(np.broadcast_arrays(*discounted))
+  firstYear = np.stack(np.broadcast_arrays(*firstYear)).sum(axis=0)
+  return _deriveIndicators(settings, discounted, np.array(targets, dtype=bool), firstYear, v=v)
+
+def _geometricSum(ratio, count):
+  """
+    Sum of the first terms of a geometric series starting at one
+    @ In, ratio, float, ratio between consecutive terms
+    @ In, count, int, number of terms
+    @ Out, total, float, 1 + ratio + ... + ratio^(count-1)
+  """
+  if ratio == 1.0:
+    return float(count)
+  return (1.0 - ratio**count) / (1.0 - ratio)
+
+def _deriveIndicators(settings, discounted, targets, firstYear, fcff=None, v=100, irrGuess=None, derivatives=None):
+  """
+    Derives the requested economic indicators from the discounted total of each cash flow
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, discounted, np.array, discounted cash flow totals with shape (n_cashflows, [samples])
+    @ In, targets, np.array, boolean mask of the cash flows that are NPV search multiplier targets
+    @ In, firstYear, float or np.array, FCFF in the first project year (one per sample if batched)
+    @ In, fcff, np.array, optional, yearly FCFF with shape ([samples,] projectLength), required for the IRR
+    @ In, v, int, verbosity level
+    @ In, irrGuess, float or np.array, optional, IRR to warm start the IRR solver from
+    @ In, derivatives, dict, optional, variable name: (derivatives of "discounted", derivatives of "fcff"), each
+      with the variable entries on the axis after the cash flow axis; if given, the results get the "gradients"
+      of each indicator, as indicator: variable name: derivatives with the variable entries along the last axis
+    @ Out, results, dict, economic metric results
+  """
+  indicators = settings.getIndicators()
+  results = {}
+  # indicator: variable name: derivatives, with the variable entries along the first axis
+  gradients = defaultdict(dict)
+  withGradients = derivatives is not None
+  if not withGradients:
+    derivatives = {}
+  npv = discounted.sum(axis=0)
+  if 'NPV_search' in indicators:
+    # split into the cash flows scaled by the multiplier and the others
+    multiplied = discounted[targets].sum(axis=0)
+    others = discounted[~targets].sum(axis=0)
+    targetVal = settings.getMetricTarget()
+    mult = (targetVal - others)/multiplied # TODO div zero possible?
+    vprint(v, 0, 'npv search', lambda: f'... NPV multiplier: {formatValue(mult)}')
+    # SANITY CHECK -> NPV with the multiplier applied to the target cash flows
+    if v < 1:
+      searched = mult * multiplied + others
+      if np.any(searched != targetVal):
+        vprint(v, 1, 'npv search', lambda: f'NPV mismatch warning! Calculated NPV with mult: {formatValue(searched)}, target: {targetVal:1.9e}')
+    results['NPV_mult'] = mult
+    for name, (dDiscounted, _) in derivatives.items():
+      gradients['NPV_mult'][name] = -(dDiscounted[~targets].sum(axis=0) + mult * dDiscounted[targets].sum(axis=0)) / multiplied
+  if 'NPV' in indicators:
+    vprint(v, 0, 'NPV', lambda: f'... NPV: {formatValue(npv)}')
+    results['NPV'] = npv
+    for name, (dDiscounted, _) in derivatives.items():
+      gradients['NPV'][name] = dDiscounted.sum(axis=0)
+  if 'IRR' in indicators:
+    irr = _irrFromFcff(fcff, guess=irrGuess, v=v)
+    vprint(v, 1, 'IRR', lambda: f'... IRR: {formatValue(irr)}')
+    results['IRR'] = irr
+    if derivatives:
+      # implicit differentiation of sum(fcff * (1 + irr)^-year) = 0
+      years = np.arange(fcff.shape[-1])
+      growth = np.power(1.0 + np.asarray(irr)[..., np.newaxis], -years)
+      slope = -(fcff * years * growth).sum(axis=-1) / (1.0 + irr)
+      for name, (_, dFcff) in derivatives.items():
+        gradients['IRR'][name] = -(dFcff * growth).sum(axis=-1) / slope
+  if 'PI' in indicators:
+    pi = -1.0 * npv / firstYear # yes, really! This seems strange, but it also seems to be right.
+    vprint(v, 1, 'PI', lambda: f'... PI: {formatValue(pi)}')
+    results['PI'] = pi
+    for name, (dDiscounted, dFcff) in derivatives.items():
+      gradients['PI'][name] = -(dDiscounted.sum(axis=0) + pi * dFcff[..., 0]) / firstYear
+  if withGradients:
+    results['gradients'] = dict((indicator, dict((name, np.moveaxis(deriv, 0, -1)) for name, deriv in byName.items()))
+                                for indicator, byName in gradients.items())
+  return results
+
 def gcd(a, b):
   """
     Find greatest common denominator
@@ -606,25 +1048,962 @@ def lcmm(*args):
   """
   return functools.reduce(lcm, args)
 
+#=====================
+# EVALUATION PLAN
+#=====================
+class EvaluationPlan:
+  """
+    Sample-independent evaluation structure for a set of settings and components.
+    Everything that only depends on the component definitions (evaluation order, where each
+    driver comes from, project length, tax and inflation multipliers, output names) is resolved
+    once here, so that evaluating a sample only needs the cash flow arithmetic.
+  """
+  def __init__(self, settings, components, v=100, pyomoVar=False):
+    """
+      Constructor. Compiles the plan.
+      @ In, settings, CashFlows.GlobalSettings, global settings
+      @ In, components, list, list of CashFlows.Component instances
+      @ In, v, int, optional, verbosity level
+      @ In, pyomoVar, boolean, optional, if True, indicates that an expression will be constructed instead of a value calculated
+      @ Out, None
+    """
+    m = 'plan'
+    self.settings = settings
+    self.components = components
+    self.pyomoVar = pyomoVar
+    self.periodic = settings.getPeriodicEvaluation()
+    self.active = list(comp for comp in components if comp.name in settings.getActiveComponents())
+    self.multiplierVariables = {}  # multiplier variable name: name of component requiring it
+    self.variableDrivers = []      # (component, cash flow, variable name) for drivers taken from variables
+    self.variableAlphas = []       # (component, cash flow, variable name) for recurring alphas taken from variables
+    self.sources = {}              # (component name, cash flow name): {param: (source type, value)}
+    vprint(v, 0, m, '... creating evaluation sequence ...')
+    self.order = self._createEvalProcess()
+    vprint(v, 0, m, '... evaluation sequence:', lambda: list(f'{c}|{cf}' for c, cf in self.order))
+    # all the variables read by the active cash flows, as drivers, alphas or multipliers
+    self.variableNames = sorted(set(self.multiplierVariables).union(value for params in self.sources.values()
+                                                                    for kind, value in params.values() if kind == 'variable'))
+    # results of the last samples, if requested (see run)
+    cacheSize = settings.getResultCache()
+    self.resultCache = ResultCache(cacheSize) if cacheSize else None
+    if self.periodic:
+      self._checkPeriodic()
+    self.projectLength = getProjectLength(settings, components, v=v)
+    self.multipliers = {}          # component name: cash flow name: (tax multiplier, inflation rate)
+    self.outputNames = {}          # component name: cash flow name: detailed output variable name
+    for comp in components:
+      tax = comp.getTax() if comp.getTax() is not None else settings.getTax()
+      inflation = comp.getInflation() if comp.getInflation() is not None else settings.getInflation()
+      self.multipliers[comp.name] = dict((cf.name, getCashflowMultipliers(cf, tax, inflation)) for cf in comp.getCashflows())
+      self.outputNames[comp.name] = dict((cf.name, _outputName(comp.name, cf.name)) for cf in comp.getCashflows())
+    # component name: rebuild schedule, not needed if no project-length cash flows are created
+    self.schedules = {}
+    if not self.periodic:
+      for comp in components:
+        start = comp.getStartTime()
+        end = self.projectLength if comp.getRepetitions() == 0 else start + comp.getLifetime() * comp.getRepetitions()
+        self.schedules[comp.name] = RebuildSchedule(start, end, comp.getLifetime(), self.projectLength)
+    self._projections = {}         # scaled: (component name, cash flow name): lifetime to project year map, see getProjections
+
+  def getProjections(self, scaled=True):
+    """
+      Gets the linear map taking each lifetime cash flow to its project cash flow (with tax, inflation and
+      rebuilds), obtained by projecting the identity; computed on first use
+      @ In, scaled, bool, optional, if False then the tax and inflation multipliers are left out, so that
+        the map only counts in which project years each lifetime year is found
+      @ Out, projections, dict, (component name, cash flow name): np.array with shape (lifetime years, projectLength)
+    """
+    if scaled not in self._projections:
+      projections = {}
+      for comp in self.active:
+        # recurring cash flows are calculated for the whole project, the others for a component lifetime
+        unit = dict((cf.name, np.eye(self.projectLength if cf.type == 'Recurring' else comp.getLifetime() + 1))
+                    for cf in comp.getCashflows())
+        tax = comp.getTax() if comp.getTax() is not None else self.settings.getTax()
+        inflation = comp.getInflation() if comp.getInflation() is not None else self.settings.getInflation()
+        if scaled:
+          multipliers = self.multipliers[comp.name]
+        else:
+          multipliers = dict((cf.name, (1.0, 1.0)) for cf in comp.getCashflows())
+        projected = projectComponentCashflows(comp, tax, inflation, unit, self.projectLength,
+                                              multipliers=multipliers,
+                                              schedule=self.schedules.get(comp.name, None))
+        for cfName, projCf in projected.items():
+          projections[(comp.name, cfName)] = projCf
+      self._projections[scaled] = projections
+    return self._projections[scaled]
+
+  def _createEvalProcess(self):
+    """
+      Sorts the cashflow evaluation process so sensible evaluation order is used
+      @ In, None
+      @ Out, order, list, list of (component name, cash flow name) to evaluate (in order, no duplicates)
+    """
+    # storage for creating graph sequence
+    driverGraph = defaultdict(list)
+    driverGraph['EndNode'] = []
+    evaluated = [] # for cashflows that have already been evaluated and don't need more treatment
+    cashflowKeys = {}
+    for comp in self.active:
+      lifetime = comp.getLifetime()
+      # find multiplier variables
+      for mult in comp.getMultipliers():
+        if tutils.isAString(mult):
+          self.multiplierVariables.setdefault(mult, comp.name)
+      # find order in which to evaluate cash flow components
+      for cf in comp.getCashflows():
+        cfn = f'{comp.name}|{cf.name}'
+        cashflowKeys[cfn] = (comp.name, cf.name)
+        self.sources[(comp.name, cf.name)] = dict((param, self._resolveSource(comp, cf, cf.getParam(param)))
+                                                  for param in ['alpha', 'driver'])
+        # keys for graph are drivers, cash flow names
+        driver = cf.getParam('driver')
+        kind = self.sources[(comp.name, cf.name)]['driver'][0]
+        # does the driver come from the variable list, or from another cashflow, or is it already evaluated?
+        if kind == 'literal':
+          evaluated.append(cfn)
+          continue
+        elif kind == 'variable':
+          self.variableDrivers.append((comp, cf, driver))
+        else:
+          driverComp = driver.split('|')[0]
+          matchComp = next(c for c in self.active if c.name == driverComp)
+          # for cross-referencing, component lifetimes have to be the same!
+          if matchComp.getLifetime() != lifetime:
+            raise RuntimeError(('Lifetimes for Component "{d}" and cross-referenced Component {m} ' +\
+                                'do not match, so no cross-reference possible!')
+                               .format(d=driverComp, m=matchComp.name))
+        # assure each cashflow is in the mix, and has an EndNode to rely on (helps graph construct accurately)
+        driverGraph[cfn].append('EndNode')
+        # each driver depends on its cashflow
+        driverGraph[driver].append(cfn)
+    ordered = evaluated + tutils.topologicalSort(driverGraph)
+    # only the cash flows are evaluated, the variables and end node just shape the graph
+    return list(cashflowKeys[key] for key in OrderedDict.fromkeys(ordered) if key in cashflowKeys)
+
+  def _checkPeriodic(self):
+    """
+      Checks the components can be evaluated one lifetime cycle at a time. Recurring cash flows
+      must be given per year of the component lifetime, so that they repeat with each rebuild.
+      @ In, None
+      @ Out, None
+    """
+    if self.pyomoVar:
+      raise IOError('<PeriodicEvaluation> is not available when constructing Pyomo expressions!')
+    for comp in self.active:
+      lifetime = comp.getLifetime()
+      for cf in comp.getCashflows():
+        if cf.type != 'Recurring':
+          continue
+        if cf.getParam('alpha') is None:
+          raise IOError(f'<PeriodicEvaluation> requires <alpha> and <driver> for Recurring CashFlow "{cf.name}" of Component "{comp.name}"!')
+        for param, (kind, value) in self.sources[(comp.name, cf.name)].items():
+          if kind == 'literal' and np.size(value) not in [1, lifetime+1]:
+            raise IOError((f'<PeriodicEvaluation> requires the {param} of Recurring CashFlow "{cf.name}" of Component "{comp.name}" ' +\
+                           f'to have 1 or {lifetime+1} entries, but it has {np.size(value)}!'))
+          elif kind == 'variable' and param == 'alpha':
+            self.variableAlphas.append((comp, cf, value))
+
+  def _resolveSource(self, comp, cf, value):
+    """
+      Determines where the value of a cash flow parameter comes from
+      @ In, comp, CashFlows.Component, component owning the cash flow
+      @ In, cf, CashFlows.CashFlow, cash flow owning the parameter
+      @ In, value, object, the parameter as provided by the user
+      @ Out, source, tuple, (source type, value) where type is "literal", "variable" or "crossref"
+    """
+    if self.pyomoVar or not tutils.isAString(value):
+      return ('literal', value)
+    if '|' not in value:
+      return ('variable', value)
+    driverComp, driverCf = value.split('|')
+    for matchComp in self.active:
+      if matchComp.name == driverComp and driverCf in list(c.name for c in matchComp.getCashflows()):
+        return ('crossref', (driverComp, driverCf))
+    raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" was not found ' +\
+                        'among variables or other cashflows!')
+                       .format(c=comp.name, cf=cf.name, d=value))
+
+  def checkVariables(self, variables):
+    """
+      Checks the variables provided for a sample fulfill the plan's needs
+      @ In, variables, dict, variable-value map from RAVEN
+      @ Out, None
+    """
+    for mult, compName in self.multiplierVariables.items():
+      if mult not in variables:
+        raise RuntimeError(f'CashFlow: multiplier "{mult}" required for Component "{compName}" but not found among variables!')
+    for comp, cf, driver in self.variableDrivers:
+      if driver not in variables:
+        raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" was not found ' +\
+                            'among variables or other cashflows!')
+                           .format(c=comp.name, cf=cf.name, d=driver))
+      # check length of driver (along the last axis, so batched variables are checked per sample)
+      n = np.atleast_1d(variables[driver]).shape[-1]
+      lifetime = comp.getLifetime()
+      if n > 1 and n != lifetime+1:
+        raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" has "{n}" entries, '+\
+                            'but "{c}" has a lifetime of {el}!')
+                           .format(c=comp.name,
+                                   cf=cf.name,
+                                   d=driver,
+                                   n=n,
+                                   el=lifetime))
+    # for periodic evaluation, recurring alphas are repeated with each rebuild too
+    for comp, cf, alpha in self.variableAlphas:
+      n = np.atleast_1d(variables[alpha]).shape[-1] if alpha in variables else 1
+      lifetime = comp.getLifetime()
+      if n > 1 and n != lifetime+1:
+        raise RuntimeError(f'Component "{comp.name}" TEAL {cf.name} alpha variable "{alpha}" has "{n}" entries, '+\
+                           f'but "{comp.name}" has a lifetime of {lifetime}!')
+
+class RebuildSchedule:
+  """
+    Maps the lifetime cash flow of a component onto the project years, including all of its rebuilds.
+    The map only depends on the component start, end and lifetime and on the project length, so it is
+    shared by all the capex and amortization cash flows of the component.
+  """
+  def __init__(self, start, end, life, projectLength):
+    """
+      Constructor. Builds the sparse lifetime year to project year map.
+      @ In, start, int, project year in which component begins operating
+      @ In, end, int, project year in which component ends operating
+      @ In, life, int, lifetime of component
+      @ In, projectLength, int, total years of analysis
+      @ Out, None
+    """
+    self.projectLength = projectLength
+    years = np.arange(projectLength) # years in project time, year 0 is first year
+    # before the project starts, after it ends are zero; we want the working part
+    # ALFOA: Modified following expression (see issue #20):
+    #        from operatingMask = np.logical_and(years >= start, years <= end)
+    #        to operatingMask = np.logical_and(years >= start, years < end)
+    operatingMask = np.logical_and(years >= start, years < end)
+    operatingYears = years[operatingMask]
+    # what year realative to production is this component in, for each operating year?
+    relativeOperation = (operatingYears - start) % life
+    # handle new builds
+    ## three types of new builds:
+    ### 1) first ever build (only construction cost)
+    ### 2) decomission after last year ever running (assuming said decomission is inside the operational years)
+    ### 3) years with both a decomissioning and a construction
+    ## this is all years in which construction will occur (covers 1 and half of 3)
+    newBuilds = operatingYears[relativeOperation == 0]
+    # NOTE make the decomissions BEFORE removing the last-year-rebuild, if present.
+    decomissions = newBuilds[1:]
+    # if the last year is a rebuild year, don't rebuild, as it won't be operated.
+    if newBuilds[-1] == years[-1]:
+      newBuilds = newBuilds[:-1]
+    # if last decomission is within project life, include that too
+    if operatingYears[-1] < years[-1]:
+      decomissions = np.append(decomissions, operatingYears[-1] + 1)
+    # the non-build operational years
+    nonBuild = relativeOperation != 0
+    # construction is the first lifetime year, decomissioning the last one
+    projectYears = np.concatenate((newBuilds, decomissions, operatingYears[nonBuild]))
+    lifeIndex = np.concatenate((np.zeros(len(newBuilds), dtype=int),
+                                np.full(len(decomissions), -1, dtype=int),
+                                relativeOperation[nonBuild]))
+    # sorted by project year, so the entries falling in the same year are contiguous
+    order = np.argsort(projectYears, kind='stable')
+    self.projectYears = projectYears[order] # project year of each entry
+    self.lifeIndex = lifeIndex[order]       # lifetime year of each entry
+    self.years, self.offsets = np.unique(self.projectYears, return_index=True)
+
+  def project(self, lifeCf, taxMult, inflRate, pyomoVar=False, out=None):
+    """
+      Takes a lifetime cash flow to the project life with a single gather and scatter-add
+      @ In, lifeCf, np.array, cashflow for lifetime of component
+      @ In, taxMult, float, tax rate multiplyer (1 - tax)
+      @ In, inflRate, float, inflation rate multiplier (1 + inflation)
+      @ In, pyomoVar, boolean, optional, if True, indicates that an expression will be constructed instead of a value calculated
+      @ In, out, np.array, optional, zeroed array to write the project cash flow into, instead of a new one
+      @ Out, projCf, np.array, cashflow for project life of component
+    """
+    factors = taxMult * np.power(inflRate, -1.0 * self.projectYears)
+    if not pyomoVar:
+      # any leading (sample) axes of the lifetime cash flow are kept, years are always the last axis
+      projCf = np.zeros(np.shape(lifeCf)[:-1] + (self.projectLength,)) if out is None else out
+      entries = lifeCf[..., self.lifeIndex] * factors
+    else:
+      projCf = np.zeros(self.projectLength, dtype=object)
+      entries = np.asarray(lifeCf, dtype=object)[self.lifeIndex] * factors
+    # years with both a decomissioning and a construction get both entries
+    projCf[..., self.years] = np.add.reduceat(entries, self.offsets, axis=-1)
+    return projCf
+
+def getCashflowMultipliers(cf, tax, inflation):
+  """
+    Determines the tax and inflation multipliers applied to a cash flow when taken to project life
+    @ In, cf, CashFlows.CashFlow, cash flow
+    @ In, tax, float, tax rate for component as decimal
+    @ In, inflation, float, inflation rate as decimal
+    @ Out, taxMult, float, tax rate multiplyer (1 - tax)
+    @ Out, inflRate, float, inflation rate multiplier (1 + inflation)
+  """
+  if cf.isTaxable():
+    taxMult = 1.0 - tax
+  else:
+    taxMult = 1.0
+  if cf.isInflated():
+    inflRate = inflation + 1.0
+  else:
+    inflRate = 1.0 # TODO nominal inflation rate?
+  return taxMult, inflRate
+
+def _outputName(compName, cfName):
+  """
+    Name of the detailed output variable for a project cash flow
+    @ In, compName, str, name of the component
+    @ In, cfName, str, name of the cash flow
+    @ Out, name, str, name of the output variable
+  """
+  if cfName.find('depreciation_tax_credit') > 0:
+    return f'{compName}_depreciation_tax_credit'
+  elif cfName.find('depreciation') > 0:
+    return f'{compName}_depreciation'
+  return f'{compName}_{cfName}_CashFlow'
+
+#=====================
+# PROJECT CASH FLOWS
+#=====================
+class ProjectCashflows(Mapping):
+  """
+    Project-length cash flows of all components, stored as one contiguous block "data" with shape
+    (number of cash flows, [samples,] project length) and one row per cash flow, in component order.
+    Indexing by component name gives a dictionary of cash flow name to its row (a view, not a copy), so
+    that it can be used as the nested dictionary {component: {cash flow: np.array}}; the rows should be
+    written in place, as assigning a new array to a cash flow name does not change "data".
+  """
+  def __init__(self, names, shape):
+    """
+      Constructor. Allocates the (zeroed) block.
+      @ In, names, list, (component name, cash flow name) of each row
+      @ In, shape, tuple, shape of each cash flow, ([samples,] project length)
+      @ Out, None
+    """
+    self.names = list(names)
+    self.data = np.zeros((len(self.names),) + tuple(shape))
+    self._index()
+
+  def _index(self):
+    """
+      Indexes the rows of the block by component and cash flow name
+      @ In, None
+      @ Out, None
+    """
+    self.rows = dict((name, r) for r, name in enumerate(self.names)) # (component name, cash flow name): row
+    self._views = {}
+    for r, (compName, cfName) in enumerate(self.names):
+      self._views.setdefault(compName, {})[cfName] = self.data[r]
+
+  def __getstate__(self):
+    """
+      Gets the state to pickle, only the block and its names since the views would be pickled as copies
+      @ In, None
+      @ Out, state, tuple, (names, data)
+    """
+    return self.names, self.data
+
+  def __setstate__(self, state):
+    """
+      Sets the unpickled state
+      @ In, state, tuple, (names, data)
+      @ Out, None
+    """
+    self.names, self.data = state
+    self._index()
+
+  def __getitem__(self, compName):
+    """
+      Cash flows of a component
+      @ In, compName, str, name of the component
+      @ Out, __getitem__, dict, cash flow name: row view of "data"
+    """
+    return self._views[compName]
+
+  def __iter__(self):
+    """
+      Iterates over the component names
+      @ In, None
+      @ Out, __iter__, iterator, component names
+    """
+    return iter(self._views)
+
+  def __len__(self):
+    """
+      Number of components
+      @ In, None
+      @ Out, __len__, int, number of components
+    """
+    return len(self._views)
+
+#=====================
+# RESULT CACHE
+#=====================
+class ResultCache:
+  """
+    Least recently used store of "run" results, keyed on a hash of the variables read by the cash flows of a
+    plan (see EvaluationPlan.variableNames), so re-evaluating a sample returns the stored results at once.
+    Other variables don't change the key. A cache is only valid for the settings and components it was filled
+    with, and the results are shared by all the runs finding them, so they should not be modified.
+    The cache can be shared by threads (e.g. RAVEN samples running in parallel on copies of the plugin).
+  """
+  def __init__(self, maxSize=128):
+    """
+      Constructor.
+      @ In, maxSize, int, optional, number of results to keep, the least recently used ones are dropped first
+      @ Out, None
+    """
+    if maxSize < 1:
+      raise IOError(f'The result cache must keep at least one sample, but got {maxSize}!')
+    self.maxSize = maxSize
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict() # key: results, from least to most recently used
+    self._lock = threading.Lock() # guards the entries and statistics
+
+  def __getstate__(self):
+    """
+      Gets the state to pickle, without the lock
+      @ In, None
+      @ Out, state, dict, attributes
+    """
+    state = dict(self.__dict__)
+    del state['_lock']
+    return state
+
+  def __setstate__(self, state):
+    """
+      Sets the unpickled state, with a new lock
+      @ In, state, dict, attributes
+      @ Out, None
+    """
+    self.__dict__.update(state)
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    """
+      Number of results kept
+      @ In, None
+      @ Out, __len__, int, number of results kept
+    """
+    return len(self._entries)
+
+  @staticmethod
+  def key(plan, variables, *options):
+    """
+      Hashes the variables of a sample used by a plan
+      @ In, plan, EvaluationPlan, plan of the settings and components
+      @ In, variables, dict, variable-value map from RAVEN
+      @ In, options, tuple, other values the results depend on (e.g. whether gradients are requested)
+      @ Out, key, str, hex digest
+    """
+    sha = hashlib.sha256(repr(options).encode())
+    for name in plan.variableNames:
+      if name not in variables:
+        sha.update(f'{name}:None;'.encode())
+        continue
+      # a single value is the same as a one-entry array
+      value = np.ascontiguousarray(np.atleast_1d(np.asarray(variables[name], dtype=float)))
+      sha.update(f'{name}:{value.shape};'.encode())
+      sha.update(value.tobytes())
+    return sha.hexdigest()
+
+  def get(self, key):
+    """
+      Looks up the results of a sample
+      @ In, key, str, key of the sample (see "key")
+      @ Out, results, dict, economic metric results, or None if not kept
+    """
+    with self._lock:
+      results = self._entries.get(key, None)
+      if results is None:
+        self.misses += 1
+        return None
+      self.hits += 1
+      self._entries.move_to_end(key)
+    return dict(results)
+
+  def getMany(self, keys):
+    """
+      Looks up the results of several samples
+      @ In, keys, list, keys of the samples (see "key")
+      @ Out, results, list, economic metric results of each sample, or None if not kept
+    """
+    return list(self.get(key) for key in keys)
+
+  def put(self, key, results):
+    """
+      Keeps the results of a sample, dropping the least recently used ones beyond the size limit
+      @ In, key, str, key of the sample (see "key")
+      @ In, results, dict, economic metric results
+      @ Out, None
+    """
+    results = dict(results)
+    with self._lock:
+      self._entries[key] = results
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxSize:
+        self._entries.popitem(last=False)
+
+  def putMany(self, entries):
+    """
+      Keeps the results of several samples
+      @ In, entries, list, (key, economic metric results) of each sample
+      @ Out, None
+    """
+    for key, results in entries:
+      self.put(key, results)
+
+  def clear(self):
+    """
+      Drops all the results and resets the statistics, e.g. after changing the settings or components
+      @ In, None
+      @ Out, None
+    """
+    with self._lock:
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
+
+  def stats(self):
+    """
+      Usage statistics
+      @ In, None
+      @ Out, stats, dict, numbers of hits, misses and results kept, and the size limit
+    """
+    return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxSize': self.maxSize}
+
+class ResultStore(ResultCache):
+  """
+    Result cache kept in an SQLite database file instead of in memory, so the results outlive the process;
+    e.g. rerunning an interrupted campaign only evaluates the samples that were not finished. The results
+    are keyed on the hash of the model (see modelHash) and of the sample (see ResultCache.key), so one file
+    can hold several models. When the stored results take more than the size limit, the least recently used
+    ones are dropped. Several processes can share the same file. The results are stored as plain arrays
+    (see _encode), so reading a store never unpickles, and so never runs, anything from the file.
+  """
+  def __init__(self, path, model, maxBytes=2**30, allData=False, v=100):
+    """
+      Constructor.
+      @ In, path, str, database file name, created if needed
+      @ In, model, str, hash of the model the results belong to
+      @ In, maxBytes, int, optional, size limit of the stored results of all models
+      @ In, allData, bool, optional, if True then the project cash flows (<Output>) are stored with the indicators,
+        otherwise the results including them are not stored
+      @ In, v, int, optional, verbosity
+      @ Out, None
+    """
+    if maxBytes < 1:
+      raise IOError(f'The result store must have room for results, but got a size limit of {maxBytes} bytes!')
+    self.path = path
+    self.model = model
+    self.maxBytes = maxBytes
+    self.allData = allData
+    self.v = v
+    self.hits = 0
+    self.misses = 0
+    self._db = None # opened on first use, in the process using it
+    self._warned = False # whether results without room for their project cash flows were reported
+    self._lock = threading.Lock() # guards the connection, shared by the threads of the process
+
+  def __getstate__(self):
+    """
+      Gets the state to pickle (e.g. for a worker process), without the database connection and lock
+      @ In, None
+      @ Out, state, dict, attributes
+    """
+    state = super().__getstate__()
+    state['_db'] = None
+    return state
+
+  def _connect(self):
+    """
+      Opens the database, creating the tables if needed
+      @ In, None
+      @ Out, db, sqlite3.Connection, database connection
+    """
+    if self._db is None:
+      dirName = os.path.dirname(os.path.abspath(self.path))
+      os.makedirs(dirName, exist_ok=True)
+      # wait for the other processes writing to the file, rather than failing
+      db = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+      with db:
+        db.execute('BEGIN IMMEDIATE')
+        db.execute('CREATE TABLE IF NOT EXISTS results (model TEXT, sample TEXT, results BLOB, bytes INTEGER, ' +\
+                   'used INTEGER, PRIMARY KEY (model, sample))')
+        db.execute('CREATE INDEX IF NOT EXISTS resultsUsed ON results (used)')
+        # running size of all the results, so that checking the size limit does not scan the table
+        db.execute('CREATE TABLE IF NOT EXISTS total (bytes INTEGER)')
+        db.execute('INSERT INTO total SELECT IFNULL(SUM(bytes), 0) FROM results WHERE NOT EXISTS (SELECT * FROM total)')
+        db.execute('CREATE TRIGGER IF NOT EXISTS resultsAdded AFTER INSERT ON results ' +\
+                   'BEGIN UPDATE total SET bytes = bytes + NEW.bytes; END')
+        db.execute('CREATE TRIGGER IF NOT EXISTS resultsDropped AFTER DELETE ON results ' +\
+                   'BEGIN UPDATE total SET bytes = bytes - OLD.bytes; END')
+      self._db = db
+    return self._db
+
+  def __len__(self):
+    """
+      Number of results stored for the model
+      @ In, None
+      @ Out, __len__, int, number of results stored
+    """
+    with self._lock:
+      return self._connect().execute('SELECT COUNT(*) FROM results WHERE model = ?', (self.model,)).fetchone()[0]
+
+  @staticmethod
+  def _encode(results):
+    """
+      Encodes results as plain arrays: the nested dictionaries are flattened into a JSON layout of the path,
+      shape and kind of each value, followed by all the values as float64
+      @ In, results, dict, economic metric results, with numeric values
+      @ Out, blob, bytes, layout, a zero byte, then the values
+    """
+    layout = []
+    arrays = [] # values of each layout entry, none for None
+    def add(path, value):
+      """
+        Adds a value to the layout, or the values of a dictionary
+        @ In, path, list, keys leading to the value
+        @ In, value, object, value
+        @ Out, None
+      """
+      if isinstance(value, ProjectCashflows):
+        layout.append([path, value.data.shape, 'cashflows', value.names])
+        arrays.append(value.data)
+      elif isinstance(value, dict):
+        for name, sub in value.items():
+          add(path + [name], sub)
+      elif value is None:
+        layout.append([path, [0], 'none'])
+      else:
+        value = np.asarray(value)
+        layout.append([path, value.shape, 'bool' if value.dtype == bool else 'float'])
+        arrays.append(value.astype(float))
+    for name, value in results.items():
+      add([name], value)
+    data = np.concatenate(list(a.ravel() for a in arrays)) if arrays else np.zeros(0)
+    return json.dumps(layout).encode() + b'\0' + data.astype('<f8').tobytes()
+
+  @staticmethod
+  def _decode(blob):
+    """
+      Decodes results encoded by _encode
+      @ In, blob, bytes, encoded results
+      @ Out, results, dict, economic metric results
+    """
+    header, _, data = blob.partition(b'\0')
+    values = np.frombuffer(data, dtype='<f8')
+    results = {}
+    start = 0
+    for path, shape, kind, *names in json.loads(header):
+      size = int(np.prod(shape))
+      value = values[start:start+size].reshape(shape)
+      start += size
+      if kind == 'cashflows':
+        cashflows = ProjectCashflows(list(tuple(name) for name in names[0]), shape[1:])
+        cashflows.data[...] = value
+        value = cashflows
+      elif kind == 'none':
+        value = None
+      else:
+        # single values as numpy scalars, arrays as writable copies
+        value = value.astype(bool if kind == 'bool' else float)
+        value = value[()] if value.ndim == 0 else value
+      target = results
+      for key in path[:-1]:
+        target = target.setdefault(key, {})
+      target[path[-1]] = value
+    return results
+
+  def get(self, key):
+    """
+      Looks up the results of a sample
+      @ In, key, str, key of the sample (see "key")
+      @ Out, results, dict, economic metric results, or None if not stored
+    """
+    return self.getMany([key])[0]
+
+  def getMany(self, keys):
+    """
+      Looks up the results of several samples, marking the ones found as used in one transaction
+      @ In, keys, list, keys of the samples (see "key")
+      @ Out, results, list, economic metric results of each sample, or None if not stored
+    """
+    with self._lock:
+      db = self._connect()
+      results = []
+      found = []
+      for key in keys:
+        row = db.execute('SELECT results FROM results WHERE model = ? AND sample = ?', (self.model, key)).fetchone()
+        try:
+          results.append(None if row is None else self._decode(row[0]))
+        except ValueError:
+          # not written by this version, evaluated again
+          row = None
+          results.append(None)
+        if row is not None:
+          found.append(key)
+      self.hits += len(found)
+      self.misses += len(keys) - len(found)
+      if found:
+        with db:
+          used = db.execute('SELECT IFNULL(MAX(used), 0) FROM results').fetchone()[0]
+          db.executemany('UPDATE results SET used = ? WHERE model = ? AND sample = ?',
+                         ((used + i + 1, self.model, key) for i, key in enumerate(found)))
+    return results
+
+  def put(self, key, results):
+    """
+      Stores the results of a sample, dropping the least recently used ones beyond the size limit
+      @ In, key, str, key of the sample (see "key")
+      @ In, results, dict, economic metric results
+      @ Out, None
+    """
+    self.putMany([(key, results)])
+
+  def putMany(self, entries):
+    """
+      Stores the results of several samples in one transaction, dropping the least recently used ones beyond
+      the size limit
+      @ In, entries, list, (key, economic metric results) of each sample
+      @ Out, None
+    """
+    blobs = []
+    for key, results in entries:
+      if 'all_data' in results and not self.allData:
+        if not self._warned:
+          vprint(self.v, 50, 'store', f'results with the project cash flows (<Output>) are not stored in "{self.path}", ' +\
+                 'since the store does not keep them (allData)')
+          self._warned = True
+        continue
+      blobs.append((key, self._encode(results)))
+    if not blobs:
+      return
+    with self._lock:
+      db = self._connect()
+      with db:
+        used = db.execute('SELECT IFNULL(MAX(used), 0) FROM results').fetchone()[0]
+        # replaced explicitly, so the triggers keep the total size
+        db.executemany('DELETE FROM results WHERE model = ? AND sample = ?', ((self.model, key) for key, _ in blobs))
+        db.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?)',
+                       ((self.model, key, blob, len(blob), used + i + 1) for i, (key, blob) in enumerate(blobs)))
+        total = db.execute('SELECT bytes FROM total').fetchone()[0]
+        while total > self.maxBytes:
+          dropped = []
+          for model, sample, size in db.execute('SELECT model, sample, bytes FROM results ORDER BY used LIMIT 256').fetchall():
+            if total <= self.maxBytes:
+              break
+            dropped.append((model, sample))
+            total -= size
+          if not dropped:
+            break
+          db.executemany('DELETE FROM results WHERE model = ? AND sample = ?', dropped)
+
+  def clear(self):
+    """
+      Drops all the results of the model and resets the statistics
+      @ In, None
+      @ Out, None
+    """
+    with self._lock:
+      db = self._connect()
+      with db:
+        db.execute('DELETE FROM results WHERE model = ?', (self.model,))
+      self.hits = 0
+      self.misses = 0
+
+  def stats(self):
+    """
+      Usage statistics
+      @ In, None
+      @ Out, stats, dict, numbers of hits, misses and results stored for the model, and the size limit in bytes
+    """
+    return {'hits': self.hits, 'misses': self.misses, 'size': len(self), 'maxBytes': self.maxBytes}
+
+  def close(self):
+    """
+      Closes the database; it is opened again if the store is used afterwards
+      @ In, None
+      @ Out, None
+    """
+    with self._lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
+
+def _resultKey(cache, plan, settings, variables, gradients=False):
+  """
+    Key of the results of a sample in a result cache
+    @ In, cache, ResultCache, cache
+    @ In, plan, EvaluationPlan, plan of the settings and components
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, variables, dict, variable-value map of the sample
+    @ In, gradients, bool, optional, whether the results include the derivatives
+    @ Out, key, str, key of the sample
+  """
+  return cache.key(plan, variables, gradients, settings.getOutput())
+
+#=====================
+# PYOMO PARAMETERS
+#=====================
+class PyomoParameters:
+  """
+    Mutable Pyomo parameters for the discount rate, tax and inflation used by a flat Pyomo NPV
+    (see calculateLinearPyomoIndicators). Updating them changes the value of the NPV expression, and of any
+    model objective built from it, without constructing the expression again.
+    The parameters live in "block", which can be attached to the Pyomo model (e.g. m.teal = params.block):
+      - discount[year], (1 + discount rate)^-year
+      - taxMultiplier[component], 1 - tax of the component
+      - inflation[component, year], (1 + inflation of the component)^-year
+  """
+  def __init__(self, settings, components, projectLength):
+    """
+      Constructor. Creates the parameters with the rates of the settings and components.
+      @ In, settings, CashFlows.GlobalSettings, global settings
+      @ In, components, list, list of CashFlows.Component instances
+      @ In, projectLength, int, project years
+      @ Out, None
+    """
+    import pyomo.environ as pyo
+    self.projectLength = projectLength
+    self.discountRate = settings.getDiscountRate()
+    # components with their own tax or inflation keep it when the global rate is updated
+    self.ownTax = set(comp.name for comp in components if comp.getTax() is not None)
+    self.ownInflation = set(comp.name for comp in components if comp.getInflation() is not None)
+    self.tax = dict((comp.name, comp.getTax() if comp.name in self.ownTax else settings.getTax()) for comp in components)
+    self.inflation = dict((comp.name, comp.getInflation() if comp.name in self.ownInflation else settings.getInflation())
+                          for comp in components)
+    names = list(self.tax)
+    self.block = pyo.Block(concrete=True)
+    self.block.years = pyo.RangeSet(0, projectLength - 1)
+    self.block.components = pyo.Set(initialize=names, ordered=True)
+    self.block.discount = pyo.Param(self.block.years, mutable=True, initialize=0.0)
+    self.block.taxMultiplier = pyo.Param(self.block.components, mutable=True, initialize=1.0)
+    self.block.inflation = pyo.Param(self.block.components, self.block.years, mutable=True, initialize=1.0)
+    self._store()
+
+  def _store(self):
+    """
+      Sets the parameter values from the current rates
+      @ In, None
+      @ Out, None
+    """
+    years = np.arange(self.projectLength, dtype=float)
+    for year, value in enumerate(np.power(1.0 + self.discountRate, -years).tolist()):
+      self.block.discount[year] = value
+    for name, tax in self.tax.items():
+      self.block.taxMultiplier[name] = 1.0 - tax
+    for name, inflation in self.inflation.items():
+      for year, value in enumerate(np.power(1.0 + inflation, -years).tolist()):
+        self.block.inflation[name, year] = value
+
+  def update(self, discountRate=None, tax=None, inflation=None):
+    """
+      Changes the rates, in place
+      @ In, discountRate, float, optional, new discount rate
+      @ In, tax, float or dict, optional, new global tax rate (not applied to components with their own tax),
+        or component name: new tax rate of that component, which then becomes its own tax
+      @ In, inflation, float or dict, optional, new global inflation rate (not applied to components with their
+        own inflation), or component name: new inflation rate of that component, which then becomes its own
+      @ Out, None
+    """
+    if discountRate is not None:
+      self.discountRate = discountRate
+    for rates, own, new in [(self.tax, self.ownTax, tax), (self.inflation, self.ownInflation, inflation)]:
+      if new is None:
+        continue
+      if not isinstance(new, dict):
+        new = dict((name, new) for name in rates if name not in own)
+      else:
+        unknown = list(name for name in new if name not in rates)
+        if unknown:
+          raise IOError(f'Unknown components {unknown} for the Pyomo parameters! Known components: {list(rates)}')
+        own.update(new)
+      rates.update(new)
+    self._store()
+
+  def groupKeys(self, comp, cf):
+    """
+      Gets the key of the parameters scaling a cash flow in each project year
+      @ In, comp, CashFlows.Component, component owning the cash flow
+      @ In, cf, CashFlows.CashFlow, cash flow
+      @ Out, keys, list, (taxed component or None, inflated component or None, year) for each project year
+    """
+    taxed = comp.name if cf.isTaxable() else None
+    inflated = comp.name if cf.isInflated() else None
+    return list((taxed, inflated, year) for year in range(self.projectLength))
+
+  def factor(self, key):
+    """
+      Gets the expression scaling the cash flows of a group
+      @ In, key, tuple, group key, see groupKeys
+      @ Out, factor, Pyomo expression, product of the discount, tax and inflation parameters
+    """
+    taxed, inflated, year = key
+    factor = self.block.discount[year]
+    if taxed is not None:
+      factor = factor * self.block.taxMultiplier[taxed]
+    if inflated is not None:
+      factor = factor * self.block.inflation[inflated, year]
+    return factor
+
 #=====================
 # MAIN METHOD
 #=====================
-def run(settings, components, variables, pyomoVar=False):
+def run(settings, components, variables, pyomoVar=False, plan=None, gradients=False, linearPyomo=False, mutableParams=False, cache=None,
+        irrGuess=None):
   """
     @ In, settings, CashFlows.GlobalSettings, global settings
     @ In, components, list, list of CashFlows.Component instances
     @ In, variables, dict, variables from RAVEN
     @ In, pyomoVar, boolean, if True, indicates that an expression will be constructed instead of a value calculated
+    @ In, plan, EvaluationPlan, optional, plan compiled for these settings and components (created if not given)
+    @ In, gradients, bool, optional, if True then the results include the exact derivatives of each indicator
+      with respect to each variable the cash flows depend on, as results["gradients"][indicator][variable],
+      shaped like the variable (one derivative per entry)
+    @ In, linearPyomo, bool, optional, if True (with pyomoVar) then the NPV is emitted as one flat expression,
+      linear in each Pyomo variable with numeric coefficients, instead of following the cash flows year by year
+    @ In, mutableParams, bool, optional, if True (with pyomoVar) then the flat NPV is built on mutable Pyomo
+      parameters for the discount rate, tax and inflation, returned as results["parameters"] (see PyomoParameters)
+      so they can be changed without building the NPV again
+    @ In, cache, ResultCache, optional, results of earlier samples of these settings and components to look up
+      first, and to add these results to (e.g. a ResultStore); defaults to the cache of the plan (see <ResultCache>),
+      False to use none. Not used when constructing Pyomo expressions.
+    @ In, irrGuess, float or np.array, optional, IRR (one per sample if batched) to warm start the IRR solver from;
+      it only speeds up the solve, the IRR found is the same as without it (see solveIrr)
     @ Out, results, dict, economic metric results
   """
   # make a dictionary mapping component names to components
   compsByName = dict((c.name, c) for c in components)
   v = settings.getVerbosity()
   m = 'run'
+  tables.setPath(settings.getTableFile())
   vprint(v, 0, m, 'Starting CashFlow Run ...')
   # check mapping of drivers and determine order in which they should be evaluated
   vprint(v, 0, m, '... Checking if all drivers present ...')
-  ordered = checkDrivers(settings, components, variables, v=v, pyomoVar=pyomoVar)
+  if plan is None:
+    plan = EvaluationPlan(settings, components, v=v, pyomoVar=pyomoVar)
+  if gradients and (pyomoVar or plan.periodic):
+    raise IOError('Gradients are not available with <PeriodicEvaluation> or when constructing Pyomo expressions!')
+  if (linearPyomo or mutableParams) and not pyomoVar:
+    raise IOError('Flat linear Pyomo expressions can only be built when constructing Pyomo expressions (pyomoVar)!')
+  # the mutable parameters are only used by the flat Pyomo NPV
+  linearPyomo = linearPyomo or mutableParams
+  plan.checkVariables(variables)
+  if cache is None:
+    cache = plan.resultCache
+  elif cache is False:
+    cache = None
+  cacheKey = None
+  if cache is not None and not pyomoVar:
+    cacheKey = _resultKey(cache, plan, settings, variables, gradients)
+    results = cache.get(cacheKey)
+    if results is not None:
+      vprint(v, 0, m, '... sample found in result cache:', lambda: cache.stats())
+      return results
 
   # compute project cashflows
   ## this comes in multiple styles!
@@ -638,70 +2017,426 @@ def run(settings, components, variables, pyomoVar=False):
   vprint(v, 0, m, 'Component Lifetime Cashflow Calculations')
   vprint(v, 0, m, '='*90)
   lifetimeCashflows = defaultdict(dict) # keys are component, cashflow, then indexed by lifetime
-  projectLife = getProjectLength(settings, components, v)
-  for ocf in ordered:
-    if ocf in variables or ocf == 'EndNode': # TODO why this check for ocf in variables? Should it be comp, or cf?
-      continue
-    compName, cfName = ocf.split('|')
+  projectLife = plan.projectLength
+  for compName, cfName in plan.order:
     comp = compsByName[compName]
     cf = comp.getCashflow(cfName)
     # if this component is a "recurring" type, then we don't need to do the lifetime cashflow bit
     #if cf.type == 'Recurring':
     #  raise NotImplementedError # FIXME how to do this right?
     # calculate cash flow for component's lifetime for this cash flow
-    lifeCf = componentLifeCashflow(comp, cf, variables, lifetimeCashflows, projectLife, v=0, pyomoVar=pyomoVar)
+    ## for periodic evaluation, recurring cash flows are only needed for a single rebuild cycle
+    life = comp.getLifetime() + 1 if plan.periodic else projectLife
+    lifeCf = componentLifeCashflow(comp, cf, variables, lifetimeCashflows, life, v=v, pyomoVar=pyomoVar)
     lifetimeCashflows[compName][cfName] = lifeCf
+  if plan.periodic:
+    vprint(v, 0, m, '='*90)
+    vprint(v, 0, m, 'Periodic Economic Indicator Calculations')
+    vprint(v, 0, m, '='*90)
+    vprint(v, 0, m, lambda: f' ... project length: {projectLife} years')
+    results = calculatePeriodicIndicators(settings, components, lifetimeCashflows, projectLife, v=v,
+                                          multipliers=plan.multipliers)
+    results['outputType'] = settings.getOutput()
+    if cacheKey is not None:
+      cache.put(cacheKey, results)
+    return results
   vprint(v, 0, m, '='*90)
   vprint(v, 0, m, 'Project Lifetime Cashflow Calculations')
   vprint(v, 0, m, '='*90)
   # determine how the project life is calculated.
-  projectLength = getProjectLength(settings, components, v=v)
-  vprint(v, 0, m, f' ... project length: {projectLength} years')
-  projectCashflows = projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=v, pyomoVar=pyomoVar)
+  projectLength = plan.projectLength
+  vprint(v, 0, m, lambda: f' ... project length: {projectLength} years')
+  outputType = settings.getOutput()
+  # the flat Pyomo NPV doesn't need the project cash flows, unless they are reported
+  if not linearPyomo or outputType:
+    projectCashflows = projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=v,
+                                            pyomoVar=pyomoVar, multipliers=plan.multipliers, schedules=plan.schedules)
   # preserve cashflows by component so they're reportable as outputs
 
   vprint(v, 0, m, '='*90)
   vprint(v, 0, m, 'Economic Indicator Calculations')
   vprint(v, 0, m, '='*90)
-  indicators = settings.getIndicators()
-  outputType = settings.getOutput()
 
-  results = {}
-  if 'NPV_search' in indicators:
-    metric = npvSearch(settings, components, projectCashflows, projectLength, v=v)
-    results['NPV_mult'] = metric
-  if 'NPV' in indicators:
-    metric = NPV(components, projectCashflows, projectLength, settings.getDiscountRate(), v=v, pyomoVar=pyomoVar)
-    results['NPV'] = metric
-  if 'IRR' in indicators:
-    metric = IRR(components, projectCashflows, projectLength, v=v)
-    results['IRR'] = metric
-  if 'PI' in indicators:
-    metric = PI(components, projectCashflows, projectLength, settings.getDiscountRate(), v=v)
-    results['PI'] = metric
+  derivatives = None
+  if gradients:
+    vprint(v, 0, m, '... propagating derivatives ...')
+    derivatives = projectDerivatives(components, lifetimeDerivatives(plan, variables, lifetimeCashflows, projectLife),
+                                     plan.getProjections())
+  if linearPyomo:
+    parameters = PyomoParameters(settings, components, projectLength) if mutableParams else None
+    results = calculateLinearPyomoIndicators(settings, lifetimeCashflows, plan, v=v, parameters=parameters)
+    if parameters is not None:
+      results['parameters'] = parameters
+  else:
+    results = calculateIndicators(settings, components, projectCashflows, projectLength, v=v, pyomoVar=pyomoVar,
+                                  irrGuess=irrGuess, derivatives=derivatives)
   results['outputType'] = outputType
 
   if outputType:
     results["all_data"] = projectCashflows
-    print('DEBUGG all data:')
+    vprint(v, 1, m, 'all data:')
     for comp, cval in projectCashflows.items():
       for cf, cfval in cval.items():
-        print('DEBUGG ...in CF', cf, len(cfval))
+        vprint(v, 1, m, '...in CF', cf, lambda: np.shape(cfval)[-1])
 
+  if cacheKey is not None:
+    cache.put(cacheKey, results)
   return results
 
+def runBatch(settings, components, variables, plan=None, gradients=False, cache=None, irrGuess=None):
+  """
+    Evaluates many realizations at once. Each variable carries a leading sample axis, e.g. a scalar
+    driver has shape (N,) and a lifetime driver has shape (N, lifetime+1); the cash flow calculations
+    then broadcast along that axis instead of calling "run" once per sample.
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, variables, dict, variables from RAVEN, each with a leading sample axis
+    @ In, plan, EvaluationPlan, optional, plan compiled for these settings and components
+    @ In, gradients, bool, optional, if True then the results include the derivatives of the indicators (see "run")
+    @ In, cache, ResultCache, optional, results of earlier samples to look up first, one sample at a time, so only
+      the samples not found are evaluated (see "run"); not used with gradients
+    @ In, irrGuess, float or np.array, optional, IRR to warm start the IRR solver from, for all the samples or one per sample
+    @ Out, results, dict, economic metric results, each indicator with shape (N,)
+  """
+  batchVars = _batchVariables(variables)
+  if plan is None:
+    plan = EvaluationPlan(settings, components, v=settings.getVerbosity())
+  if cache is None:
+    cache = plan.resultCache
+  if cache is None or cache is False or gradients:
+    return run(settings, components, batchVars, plan=plan, gradients=gradients, cache=False, irrGuess=irrGuess)
+  plan.checkVariables(batchVars)
+  numSamples = len(next(iter(batchVars.values())))
+  keys = list(_resultKey(cache, plan, settings, dict((name, value[s]) for name, value in batchVars.items()))
+              for s in range(numSamples))
+  samples = cache.getMany(keys)
+  missing = list(s for s, results in enumerate(samples) if results is None)
+  vprint(settings.getVerbosity(), 0, 'run', lambda: f'... {numSamples - len(missing)} of {numSamples} samples found in result cache')
+  if missing:
+    if np.ndim(irrGuess) > 0:
+      irrGuess = np.asarray(irrGuess)[missing]
+    results = run(settings, components, dict((name, value[missing]) for name, value in batchVars.items()),
+                  plan=plan, cache=False, irrGuess=irrGuess)
+    for i, s in enumerate(missing):
+      samples[s] = _sampleResults(results, i, len(missing))
+    cache.putMany(list((keys[s], samples[s]) for s in missing))
+  return _joinResults(samples)
+
+def _sampleResults(results, sample, numSamples):
+  """
+    Takes the results of one sample out of the results of a batch
+    @ In, results, dict, economic metric results of the batch
+    @ In, sample, int, index of the sample in the batch
+    @ In, numSamples, int, number of samples in the batch
+    @ Out, sampleResults, dict, economic metric results of the sample, as given by "run"
+  """
+  sampleResults = {}
+  for name, value in results.items():
+    if name == 'outputType':
+      sampleResults[name] = value
+    elif name == 'all_data':
+      sampleResults[name] = ProjectCashflows(value.names, value.data.shape[2:])
+      sampleResults[name].data[...] = value.data[:, sample]
+    else:
+      # indicators the same for all samples may not have a sample axis
+      part = np.broadcast_to(value, (numSamples,) + np.shape(value)[1:])[sample]
+      sampleResults[name] = part.copy() if np.ndim(part) else part
+  return sampleResults
+
+def _joinResults(samples):
+  """
+    Joins the results of samples into the results of a batch
+    @ In, samples, list, economic metric results of each sample, as given by "run"
+    @ Out, results, dict, economic metric results of the batch, with the samples along the first axis
+  """
+  results = {}
+  for name, value in samples[0].items():
+    if name == 'outputType':
+      results[name] = value
+    elif name == 'all_data':
+      results[name] = ProjectCashflows(value.names, (len(samples),) + value.data.shape[1:])
+      for s, sampleResults in enumerate(samples):
+        results[name].data[:, s] = sampleResults[name].data
+    else:
+      results[name] = np.array(list(sampleResults[name] for sampleResults in samples))
+  return results
+
+def _batchVariables(variables):
+  """
+    Checks batched variables share the leading sample axis, and gives all of them a year axis
+    @ In, variables, dict, variables from RAVEN, each with a leading sample axis
+    @ Out, batchVars, dict, variables with shape (N, entries)
+  """
+  batchVars = {}
+  numSamples = None
+  for name, value in variables.items():
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 0:
+      raise RuntimeError(f'CashFlow: batched variable "{name}" has no sample axis!')
+    if numSamples is None:
+      numSamples = value.shape[0]
+    elif value.shape[0] != numSamples:
+      raise RuntimeError(f'CashFlow: batched variable "{name}" has {value.shape[0]} samples, but expected {numSamples}!')
+    # scalars per sample get a trailing axis of length one, so years are always the last axis
+    batchVars[name] = value[:, np.newaxis] if value.ndim == 1 else value
+  return batchVars
+
+#=====================
+# LINEAR SURROGATE
+#=====================
+class LinearSurrogate:
+  """
+    NPV as a precomputed linear function of the sampled variables,
+      NPV = constant + sum_k dot(coefficients[k], variables[k]) + nonlinear terms
+    Taking lifetime cash flows to the project life and discounting them is linear, so each cash flow
+    contributes dot(weights, lifetime cash flow) to the NPV. Cash flows that only depend on a single
+    variable through linear steps (Recurring alpha * driver, Capex alpha * driver / reference with X = 1,
+    and the amortization of those) reduce to a coefficient vector for that variable. The other cash flows
+    (e.g. Capex with an economy of scale X != 1) are the nonlinear terms, evaluated exactly for each sample.
+  """
+  def __init__(self, settings, components, variables, plan=None):
+    """
+      Constructor. Computes the coefficient vectors.
+      @ In, settings, CashFlows.GlobalSettings, global settings
+      @ In, components, list, list of CashFlows.Component instances
+      @ In, variables, dict, one sample of the variables, only used for the number of entries of each variable
+      @ In, plan, EvaluationPlan, optional, plan compiled for these settings and components
+      @ Out, None
+    """
+    m = 'surrogate'
+    v = settings.getVerbosity()
+    if plan is None:
+      plan = EvaluationPlan(settings, components, v=v)
+    if plan.pyomoVar:
+      raise IOError('A linear surrogate is not available when constructing Pyomo expressions!')
+    plan.checkVariables(variables)
+    self.settings = settings
+    self.plan = plan
+    self.compsByName = dict((c.name, c) for c in components)
+    self.sizes = dict((name, np.size(value)) for name, value in variables.items())
+    self.weights = self._discountWeights()
+    # classify the cash flows by the variables they depend on
+    self.dependencies = {}  # (component name, cash flow name): set of variables it depends on
+    self.linear = {}        # (component name, cash flow name): variable it is linear in, or None if constant
+    self.nonlinear = []     # (component name, cash flow name) evaluated exactly for each sample
+    for key in plan.order:
+      self._classify(key)
+    vprint(v, 0, m, '... nonlinear cash flows:', lambda: list(f'{c}|{cf}' for c, cf in self.nonlinear))
+    # constant cash flows
+    self.constant = 0.0
+    lifetimeCashflows = self._evaluate({}, set())
+    for key, variable in self.linear.items():
+      if variable is None:
+        self.constant += lifetimeCashflows[key[0]][key[1]] @ self.weights[key]
+    # one linear solve per variable: its zero vector and each unit vector, as a batch
+    self.coefficients = {}
+    for variable in sorted(set(self.linear.values()) - {None}):
+      size = self.sizes[variable]
+      probe = np.vstack((np.zeros(size), np.eye(size)))
+      lifetimeCashflows = self._evaluate({variable: probe}, {variable})
+      coefficients = np.zeros(size)
+      for key, linearIn in self.linear.items():
+        if linearIn == variable:
+          discounted = lifetimeCashflows[key[0]][key[1]] @ self.weights[key]
+          self.constant += discounted[0]
+          coefficients += discounted[1:] - discounted[0]
+      self.coefficients[variable] = coefficients
+    vprint(v, 0, m, lambda: f'... constant: {self.constant:1.9e}')
+    vprint(v, 0, m, '... coefficient vectors:', lambda: list(f'{k} ({len(c)})' for k, c in self.coefficients.items()))
+
+  def _discountWeights(self):
+    """
+      Discounted project value of one unit in each year of each lifetime cash flow
+      @ In, None
+      @ Out, weights, dict, (component name, cash flow name): np.array with one weight per lifetime year
+    """
+    discount = discountFactors(self.settings.getDiscountRate(), self.plan.projectLength)
+    return dict((key, projection @ discount) for key, projection in self.plan.getProjections().items())
+
+  def _classify(self, key):
+    """
+      Determines if a cash flow is constant, linear in a single variable, or nonlinear
+      @ In, key, tuple, (component name, cash flow name), with its sources already classified
+      @ Out, None
+    """
+    cf = self.compsByName[key[0]].getCashflow(key[1])
+    inputs = {}  # parameter: (variables it depends on, if it is linear in them)
+    for param, (kind, value) in self.plan.sources[key].items():
+      if kind == 'variable':
+        inputs[param] = ({value}, True)
+      elif kind == 'crossref':
+        inputs[param] = (self.dependencies[value], value in self.linear)
+    mult = cf.getMultiplier()
+    if tutils.isAString(mult):
+      inputs['mult'] = ({mult}, True)
+    varying = dict((param, info) for param, info in inputs.items() if info[0])
+    self.dependencies[key] = set().union(*(deps for deps, _ in varying.values()))
+    if not varying:
+      self.linear[key] = None
+      return
+    if len(varying) == 1:
+      param, (deps, isLinear) = next(iter(varying.items()))
+      scale = cf.getParam('scale')
+      # only a product of the inputs for recurring, the driver is raised to the power X for the others
+      if isLinear and len(deps) == 1 and (param != 'driver' or cf.type == 'Recurring' or scale is None or scale == 1.0):
+        self.linear[key] = next(iter(deps))
+        return
+    self.nonlinear.append(key)
+
+  def _evaluate(self, variables, available):
+    """
+      Calculates the lifetime cash flows that only depend on the available variables
+      @ In, variables, dict, variables, with a leading sample axis
+      @ In, available, set, names of the variables that can be used
+      @ Out, lifetimeCashflows, dict, component: cashflow: np.array of lifetime values
+    """
+    lifetimeCashflows = defaultdict(dict)
+    for key in self.plan.order:
+      if self.dependencies[key] <= available:
+        self._lifeCashflow(key, variables, lifetimeCashflows)
+    return lifetimeCashflows
+
+  def _lifeCashflow(self, key, variables, lifetimeCashflows):
+    """
+      Calculates a lifetime cash flow as "run" does, storing it with the others
+      @ In, key, tuple, (component name, cash flow name)
+      @ In, variables, dict, variables, with a leading sample axis
+      @ In, lifetimeCashflows, dict, component: cashflow: np.array of lifetime values, updated in place
+      @ Out, None
+    """
+    comp = self.compsByName[key[0]]
+    cf = comp.getCashflow(key[1])
+    lifetimeCashflows[key[0]][key[1]] = componentLifeCashflow(comp, cf, variables, lifetimeCashflows,
+                                                              self.plan.projectLength)
+
+  def evaluate(self, variables):
+    """
+      Evaluates the NPV of many samples at once
+      @ In, variables, dict, variables, each with a leading sample axis (see "runBatch")
+      @ Out, npv, np.array, net present value of each sample
+    """
+    variables = _batchVariables(variables)
+    numSamples = len(next(iter(variables.values())))
+    npv = np.full(numSamples, self.constant)
+    for name, coefficients in self.coefficients.items():
+      value = variables[name]
+      if value.shape[-1] != len(coefficients):
+        raise RuntimeError(f'CashFlow: surrogate variable "{name}" has {value.shape[-1]} entries, but was built with {len(coefficients)}!')
+      npv += value @ coefficients
+    if self.nonlinear:
+      # the nonlinear cash flows, and the cash flows they are driven by
+      needed = set(self.nonlinear)
+      for key in reversed(self.plan.order):
+        if key in needed:
+          needed.update(value for kind, value in self.plan.sources[key].values() if kind == 'crossref')
+      lifetimeCashflows = defaultdict(dict)
+      for key in self.plan.order:
+        if key in needed:
+          self._lifeCashflow(key, variables, lifetimeCashflows)
+      for key in self.nonlinear:
+        npv += lifetimeCashflows[key[0]][key[1]] @ self.weights[key]
+    return npv
 
 #=====================
 # PRINTING STUFF
 #=====================
 def vprint(threshold, desired, method, *msg):
   """
-    Light wrapper for printing that considers verbosity levels
+    Light wrapper for printing that considers verbosity levels.
+    Messages can be given as callables, which are only evaluated if the message is printed, so
+    that formatting and array statistics cost nothing at low verbosity.
     @ In, threshold, int, cutoff verbosity
     @ In, desired, int, requested message verbosity level
     @ In, method, str, name of method raising print
-    @ In, msg, list(str), messages to print
+    @ In, msg, list(str or callable), messages to print
     @ Out, None
   """
   if desired >= threshold:
-    print(f'CashFlow INFO ({method}):', *msg)
+    print(f'CashFlow INFO ({method}):', *(m() if callable(m) else m for m in msg))
+
+def vtable(threshold, desired, method, title, rows):
+  """
+    Prints a per-year table, or sends it to the table file if one is set, considering verbosity levels
+    @ In, threshold, int, cutoff verbosity
+    @ In, desired, int, requested message verbosity level
+    @ In, method, str, name of method writing the table
+    @ In, title, str, title of the table
+    @ In, rows, callable, returns an iterable of table rows (str), only called if the table is written
+    @ Out, None
+  """
+  if desired < threshold:
+    return
+  if tables.path is None:
+    vprint(threshold, desired, method, title)
+    for row in rows():
+      vprint(threshold, desired, method, row)
+  else:
+    print(f'CashFlow INFO ({method}):', f'{title} (see "{tables.path}")')
+    tables.write(method, title, *rows())
+
+class TableSink:
+  """
+    Buffered file for the verbose per-year tables, which are too long to be useful on screen, if one is set
+    with <TableFile>. The lines are only ever appended to the file, so processes sharing it (e.g. parallel
+    jobs) don't overwrite each other.
+  """
+  def __init__(self, path=None, bufferSize=10000):
+    """
+      Constructor.
+      @ In, path, str, optional, file the tables are written to, or None to print them
+      @ In, bufferSize, int, optional, number of lines held before writing them out
+      @ Out, None
+    """
+    self.path = path
+    self.bufferSize = bufferSize
+    self._buffer = []
+    self._atExit = False # whether the remaining lines are written out when the process ends
+
+  def setPath(self, path):
+    """
+      Changes the file the tables are written to
+      @ In, path, str, file the tables are written to, or None to print them
+      @ Out, None
+    """
+    if path != self.path:
+      self.flush()
+      self.path = path
+
+  def write(self, method, *lines):
+    """
+      Adds lines to the table file
+      @ In, method, str, name of method writing the lines
+      @ In, lines, list(str), lines to write
+      @ Out, None
+    """
+    if not self._atExit:
+      atexit.register(self.flush)
+      self._atExit = True
+    self._buffer.extend(f'CashFlow INFO ({method}): {line}' for line in lines)
+    if len(self._buffer) >= self.bufferSize:
+      self.flush()
+
+  def flush(self):
+    """
+      Writes out the buffered lines
+      @ In, None
+      @ Out, None
+    """
+    if not self._buffer:
+      return
+    with open(self.path, 'a') as f:
+      f.write('\n'.join(self._buffer) + '\n')
+    self._buffer = []
+
+tables = TableSink()
+
+def formatValue(value, fmt='1.9e'):
+  """
+    Formats a metric for printing, whether it is a single value or has one entry per sample
+    @ In, value, float or np.array, value(s) to format
+    @ In, fmt, str, optional, format specification for each entry
+    @ Out, formatValue, str, formatted value(s)
+  """
+  if np.ndim(value):
+    return np.array2string(np.asarray(value), formatter={'float_kind': lambda x: format(x, fmt)})
+  return format(value, fmt)
@@ -0,0 +1,106 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for evaluating many samples at once through main.runBatch.
+Each batched indicator is compared against a per-sample main.run evaluation.
+"""
+import os
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+
+from TEAL.src import main as RunCashFlow
+
+def loadCase(xmlFile):
+  """
+    Reads the economics deck and enables all indicators
+    @ In, xmlFile, str, name of the economics input file
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  root = ET.Element('ROOT')
+  root.append(ET.parse(xmlFile).getroot())
+  settings, components = RunCashFlow.readFromXml(root)
+  settings.setParams({'Indicator': {'name': ['NPV_search', 'NPV', 'IRR', 'PI'],
+                                    'target': 0.0,
+                                    'active': ['BOP|CA', 'BOP|RE', 'IP|CA', 'IP|RE']}})
+  settings.setVerbosity(100)
+  RunCashFlow.checkRunSettings(settings, components)
+  return settings, components
+
+def loadVariables(inpFile):
+  """
+    Reads the variable file used by the stand-alone driver
+    @ In, inpFile, str, name of the variable file
+    @ Out, variables, dict, variable-value map
+  """
+  variables = {}
+  with open(inpFile) as f:
+    for l in f:
+      if l.strip().startswith("#") or not len(l.strip()):
+        continue
+      key, val = l.split(' ', 1)
+      variables[key] = np.array([float(n) for n in val.split(",")])
+  return variables
+
+if __name__ == '__main__':
+  settings, components = loadCase('Cash_Flow_input_NPV.xml')
+  nominal = loadVariables('VarInp.txt')
+  # build samples by scaling the nominal values
+  scales = np.linspace(0.8, 1.2, 7)
+  samples = []
+  for scale in scales:
+    sample = dict((key, val * scale) for key, val in nominal.items())
+    sample['Multiplier'] = nominal['Multiplier']
+    samples.append(sample)
+  batch = dict((key, np.array([sample[key] if len(sample[key]) > 1 else sample[key][0] for sample in samples]))
+               for key in nominal)
+  batchMetrics = RunCashFlow.runBatch(settings, components, batch)
+
+  failures = 0
+  for s, sample in enumerate(samples):
+    metrics = RunCashFlow.run(settings, components, sample)
+    for key in ['NPV_mult', 'NPV', 'IRR', 'PI']:
+      if not np.isclose(metrics[key], batchMetrics[key][s], rtol=1e-10):
+        print(f'ERROR: sample {s} "{key}" single: {metrics[key]:1.9e}, batched: {batchMetrics[key][s]:1.9e}')
+        failures += 1
+  # the nominal sample reproduces the stand-alone gold value
+  nominalNPV = RunCashFlow.run(settings, components, nominal)['NPV']
+  if abs(nominalNPV - 630614140.519) > 0.01:
+    print(f'ERROR: correct NPV: 6.30614140519e+08, calculated NPV: {nominalNPV:1.9e}')
+    failures += 1
+  # all the batched cash flows are rows of one block, with a sample axis
+  settings.setParams({'Output': True})
+  allData = RunCashFlow.runBatch(settings, components, batch)['all_data']
+  for comp in components:
+    for cf in comp.getCashflows():
+      row = allData[comp.name][cf.name]
+      if row.shape != allData.data.shape[1:] or not np.shares_memory(row, allData.data):
+        print(f'ERROR: cash flow "{comp.name}|{cf.name}" with shape {row.shape} is not a row of the block {allData.data.shape}')
+        failures += 1
+  if allData.data.shape[1] != len(samples):
+    print(f'ERROR: cash flow block {allData.data.shape}, expected {len(samples)} samples')
+    failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,73 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  Tests the cash flow calculations can be set up and run programmatically without
+  importing RAVEN or the plotting libraries.
+"""
+import os
+import sys
+
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import CashFlows
+from TEAL.src import main as RunCashFlow
+
+if __name__ == '__main__':
+  life = 5
+  settings = CashFlows.GlobalSettings()
+  settings.setParams({'DiscountRate': 0.1,
+                      'tax': 0.0,
+                      'inflation': 0.0,
+                      'ProjectTime': life,
+                      'Indicator': {'name': ['NPV', 'IRR', 'PI'],
+                                    'active': ['Plant|Cap', 'Plant|Sales']}})
+  settings.setVerbosity(100)
+
+  plant = CashFlows.Component()
+  plant.setParams({'name': 'Plant', 'Life_time': life})
+  capex = CashFlows.Capex()
+  capex.name = 'Cap'
+  capex.initParams(life)
+  capex.setParams({'name': 'Cap', 'alpha': -1000.0, 'driver': 'size', 'reference': 1.0, 'X': 1.0,
+                   'mult_target': None, 'inflation': False})
+  sales = CashFlows.Recurring()
+  sales.setParams({'name': 'Sales', 'alpha': 300.0, 'driver': 'size', 'X': 1.0,
+                   'mult_target': None, 'inflation': False})
+  plant.addCashflows([capex, sales])
+
+  metrics = RunCashFlow.run(settings, [plant], {'size': np.array([2.0])})
+  expected = -2000.0 + sum(600.0 / 1.1**y for y in range(1, life + 1))
+
+  failures = 0
+  if abs(metrics['NPV'] - expected) > 1e-6:
+    print(f'ERROR: correct NPV: {expected:1.9e}, calculated NPV: {metrics["NPV"]:1.9e}')
+    failures += 1
+  if abs(metrics['PI'] - expected / 2000.0) > 1e-9:
+    print(f'ERROR: correct PI: {expected / 2000.0:1.9e}, calculated PI: {metrics["PI"]:1.9e}')
+    failures += 1
+  for module in ['ravenframework', 'matplotlib', 'pandas']:
+    if module in sys.modules:
+      print(f'ERROR: "{module}" was imported by the cash flow calculations')
+      failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,68 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  Tests the derivatives of the economic indicators returned by main.run against central finite differences.
+"""
+import os
+import sys
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import main as RunCashFlow
+
+from BatchEvaluationTest import loadCase, loadVariables
+
+if __name__ == '__main__':
+  failures = 0
+  settings, components = loadCase('Cash_Flow_input_NPV.xml')
+  plan = RunCashFlow.EvaluationPlan(settings, components)
+  variables = loadVariables('VarInp.txt')
+  results = RunCashFlow.run(settings, components, variables, plan=plan, gradients=True)
+  gradients = results['gradients']
+  if sorted(gradients) != ['IRR', 'NPV', 'NPV_mult', 'PI']:
+    print(f'ERROR: unexpected indicators with gradients: {sorted(gradients)}')
+    failures += 1
+  if sorted(gradients['NPV']) != ['BOP_TOT_revenueEL', 'BOP_capacity', 'IP_TOT_revenueBY', 'IP_capacity', 'Multiplier']:
+    print(f'ERROR: unexpected variables with gradients: {sorted(gradients["NPV"])}')
+    failures += 1
+
+  for indicator, byVariable in gradients.items():
+    for name, gradient in byVariable.items():
+      if gradient.shape != variables[name].shape:
+        print(f'ERROR: "{indicator}" gradient for "{name}" has shape {gradient.shape}, expected {variables[name].shape}')
+        failures += 1
+        continue
+      # central differences, one entry at a time
+      for i, value in enumerate(variables[name]):
+        step = 1e-5 * max(abs(value), 1.0)
+        shifted = []
+        for sign in [1, -1]:
+          perturbed = dict(variables)
+          perturbed[name] = variables[name].copy()
+          perturbed[name][i] += sign * step
+          shifted.append(RunCashFlow.run(settings, components, perturbed, plan=plan)[indicator])
+        difference = (shifted[0] - shifted[1]) / (2 * step)
+        if not np.isclose(gradient[i], difference, rtol=1e-5, atol=1e-9 * max(abs(results[indicator]), 1.0)):
+          print(f'ERROR: d{indicator}/d{name}[{i}] analytic: {gradient[i]:1.9e}, finite difference: {difference:1.9e}')
+          failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,78 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the batched IRR solver main.solveIrr.
+"""
+import os
+import sys
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+
+from TEAL.src import main as RunCashFlow
+
+if __name__ == '__main__':
+  failures = 0
+  # known IRRs, including a cash flow with two roots (the one closest to zero is used)
+  cases = [([-100, 39, 59, 55, 20], 0.28095),
+           ([-100, 0, 0, 74], -0.0955),
+           ([-100, 100, 0, -7], -0.0833),
+           ([-100, 100, 0, 7], 0.06206),
+           ([-5, 10.5, 1, -8, 1], 0.0886)]
+  for fcff, gold in cases:
+    irr, converged = RunCashFlow.solveIrr(np.array(fcff, dtype=float))
+    if not converged or round(irr, 5) != gold:
+      print(f'ERROR: IRR of {fcff} expected: {gold}, calculated: {irr} (converged: {converged})')
+      failures += 1
+
+  # batched, with a sample without any IRR
+  years = np.arange(61)
+  fcff = np.outer(np.linspace(1.0, 2.0, 5), np.where(years == 0, -1000.0, 60.0))
+  fcff[2] = 1.0
+  irr, converged = RunCashFlow.solveIrr(fcff)
+  if converged.tolist() != [True, True, False, True, True] or not np.isnan(irr[2]):
+    print(f'ERROR: unexpected convergence {converged} for IRRs {irr}')
+    failures += 1
+  npv = np.sum(fcff * np.power(1.0 + irr[:, np.newaxis], -years), axis=1)
+  if not np.allclose(npv[converged], 0.0, atol=1e-8):
+    print(f'ERROR: NPV at the IRR is not zero: {npv}')
+    failures += 1
+
+  # a warm start gives the same solution
+  warm, _ = RunCashFlow.solveIrr(fcff, guess=0.05)
+  if not np.allclose(warm[converged], irr[converged], rtol=1e-10):
+    print(f'ERROR: warm started IRRs {warm} do not match {irr}')
+    failures += 1
+
+  # two roots, 0.1 and 0.2: a guess next to the farther one still gives the one closest to zero
+  twoRoots = np.array([-100.0, 230.0, -132.0])
+  for guess in [None, 0.18, 0.22, 0.1]:
+    irr, converged = RunCashFlow.solveIrr(twoRoots, guess=guess)
+    if not converged or not np.isclose(irr, 0.1, rtol=1e-10):
+      print(f'ERROR: IRR of {twoRoots.tolist()} with guess {guess} expected: 0.1, calculated: {irr} (converged: {converged})')
+      failures += 1
+  irr, converged = RunCashFlow.solveIrr(np.array([twoRoots, -twoRoots, [-100.0, 0.0, 121.0]]), guess=np.array([0.18, 0.19, 0.1]))
+  if not converged.all() or not np.allclose(irr, [0.1, 0.1, 0.1], rtol=1e-10):
+    print(f'ERROR: warm started batch IRRs {irr}, expected 0.1 for all (converged: {converged})')
+    failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
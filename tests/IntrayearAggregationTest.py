@@ -0,0 +1,168 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for Recurring.computeIntrayearCashflows, representative periods and the chunked accumulation of
+intrayear cash flows against one computeIntrayearCashflow call per year.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+
+from TEAL.src import CashFlows
+
+def createRecurring(life, pyomoVar=False):
+  """
+    Creates an empty recurring cash flow
+    @ In, life, int, length of project in years
+    @ In, pyomoVar, bool, optional, if True then the yearly cash flow holds objects
+    @ Out, cf, CashFlows.Recurring, cash flow
+  """
+  cf = CashFlows.Recurring()
+  cf.setParams({'name': 'Hourly', 'X': 1, 'mult_target': None, 'inflation': False, 'multiply': None})
+  cf.initParams(life, pyomoVar=pyomoVar)
+  return cf
+
+def check(name, calculated, expected):
+  """
+    Compares yearly cash flows
+    @ In, name, str, name of the case
+    @ In, calculated, np.array, yearly cash flow from computeIntrayearCashflows
+    @ In, expected, np.array, yearly cash flow from computeIntrayearCashflow
+    @ Out, failures, int, 1 if they differ, else 0
+  """
+  if not np.allclose(np.asarray(calculated, dtype=float), np.asarray(expected, dtype=float), rtol=1e-12):
+    print(f'ERROR: {name}: yearly cash flows differ\n  calculated: {calculated}\n  expected: {expected}')
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  failures = 0
+  life = 6
+  hours = 24
+  rng = np.random.default_rng(7)
+  prices = rng.uniform(-10, 50, size=(life, hours))
+  dispatch = rng.uniform(0, 100, size=(life, hours))
+
+  reference = createRecurring(life)
+  for year in range(life):
+    reference.computeIntrayearCashflow(year, prices[year], dispatch[year])
+  expected = reference.getYearlyCashflow()
+
+  # (years, hours)
+  cf = createRecurring(life)
+  cf.computeIntrayearCashflows(prices, dispatch)
+  failures += check('2D', cf.getYearlyCashflow(), expected)
+
+  # flat hourly entries with the first entry of each year
+  cf = createRecurring(life)
+  cf.computeIntrayearCashflows(prices.ravel(), dispatch.ravel(), offsets=np.arange(life) * hours)
+  failures += check('flat', cf.getYearlyCashflow(), expected)
+
+  # years of different lengths, starting from project year 1, with an empty year
+  lengths = [5, 0, 7, 3]
+  flatPrices = rng.uniform(size=sum(lengths))
+  flatDispatch = rng.uniform(size=sum(lengths))
+  offsets = np.cumsum([0] + lengths[:-1])
+  reference = createRecurring(life)
+  for year, (start, length) in enumerate(zip(offsets, lengths)):
+    reference.computeIntrayearCashflow(year + 1, flatPrices[start:start+length], flatDispatch[start:start+length])
+  cf = createRecurring(life)
+  cf.computeIntrayearCashflows(flatPrices, flatDispatch, offsets=offsets, firstYear=1)
+  failures += check('uneven', cf.getYearlyCashflow(), reference.getYearlyCashflow())
+
+  # years without entries at the end, starting past the last entry
+  lengths = [4, 6, 0, 0]
+  offsets = np.cumsum([0] + lengths[:-1])
+  reference = createRecurring(life)
+  for year, (start, length) in enumerate(zip(offsets, lengths)):
+    reference.computeIntrayearCashflow(year, flatPrices[start:start+length], flatDispatch[start:start+length])
+  cf = createRecurring(life)
+  cf.computeIntrayearCashflows(flatPrices[:10], flatDispatch[:10], offsets=offsets)
+  failures += check('trailing empty', cf.getYearlyCashflow(), reference.getYearlyCashflow())
+
+  # the same prices every year
+  reference = createRecurring(life)
+  for year in range(life):
+    reference.computeIntrayearCashflow(year, prices[0], dispatch[year])
+  cf = createRecurring(life)
+  cf.computeIntrayearCashflows(prices[0], dispatch)
+  failures += check('broadcast', cf.getYearlyCashflow(), reference.getYearlyCashflow())
+
+  # objects, as for Pyomo expressions
+  cf = createRecurring(life, pyomoVar=True)
+  cf.computeIntrayearCashflows(prices, dispatch.astype(object))
+  failures += check('objects', cf.getYearlyCashflow(), expected)
+
+  # representative days, each occurring a number of times in each year
+  days = 3
+  dayPrices = rng.uniform(-10, 50, size=(days, hours))
+  dayDispatch = rng.uniform(0, 100, size=(days, hours))
+  clusterMap = rng.integers(0, 150, size=(life, days))
+  reference = createRecurring(life)
+  for year in range(life):
+    # the full year, with each representative day repeated
+    occurrences = np.repeat(np.arange(days), clusterMap[year])
+    reference.computeIntrayearCashflow(year, dayPrices[occurrences].ravel(), dayDispatch[occurrences].ravel())
+  cf = createRecurring(life)
+  cf.computeIntrayearCashflows(dayPrices, dayDispatch, clusterMap=clusterMap)
+  failures += check('clusters', cf.getYearlyCashflow(), reference.getYearlyCashflow())
+  cf = createRecurring(life)
+  for year in range(life):
+    cf.computeIntrayearCashflow(year, dayPrices, dayDispatch, weights=clusterMap[year][:, np.newaxis])
+  failures += check('weights', cf.getYearlyCashflow(), reference.getYearlyCashflow())
+  cf = createRecurring(life, pyomoVar=True)
+  cf.computeIntrayearCashflows(dayPrices, dayDispatch.astype(object), clusterMap=clusterMap)
+  failures += check('object clusters', cf.getYearlyCashflow(), reference.getYearlyCashflow())
+
+  # chunks from a generator, several per year
+  cf = createRecurring(life)
+  cf.accumulateIntrayearChunks((year, prices[year, h:h+5], dispatch[year, h:h+5])
+                               for year in range(life) for h in range(0, hours, 5))
+  failures += check('generator', cf.getYearlyCashflow(), expected)
+
+  # empty chunks, e.g. the end of a file, add nothing
+  cf = createRecurring(life)
+  cf.accumulateIntrayearChunks([(np.zeros(0, dtype=int), np.zeros(0), np.zeros(0))] +
+                               list((year, prices[year], dispatch[year]) for year in range(life)) +
+                               [(np.zeros(0, dtype=int), 1.0, np.zeros(0))])
+  failures += check('empty chunks', cf.getYearlyCashflow(), expected)
+
+  # chunks crossing the year boundaries, read from memory-mapped files
+  with tempfile.TemporaryDirectory() as tmp:
+    files = []
+    for name, values in [('year', np.repeat(np.arange(life), hours)), ('alpha', prices.ravel()), ('driver', dispatch.ravel())]:
+      files.append(os.path.join(tmp, f'{name}.npy'))
+      np.save(files[-1], values)
+    cf = createRecurring(life)
+    cf.accumulateIntrayearChunks(CashFlows.Recurring.intrayearChunks(*files, chunkSize=17))
+    failures += check('memory map', cf.getYearlyCashflow(), expected)
+
+  # objects, in chunks
+  cf = createRecurring(life, pyomoVar=True)
+  cf.accumulateIntrayearChunks(CashFlows.Recurring.intrayearChunks(np.repeat(np.arange(life), hours), prices.ravel(),
+                                                                   dispatch.ravel().astype(object), chunkSize=17))
+  failures += check('object chunks', cf.getYearlyCashflow(), expected)
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
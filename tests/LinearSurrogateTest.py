@@ -0,0 +1,66 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  Tests the linear NPV surrogate against the full batched evaluation.
+"""
+import os
+import sys
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import main as RunCashFlow
+
+from BatchEvaluationTest import loadCase, loadVariables
+
+if __name__ == '__main__':
+  failures = 0
+  settings, components = loadCase('Cash_Flow_input_NPV.xml')
+  nominal = loadVariables('VarInp.txt')
+  surrogate = RunCashFlow.LinearSurrogate(settings, components, nominal)
+
+  # the capex with an economy of scale (X = 0.64) and its depreciation are the nonlinear terms
+  nonlinear = sorted(f'{comp}|{cf}' for comp, cf in surrogate.nonlinear)
+  if nonlinear != ['BOP|BOP_CA_depreciation', 'BOP|BOP_CA_depreciation_tax_credit', 'BOP|CA']:
+    print(f'ERROR: unexpected nonlinear cash flows: {nonlinear}')
+    failures += 1
+  if sorted(surrogate.coefficients) != ['BOP_TOT_revenueEL', 'IP_TOT_revenueBY', 'IP_capacity']:
+    print(f'ERROR: unexpected coefficient vectors: {sorted(surrogate.coefficients)}')
+    failures += 1
+
+  # random perturbations of the nominal values
+  rng = np.random.default_rng(42)
+  numSamples = 50
+  batch = dict((key, np.outer(rng.uniform(0.5, 1.5, numSamples), val) if len(val) > 1 else val[0] * rng.uniform(0.5, 1.5, numSamples))
+               for key, val in nominal.items())
+  batch['Multiplier'] = np.full(numSamples, nominal['Multiplier'][0])
+  expected = RunCashFlow.runBatch(settings, components, batch)['NPV']
+  npv = surrogate.evaluate(batch)
+  if not np.allclose(npv, expected, rtol=1e-10):
+    print(f'ERROR: surrogate NPV differs from the full evaluation by up to {np.max(np.abs(npv - expected)):1.3e}')
+    failures += 1
+  # the nominal sample reproduces the stand-alone gold value
+  nominalNPV = surrogate.evaluate(dict((key, val[np.newaxis, :] if len(val) > 1 else val) for key, val in nominal.items()))[0]
+  if abs(nominalNPV - 630614140.519) > 0.01:
+    print(f'ERROR: correct NPV: 6.30614140519e+08, surrogate NPV: {nominalNPV:1.9e}')
+    failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,89 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  Tests reading the economics input through the cached, pre-parsed model of main.readFromXml.
+"""
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import CashFlows
+from TEAL.src import main as RunCashFlow
+
+from BatchEvaluationTest import loadVariables
+
+def loadRoot(xmlFile):
+  """
+    Reads the economics input file into the node passed to readFromXml
+    @ In, xmlFile, str, name of the economics input file
+    @ Out, root, xml.etree.ElementTree.Element, node containing the "Economics" node
+  """
+  root = ET.Element('ROOT')
+  root.append(ET.parse(xmlFile).getroot())
+  return root
+
+def evaluate(settings, components, variables):
+  """
+    Evaluates the NPV of a model
+    @ In, settings, CashFlows.GlobalSettings, settings
+    @ In, components, list, CashFlows.Component instances
+    @ In, variables, dict, variable-value map
+    @ Out, npv, float, net present value
+  """
+  RunCashFlow.checkRunSettings(settings, components)
+  return RunCashFlow.run(settings, components, variables)['NPV']
+
+if __name__ == '__main__':
+  failures = 0
+  variables = loadVariables('VarInp.txt')
+  with tempfile.TemporaryDirectory() as cacheDir:
+    parsed = RunCashFlow.readFromXml(loadRoot('Cash_Flow_input_NPV.xml'), cacheDir=cacheDir)
+    if len(os.listdir(cacheDir)) != 1:
+      print(f'ERROR: expected one cached model, found {os.listdir(cacheDir)}')
+      failures += 1
+    # a cache hit must not build the input specs again
+    specs = CashFlows.Component.getInputSpecs, CashFlows.GlobalSettings.getInputSpecs
+    def noSpecs(*args, **kwargs):
+      """ fails the test if the input is read again """
+      raise RuntimeError('input specs built for a cached model')
+    CashFlows.Component.getInputSpecs = CashFlows.GlobalSettings.getInputSpecs = classmethod(noSpecs)
+    try:
+      cached = RunCashFlow.readFromXml(loadRoot('Cash_Flow_input_NPV.xml'), cacheDir=cacheDir)
+    finally:
+      CashFlows.Component.getInputSpecs, CashFlows.GlobalSettings.getInputSpecs = specs
+    parsedNPV = evaluate(*parsed, variables)
+    cachedNPV = evaluate(*cached, variables)
+    if abs(cachedNPV - 630614140.519) > 0.01 or cachedNPV != parsedNPV:
+      print(f'ERROR: correct NPV: 6.30614140519e+08, parsed NPV: {parsedNPV:1.9e}, cached NPV: {cachedNPV:1.9e}')
+      failures += 1
+    # a different input gets its own cached model
+    if RunCashFlow.modelHash(loadRoot('Cash_Flow_input_NPV.xml')) == RunCashFlow.modelHash(loadRoot('Cash_Flow_input_PI.xml')):
+      print('ERROR: different inputs have the same model hash')
+      failures += 1
+    RunCashFlow.readFromXml(loadRoot('Cash_Flow_input_PI.xml'), cacheDir=cacheDir)
+    if len(os.listdir(cacheDir)) != 2:
+      print(f'ERROR: expected two cached models, found {os.listdir(cacheDir)}')
+      failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,64 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the periodic (closed-form) evaluation of LCM project lengths.
+The indicators are compared against the evaluation on project-length cash flows.
+"""
+import os
+import sys
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+
+from TEAL.src import main as RunCashFlow
+from BatchEvaluationTest import loadCase, loadVariables
+
+if __name__ == '__main__':
+  settings, components = loadCase('Cash_Flow_input_NPV.xml')
+  settings.setParams({'Indicator': {'name': ['NPV_search', 'NPV', 'PI'],
+                                    'target': 0.0,
+                                    'active': ['BOP|CA', 'BOP|RE', 'IP|CA', 'IP|RE']},
+                      'inflation': 0.02})
+  variables = loadVariables('VarInp.txt')
+  full = RunCashFlow.run(settings, components, variables)
+  settings.setParams({'PeriodicEvaluation': True})
+  periodic = RunCashFlow.run(settings, components, variables)
+  batch = dict((key, np.array([val * scale for scale in [0.9, 1.0, 1.1]])) for key, val in variables.items())
+  batchPeriodic = RunCashFlow.runBatch(settings, components, batch)
+
+  failures = 0
+  for key in ['NPV_mult', 'NPV', 'PI']:
+    if not np.isclose(full[key], periodic[key], rtol=1e-10):
+      print(f'ERROR: "{key}" full: {full[key]:1.9e}, periodic: {periodic[key]:1.9e}')
+      failures += 1
+    if not np.isclose(batchPeriodic[key][1], periodic[key], rtol=1e-10):
+      print(f'ERROR: "{key}" periodic: {periodic[key]:1.9e}, batched: {batchPeriodic[key][1]:1.9e}')
+      failures += 1
+  # IRR needs the yearly cash flows, so it can't be requested
+  try:
+    settings.setParams({'Indicator': {'name': ['IRR'], 'active': ['BOP|CA', 'BOP|RE', 'IP|CA', 'IP|RE']}})
+    print('ERROR: IRR was accepted with periodic evaluation!')
+    failures += 1
+  except IOError:
+    pass
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
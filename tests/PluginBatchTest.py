@@ -0,0 +1,93 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests that a batch of realizations evaluated at once by the plugin's runBatch, or realizations run one after the other
+on the same container, give the same metrics as running each realization on its own.
+"""
+import os
+import sys
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import CashFlow_ExtMod
+
+from BatchEvaluationTest import loadCase, loadVariables
+
+def initialize(plugin, settings, components):
+  """
+    Creates a container, as RAVEN would
+    @ In, plugin, CashFlow_ExtMod.CashFlow, plugin instance
+    @ In, settings, CashFlows.GlobalSettings, settings
+    @ In, components, list, CashFlows.Component instances
+    @ Out, container, CashFlow_ExtMod.FakeSelf, initialized container
+  """
+  container = CashFlow_ExtMod.FakeSelf()
+  container._globalSettings = settings
+  container._components = components
+  plugin.initialize(container, {}, [])
+  return container
+
+def metrics(container):
+  """
+    Collects the metrics set on a container
+    @ In, container, CashFlow_ExtMod.FakeSelf, container
+    @ Out, metrics, dict, attribute name: value, without the private attributes
+  """
+  return dict((key, val) for key, val in vars(container).items() if not key.startswith('_'))
+
+if __name__ == '__main__':
+  failures = 0
+  plugin = CashFlow_ExtMod.CashFlow()
+  nominal = loadVariables('VarInp.txt')
+  realizations = list(dict((key, val * scale) for key, val in nominal.items()) for scale in np.linspace(0.8, 1.2, 5))
+  for output in [False, True]:
+    settings, components = loadCase('Cash_Flow_input_NPV.xml')
+    settings.setParams({'Output': output})
+    expected = []
+    for realization in realizations:
+      container = initialize(plugin, settings, components)
+      plugin.run(container, realization)
+      expected.append(metrics(container))
+    # one container for all realizations, as RAVEN reuses it
+    container = initialize(plugin, settings, components)
+    for r, realization in enumerate(realizations):
+      plugin.run(container, realization)
+      for name, value in metrics(container).items():
+        if not np.allclose(value, expected[r][name], rtol=1e-10):
+          print(f'ERROR: Output={output}: "{name}" of realization {r} on a reused container: {value}, expected {expected[r][name]}')
+          failures += 1
+    container = initialize(plugin, settings, components)
+    plugin.runBatch(container, realizations)
+    calculated = metrics(container)
+    if sorted(calculated) != sorted(expected[0]):
+      print(f'ERROR: Output={output}: batch metrics {sorted(calculated)}, expected {sorted(expected[0])}')
+      failures += 1
+      continue
+    for name, values in calculated.items():
+      if name == 'cfYears':
+        continue
+      for r, single in enumerate(expected):
+        if not np.allclose(values[r], single[name], rtol=1e-10):
+          print(f'ERROR: Output={output}: "{name}" of realization {r}: batch {values[r]}, single {single[name]}')
+          failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,112 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  Tests that the linear Pyomo NPV (linearPyomo=True) matches the nested expression of the default Pyomo path,
+  also when built on mutable parameters (mutableParams=True) that are updated afterwards.
+"""
+import os
+import sys
+
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.core.expr import polynomial_degree
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import main as RunCashFlow
+
+from PyomoTest import build_econ_settings, build_generator, build_market
+
+def buildCase(projectLife, hoursInYear, scale):
+  """
+    Builds the generator and market case of PyomoTest, without constraints
+    @ In, projectLife, int, length of project in years
+    @ In, hoursInYear, int, number of dispatch variables per year
+    @ In, scale, float, economy of scale exponent of the generator capex
+    @ Out, model, pyo.ConcreteModel, model owning the variables
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, TEAL components
+  """
+  settings = build_econ_settings({'Generator': ['Cap', 'FixedOM', 'Hourly'], 'Market': ['Hourly']}, life=projectLife)
+  settings._verbosity = 100
+  model = pyo.ConcreteModel()
+  model.genSize = pyo.Var(initialize=1, bounds=(0, 100))
+  genDispatch = np.zeros((projectLife, hoursInYear), dtype=object)
+  marketDispatch = np.zeros((projectLife, hoursInYear), dtype=object)
+  for y in range(projectLife):
+    var = pyo.Var(list(range(hoursInYear)), initialize=0)
+    setattr(model, f'Gen_disp_year_{y+1}', var)
+    genDispatch[y, :] = np.array(list(var.values()))
+    var = pyo.Var(list(range(hoursInYear)), initialize=0)
+    setattr(model, f'Market_disp_year_{y+1}', var)
+    marketDispatch[y, :] = np.array(list(var.values()))
+  generator = build_generator(model.genSize, projectLife, projectLife, genDispatch)
+  generator.getCashflow('Cap')._scale = scale
+  prices = np.cos(np.arange(hoursInYear))[None, :] * 100 * np.ones((projectLife, 1))
+  market = build_market(50, projectLife, prices, projectLife, marketDispatch)
+  return model, settings, [generator, market]
+
+if __name__ == '__main__':
+  failures = 0
+  rng = np.random.default_rng(42)
+  # linear capex (X = 1) and economy of scale (X = 0.64), which keeps one nonlinear term
+  for scale, degree in [(1.0, 1), (0.64, None)]:
+    model, settings, components = buildCase(5, 10, scale)
+    nested = RunCashFlow.run(settings, components, {}, pyomoVar=True)['NPV']
+    linear = RunCashFlow.run(settings, components, {}, pyomoVar=True, linearPyomo=True)['NPV']
+    if polynomial_degree(linear) != degree:
+      print(f'ERROR: X={scale}: linear NPV has polynomial degree {polynomial_degree(linear)}, expected {degree}')
+      failures += 1
+    for _ in range(5):
+      for var in model.component_data_objects(pyo.Var):
+        var.set_value(float(rng.uniform(0, 50)))
+      expected = pyo.value(nested)
+      calculated = pyo.value(linear)
+      if not np.isclose(calculated, expected, rtol=1e-10):
+        print(f'ERROR: X={scale}: nested NPV: {expected:1.9e}, linear NPV: {calculated:1.9e}')
+        failures += 1
+
+  # mutable discount, tax and inflation; the market sales are taxed and inflated
+  model, settings, components = buildCase(5, 10, 0.64)
+  components[1].getCashflow('Hourly').setParams({'tax': True, 'inflation': 'real'})
+  results = RunCashFlow.run(settings, components, {}, pyomoVar=True, mutableParams=True)
+  npv, parameters = results['NPV'], results['parameters']
+  for var in model.component_data_objects(pyo.Var):
+    var.set_value(float(rng.uniform(0, 50)))
+  for dr, tax, infl in [(0.1, 0.21, 0.02184), (0.05, 0.35, 0.03), (0.2, 0.0, 0.0)]:
+    parameters.update(discountRate=dr, tax=tax, inflation=infl)
+    rebuilt = build_econ_settings({'Generator': ['Cap', 'FixedOM', 'Hourly'], 'Market': ['Hourly']}, life=5,
+                                  dr=dr, tax=tax, infl=infl)
+    rebuilt._verbosity = 100
+    expected = pyo.value(RunCashFlow.run(rebuilt, components, {}, pyomoVar=True)['NPV'])
+    calculated = pyo.value(npv)
+    if not np.isclose(calculated, expected, rtol=1e-10):
+      print(f'ERROR: rates {dr}, {tax}, {infl}: rebuilt NPV: {expected:1.9e}, updated NPV: {calculated:1.9e}')
+      failures += 1
+
+  try:
+    RunCashFlow.run(settings, components, {}, linearPyomo=True)
+    print('ERROR: linearPyomo without pyomoVar was accepted')
+    failures += 1
+  except IOError:
+    pass
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
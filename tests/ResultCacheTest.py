@@ -0,0 +1,134 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests that revisited samples are found in the result cache (<ResultCache>), with the same results as
+evaluating them again, and that the least recently used samples are dropped beyond the size limit.
+"""
+import os
+import sys
+import pickle
+import threading
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import main as RunCashFlow
+
+from BatchEvaluationTest import loadCase, loadVariables
+
+def check(name, cache, hits, misses):
+  """
+    Compares the cache statistics
+    @ In, name, str, name of the case
+    @ In, cache, RunCashFlow.ResultCache, cache
+    @ In, hits, int, expected number of hits
+    @ In, misses, int, expected number of misses
+    @ Out, failures, int, 1 if they differ, else 0
+  """
+  stats = cache.stats()
+  if (stats['hits'], stats['misses']) != (hits, misses):
+    print(f'ERROR: {name}: cache statistics {stats}, expected {hits} hits and {misses} misses')
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  failures = 0
+  settings, components = loadCase('Cash_Flow_input_NPV.xml')
+  nominal = loadVariables('VarInp.txt')
+  samples = list(dict((key, val * scale) for key, val in nominal.items()) for scale in np.linspace(0.8, 1.2, 4))
+  expected = list(RunCashFlow.run(settings, components, sample) for sample in samples)
+
+  settings.setParams({'ResultCache': 2})
+  plan = RunCashFlow.EvaluationPlan(settings, components, v=settings.getVerbosity())
+  cache = plan.resultCache
+  for s in [0, 1, 0, 1]:
+    results = RunCashFlow.run(settings, components, samples[s], plan=plan)
+    for key in ['NPV_mult', 'NPV', 'IRR', 'PI']:
+      if not np.isclose(results[key], expected[s][key], rtol=1e-12):
+        print(f'ERROR: sample {s} "{key}" cached: {results[key]:1.9e}, evaluated: {expected[s][key]:1.9e}')
+        failures += 1
+  failures += check('revisited', cache, 2, 2)
+
+  # variables no cash flow uses don't matter, copies of the same values do
+  sample = dict((key, np.array(val)) for key, val in samples[0].items())
+  sample['Unused'] = 42.0
+  RunCashFlow.run(settings, components, sample, plan=plan)
+  failures += check('unused variable', cache, 3, 2)
+  sample['Multiplier'] = sample['Multiplier'] * 2
+  RunCashFlow.run(settings, components, sample, plan=plan)
+  failures += check('changed multiplier', cache, 3, 3)
+
+  # sample 1 is the least recently used, so it was dropped for the changed multiplier
+  RunCashFlow.run(settings, components, samples[0], plan=plan)
+  RunCashFlow.run(settings, components, samples[1], plan=plan)
+  failures += check('size limit', cache, 4, 4)
+  if len(cache) != 2:
+    print(f'ERROR: {len(cache)} results kept, expected 2')
+    failures += 1
+
+  # a cache given explicitly, with the plan created by run
+  cache = RunCashFlow.ResultCache(4)
+  for s in [2, 3, 2]:
+    results = RunCashFlow.run(settings, components, samples[s], cache=cache)
+    if not np.isclose(results['NPV'], expected[s]['NPV'], rtol=1e-12):
+      print(f'ERROR: sample {s} NPV with explicit cache: {results["NPV"]:1.9e}, evaluated: {expected[s]["NPV"]:1.9e}')
+      failures += 1
+  failures += check('explicit', cache, 1, 2)
+
+  # shared by threads, as by RAVEN samples running in parallel, with lookups racing the evictions
+  cache = RunCashFlow.ResultCache(8)
+  errors = []
+  def hammer(t):
+    """
+      Looks up and keeps results of overlapping keys
+      @ In, t, int, thread number
+      @ Out, None
+    """
+    try:
+      for i in range(2000):
+        key = str((t + i) % 32)
+        if cache.get(key) is None:
+          cache.put(key, {'NPV': float(key)})
+    except Exception as e:
+      errors.append(e)
+  threads = list(threading.Thread(target=hammer, args=(t,)) for t in range(8))
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  stats = cache.stats()
+  if errors or stats['hits'] + stats['misses'] != 8 * 2000 or len(cache) > 8:
+    print(f'ERROR: cache shared by threads: {stats}, errors: {errors}')
+    failures += 1
+  # pickled with its results, e.g. with the plan for a worker process
+  copied = pickle.loads(pickle.dumps(cache))
+  if len(copied) != len(cache) or copied.get(next(iter(cache._entries))) is None:
+    print(f'ERROR: pickled cache kept {len(copied)} of {len(cache)} results')
+    failures += 1
+
+  try:
+    settings.setParams({'ResultCache': 0})
+    print('ERROR: a result cache without room was accepted')
+    failures += 1
+  except IOError:
+    pass
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
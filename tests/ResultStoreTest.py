@@ -0,0 +1,183 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests that results kept in a result store file are found again by later runs, also by batches that
+only evaluate the samples not stored yet, and by a rerun of the stand-alone driver.
+"""
+import os
+import sys
+import csv
+import pickle
+import sqlite3
+import tempfile
+import subprocess
+import numpy as np
+
+# load TEAL if available (e.g. pip-installed), otherwise add to env
+try:
+  import TEAL.src
+except ModuleNotFoundError:
+  tealPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+  sys.path.append(tealPath)
+from TEAL.src import main as RunCashFlow
+from TEAL.src import CashFlow_ExtMod
+
+from BatchEvaluationTest import loadCase, loadVariables
+
+def compare(name, calculated, expected):
+  """
+    Compares the indicators of a batch
+    @ In, name, str, name of the case
+    @ In, calculated, dict, results with the stored samples
+    @ In, expected, dict, results evaluating all the samples
+    @ Out, failures, int, number of indicators that differ
+  """
+  failures = 0
+  for key in ['NPV_mult', 'NPV', 'IRR', 'PI']:
+    if not np.allclose(calculated[key], expected[key], rtol=1e-12):
+      print(f'ERROR: {name}: "{key}" {calculated[key]}, expected {expected[key]}')
+      failures += 1
+  return failures
+
+if __name__ == '__main__':
+  failures = 0
+  settings, components = loadCase('Cash_Flow_input_NPV.xml')
+  nominal = loadVariables('VarInp.txt')
+  scales = np.linspace(0.8, 1.2, 5)
+  batch = dict((key, np.array([val * scale if len(val) > 1 else val[0] * scale for scale in scales])) for key, val in nominal.items())
+  expected = RunCashFlow.runBatch(settings, components, batch)
+
+  with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'results.db')
+    plan = RunCashFlow.EvaluationPlan(settings, components, v=settings.getVerbosity())
+    store = RunCashFlow.ResultStore(path, 'model')
+    # two samples run one at a time, then the batch only evaluates the other three
+    for s in [1, 3]:
+      RunCashFlow.run(settings, components, dict((key, val[s]) for key, val in batch.items()), plan=plan, cache=store)
+    failures += compare('partly stored', RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=store), expected)
+    if (store.hits, store.misses, len(store)) != (2, 5, 5):
+      print(f'ERROR: partly stored batch statistics {store.stats()}, expected 2 hits, 5 misses, 5 stored')
+      failures += 1
+    store.close()
+
+    # the file is found again, as by a restarted process, but not for another model
+    store = RunCashFlow.ResultStore(path, 'model')
+    failures += compare('reopened', RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=store), expected)
+    other = RunCashFlow.ResultStore(path, 'other model')
+    RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=other)
+    if (store.hits, store.misses, other.hits, other.misses) != (5, 0, 0, 5):
+      print(f'ERROR: reopened statistics {store.stats()}, other model {other.stats()}')
+      failures += 1
+
+    # the cash flows are only stored on request
+    settings.setParams({'Output': True})
+    RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=store)
+    if len(store) != 5:
+      print(f'ERROR: {len(store)} results stored without the cash flows, expected 5')
+      failures += 1
+    withData = RunCashFlow.ResultStore(path, 'model', allData=True)
+    fresh = RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=False)
+    RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=withData)
+    stored = RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=withData)
+    if withData.hits != 5 or not np.allclose(stored['all_data'].data, fresh['all_data'].data, rtol=1e-12):
+      print(f'ERROR: stored cash flows {withData.stats()} differ from the evaluated ones')
+      failures += 1
+    settings.setParams({'Output': False})
+    for opened in [store, other, withData]:
+      opened.close()
+
+    # a small size limit keeps the most recently used results only
+    store = RunCashFlow.ResultStore(os.path.join(tmp, 'small.db'), 'model', maxBytes=700)
+    RunCashFlow.runBatch(settings, components, batch, plan=plan, cache=store)
+    kept = len(store)
+    if not 0 < kept < 5:
+      print(f'ERROR: {kept} results kept within the size limit, expected some but not all')
+      failures += 1
+    RunCashFlow.run(settings, components, dict((key, val[4]) for key, val in batch.items()), plan=plan, cache=store)
+    if store.hits != 1:
+      print(f'ERROR: the last sample was not kept within the size limit: {store.stats()}')
+      failures += 1
+    store.close()
+    with sqlite3.connect(os.path.join(tmp, 'small.db')) as db:
+      total = db.execute('SELECT bytes FROM total').fetchone()[0]
+      stored = db.execute('SELECT SUM(bytes) FROM results').fetchone()[0]
+    if total != stored:
+      print(f'ERROR: running total of {total} bytes, but {stored} bytes are stored')
+      failures += 1
+
+    # the results are stored as plain arrays, with gradients and single values kept as such
+    settings.setParams({'Output': True})
+    single = RunCashFlow.run(settings, components, nominal, plan=plan, gradients=True, cache=False)
+    settings.setParams({'Output': False})
+    decoded = RunCashFlow.ResultStore._decode(RunCashFlow.ResultStore._encode(single))
+    failures += compare('decoded', decoded, single)
+    if not isinstance(decoded['outputType'], (bool, np.bool_)) or not decoded['outputType'] or np.ndim(decoded['IRR']) or \
+       not np.array_equal(decoded['all_data'].data, single['all_data'].data) or decoded['all_data'].names != single['all_data'].names or \
+       any(not np.array_equal(decoded['gradients'][ind][name], deriv) for ind, byName in single['gradients'].items()
+           for name, deriv in byName.items()):
+      print(f'ERROR: decoded results differ: {decoded}')
+      failures += 1
+    decoded = RunCashFlow.ResultStore._decode(RunCashFlow.ResultStore._encode(expected))
+    failures += compare('decoded batch', decoded, expected)
+    if decoded['outputType'] is not None:
+      print(f'ERROR: decoded output type {decoded["outputType"]}, expected None')
+      failures += 1
+
+    # a pickle found in the file is never loaded, the sample is evaluated again
+    path = os.path.join(tmp, 'pickled.db')
+    store = RunCashFlow.ResultStore(path, 'model')
+    sample = dict((key, val[0]) for key, val in batch.items())
+    key = RunCashFlow._resultKey(store, plan, settings, sample)
+    blob = pickle.dumps(RunCashFlow.run(settings, components, sample, plan=plan, cache=False))
+    with store._connect() as db:
+      db.execute('INSERT INTO results VALUES (?, ?, ?, ?, ?)', ('model', key, blob, len(blob), 0))
+    results = RunCashFlow.run(settings, components, sample, plan=plan, cache=store)
+    if (store.hits, store.misses) != (0, 1) or not np.isclose(results['NPV'], expected['NPV'][0], rtol=1e-12):
+      print(f'ERROR: pickled results were used: {store.stats()}')
+      failures += 1
+    store.close()
+
+    # with detailed output, the stand-alone store keeps the project cash flows too
+    cashFlow, container = CashFlow_ExtMod.loadStandalone('Cash_Flow_input_Output.xml', store=os.path.join(tmp, 'output.db'))
+    for _ in range(2):
+      CashFlow_ExtMod.evaluateStandalone(cashFlow, container, nominal)
+    store = container._plan.resultCache
+    if (store.hits, len(store)) != (1, 1):
+      print(f'ERROR: detailed output store statistics {store.stats()}, expected 1 hit and 1 stored')
+      failures += 1
+    store.close()
+
+    # the stand-alone driver only evaluates the samples missing from the store
+    table = os.path.join(tmp, 'samples.npz')
+    np.savez(table, **batch)
+    path = os.path.join(tmp, 'standalone.db')
+    for run in range(2):
+      out = os.path.join(tmp, f'out{run}.csv')
+      subprocess.run([sys.executable, os.path.join('..', 'teal_standalone.py'), '-iXML', 'Cash_Flow_input_NPV.xml',
+                      '--batch', table, '-o', out, '--jobs', '2', '--store', path], capture_output=True)
+      with open(out) as f:
+        npvs = np.array(list(float(row['NPV']) for row in csv.DictReader(f)))
+      if not np.allclose(npvs, expected['NPV'], rtol=1e-12):
+        print(f'ERROR: stand-alone run {run} NPVs {npvs}, expected {expected["NPV"]}')
+        failures += 1
+    with sqlite3.connect(path) as db:
+      stored = db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    if stored != len(scales):
+      print(f'ERROR: {stored} results stored by the stand-alone driver, expected {len(scales)}')
+      failures += 1
+
+  if failures:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
@@ -0,0 +1,74 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs the stand-alone driver on a table of samples, evaluated in parallel.
+"""
+import os
+import sys
+import csv
+import tempfile
+import subprocess
+
+variables = {}
+with open('VarInp.txt') as f:
+  for l in f:
+    if l.strip().startswith("#") or not len(l.strip()):
+      continue
+    key, val = l.split(' ', 1)
+    variables[key] = [float(n) for n in val.split(",")]
+# per-year variables get one column per year
+header = []
+for key, val in variables.items():
+  header.extend([key] if len(val) == 1 else [f'{key}[{y}]' for y in range(len(val))])
+scales = [1.0, 0.9, 1.1, 1.0, 1.0]
+tmp = tempfile.TemporaryDirectory()
+samplesFile = os.path.join(tmp.name, 'batch_samples.csv')
+outFile = os.path.join(tmp.name, 'batch_out.csv')
+with open(samplesFile, 'w', newline='') as f:
+  writer = csv.writer(f)
+  writer.writerow(header)
+  for scale in scales:
+    writer.writerow([v * scale for val in variables.values() for v in val])
+
+try:
+  batch = subprocess.run([sys.executable, os.path.join('..', 'teal_standalone.py'), '-iXML', 'Cash_Flow_input_NPV.xml',
+                          '--batch', samplesFile, '-o', outFile, '--jobs', '2'], capture_output=True, text=True, timeout=300)
+except subprocess.TimeoutExpired as e:
+  print(f'ERROR: batch run did not finish in {e.timeout} s')
+  sys.exit(1)
+if batch.returncode != 0:
+  print(f'ERROR: batch run failed with return code {batch.returncode}:\n{batch.stderr}')
+  sys.exit(1)
+with open(outFile) as f:
+  rows = list(csv.DictReader(f))
+tmp.cleanup()
+
+failures = 0
+if [int(row['sample']) for row in rows] != list(range(len(scales))):
+  print(f'ERROR: samples are missing or out of order: {rows}')
+  sys.exit(1)
+npvs = list(float(row['NPV']) for row in rows)
+for s, scale in enumerate(scales):
+  if scale == 1.0 and abs(npvs[s] - 630614140.519) > 0.01:
+    print(f'ERROR: correct NPV: 6.30614140519e+08, sample {s}: {npvs[s]:1.9e}')
+    failures += 1
+# scaling all variables up scales the costs up more than the revenues
+if not npvs[2] < npvs[0] < npvs[1]:
+  print(f'ERROR: NPVs do not follow the scaled samples: {npvs}')
+  failures += 1
+
+if failures:
+  sys.exit(1)
+print('Success!')
+sys.exit(0)
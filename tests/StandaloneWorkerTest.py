@@ -0,0 +1,55 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs the stand-alone driver in worker mode, streaming several samples through a single process.
+"""
+import os
+import sys
+import json
+import subprocess
+
+variables = {}
+with open('VarInp.txt') as f:
+  for l in f:
+    if l.strip().startswith("#") or not len(l.strip()):
+      continue
+    key, val = l.split(' ', 1)
+    variables[key] = [float(n) for n in val.split(",")]
+# nominal sample, a sample missing its multiplier, and the nominal sample again
+missing = dict((key, val) for key, val in variables.items() if key != 'Multiplier')
+records = '\n'.join(json.dumps(record) for record in [variables, missing, variables]) + '\n'
+try:
+  worker = subprocess.run([sys.executable, os.path.join('..', 'teal_standalone.py'), '-iXML', 'Cash_Flow_input_NPV.xml', '--worker'],
+                          input=records, capture_output=True, text=True, timeout=300)
+except subprocess.TimeoutExpired as e:
+  print(f'ERROR: worker did not finish in {e.timeout} s')
+  sys.exit(1)
+results = list(json.loads(line) for line in worker.stdout.splitlines() if line.strip())
+
+failures = 0
+if len(results) != 3:
+  print(f'ERROR: expected 3 result records, got {len(results)}:\n{worker.stdout}\n{worker.stderr}')
+  sys.exit(1)
+for r in [0, 2]:
+  if abs(results[r].get('NPV', 0.0) - 630614140.519) > 0.01:
+    print(f'ERROR: correct NPV: 6.30614140519e+08, record {r}: {results[r]}')
+    failures += 1
+if 'error' not in results[1]:
+  print(f'ERROR: expected an error record for the sample without multiplier, got {results[1]}')
+  failures += 1
+
+if failures:
+  sys.exit(1)
+print('Success!')
+sys.exit(0)